@@ -0,0 +1,151 @@
+'''
+
+Agent Store
+=================================='''
+
+import numpy as np
+from vector2d import Vector2D
+
+
+"""
+Contiguous, world-owned storage for agent state.
+
+Every agent gets a slot (row) in a set of NumPy arrays, so whole-population
+maths can be done with array operations. Agents keep working with Vector2D
+style objects through VectorViews that read and write their row in place.
+
+Slots are recycled through a free list rather than compacted, so a slot
+never changes while its agent is alive. Use active to mask out free rows.
+
+"""
+class AgentStore(object):
+
+	# Name and number of columns for each array we store
+	VECTORS = ('pos', 'vel', 'heading', 'side')
+	SCALARS = ('mass', 'maxSpeed')
+
+	def __init__(self, capacity=64):
+
+		self.capacity = 0
+		self.count = 0 # number of slots ever handed out (high water mark)
+		self.active = np.zeros(0, dtype=bool)
+
+		for name in self.VECTORS:
+			setattr(self, name, np.zeros((0, 2)))
+		for name in self.SCALARS:
+			setattr(self, name, np.zeros(0))
+
+		self._free = []
+		self._views = {} # slot -> views into that slot, rebound when we grow
+
+		self._grow(capacity)
+
+
+	def __len__(self):
+		return self.count - len(self._free)
+
+
+	# Hands out a free slot, growing the arrays if we've run out
+	def allocate(self):
+
+		if(len(self._free)):
+			slot = self._free.pop()
+		else:
+			if(self.count == self.capacity):
+				self._grow(self.capacity * 2)
+			slot = self.count
+			self.count += 1
+
+		# Start with a clean row
+		for name in self.VECTORS:
+			getattr(self, name)[slot] = 0.
+		for name in self.SCALARS:
+			getattr(self, name)[slot] = 0.
+
+		self.active[slot] = True
+		self._views[slot] = []
+
+		return slot
+
+
+	def release(self, slot):
+
+		if(not self.active[slot]): return
+
+		self.active[slot] = False
+		del self._views[slot]
+		self._free.append(slot)
+
+
+	# Returns a Vector2D-like view onto one row of a vector array
+	def view(self, name, slot):
+
+		v = VectorView(getattr(self, name), slot, name)
+		self._views[slot].append(v)
+
+		return v
+
+
+	# Slots that are currently in use, in ascending order
+	def indices(self):
+
+		return np.flatnonzero(self.active[:self.count])
+
+
+	def _grow(self, capacity):
+
+		capacity = max(capacity, 1)
+
+		for name in self.VECTORS + self.SCALARS:
+			old = getattr(self, name)
+			new = np.zeros((capacity,) + old.shape[1:])
+			new[:len(old)] = old
+			setattr(self, name, new)
+
+		active = np.zeros(capacity, dtype=bool)
+		active[:len(self.active)] = self.active
+		self.active = active
+
+		self.capacity = capacity
+
+		# Existing views still point at the old arrays
+		for views in self._views.itervalues():
+			for v in views:
+				v._array = getattr(self, v._name)
+
+
+
+"""
+A Vector2D whose x and y live in a row of an AgentStore array.
+
+All the usual Vector2D methods work, in-place operators write straight
+into the store, and anything that makes a new vector returns a plain
+Vector2D.
+
+"""
+class VectorView(Vector2D):
+	__slots__ = ('_array', '_row', '_name')
+
+	def __init__(self, array, row, name=None):
+		self._array = array
+		self._row = row
+		self._name = name
+
+	# Use item() so we hand back python floats rather than numpy scalars,
+	# otherwise things like normalise() won't see a ZeroDivisionError
+	@property
+	def x(self):
+		return self._array.item(self._row, 0)
+
+	@x.setter
+	def x(self, value):
+		self._array[self._row, 0] = value
+
+	@property
+	def y(self):
+		return self._array.item(self._row, 1)
+
+	@y.setter
+	def y(self, value):
+		self._array[self._row, 1] = value
+
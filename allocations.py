@@ -0,0 +1,59 @@
+'''
+
+Allocations
+=================================='''
+
+from vector2d import Vector2D
+
+
+"""
+Counts how many Vector2Ds get made.
+
+While counting, Vector2D.__init__ is swapped for one that bumps a
+counter, and it's put back afterwards, so there's no cost the rest of
+the time. Views into the agent store aren't counted (they're made once
+per agent and never replaced).
+
+	with VectorAllocations() as allocations:
+		world.update(delta)
+
+	print allocations.count
+
+Or call start() and stop() around just the bits you want counted.
+
+"""
+class VectorAllocations(object):
+
+	def __init__(self):
+
+		self.count = 0
+
+
+	# Start counting (again), adding on to count
+	def start(self):
+
+		self._init = init = Vector2D.__dict__['__init__']
+		counter = self
+
+		def countingInit(vector, x=0., y=0.):
+			counter.count += 1
+			init(vector, x, y)
+
+		Vector2D.__init__ = countingInit
+
+
+	def stop(self):
+
+		Vector2D.__init__ = self._init
+
+
+	def __enter__(self):
+
+		self.start()
+		return self
+
+
+	def __exit__(self, *exc):
+
+		self.stop()
+
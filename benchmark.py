@@ -0,0 +1,292 @@
+'''
+
+Benchmark
+===============================
+
+Measures how World.update scales, by stepping headless worlds through a
+few fixed scenarios and timing every tick.
+
+	python benchmark.py
+	python benchmark.py --scenario feeding-frenzy --guppies 300
+	python benchmark.py --output results.json
+	python benchmark.py --save-baseline baseline.json
+	python benchmark.py --baseline baseline.json --threshold 0.15
+	python benchmark.py --phases
+	python benchmark.py --allocations
+	python benchmark.py --lod
+	python benchmark.py --decisions 2
+
+Each scenario reports ticks per second, agent updates per second (fish,
+hunters, food and rocks updated) and p50/p99 tick latency. Comparing
+against a baseline exits with status 1 if any scenario's throughput
+drops, or its p99 latency rises, by more than the threshold.
+
+--phases also records World.timings while measuring and prints where
+each scenario's time went (the timers themselves add a little overhead,
+so don't compare those runs against a baseline taken without them).
+--allocations counts the Vector2Ds made while measuring, per agent update,
+with the same caveat. --lod turns on the world's level of detail (see
+lod.py) and reports the mean number of fish in each tier per tick.
+--decisions MS turns on the world's decision scheduler (see decisions.py)
+with a budget of MS milliseconds per tick, and reports how many fish got
+to decide per tick.
+
+'''
+
+import headless
+
+import sys
+import json
+import argparse
+from contextlib import contextmanager
+from random import Random
+from timeit import default_timer as timer
+
+from world import World
+from allocations import VectorAllocations
+
+
+# Name and config for each scenario, in the order they're run
+SCENARIOS = [
+	('idle-flocking', {
+		'guppies': 200, 'food': 0, 'rocks': 10, 'hunters': 1,
+		'awake': False, 'lionKing': False
+	}),
+	('feeding-frenzy', {
+		'guppies': 60, 'food': 20, 'rocks': 10, 'hunters': 1,
+		'awake': False, 'lionKing': False
+	}),
+	('hunters-awake', {
+		'guppies': 200, 'food': 0, 'rocks': 10, 'hunters': 3,
+		'awake': True, 'lionKing': False
+	}),
+	('circle-of-life', {
+		'guppies': 60, 'food': 0, 'rocks': 10, 'hunters': 1,
+		'awake': False, 'lionKing': True
+	})
+]
+
+WIDTH = 1400
+HEIGHT = 800
+
+
+# Guppies announce themselves when they're born. Keep that (and the time
+# spent writing it out) away from the measurements.
+@contextmanager
+def silenced():
+
+	stdout = sys.stdout
+	sys.stdout = NullWriter()
+	try:
+		yield
+	finally:
+		sys.stdout = stdout
+
+
+class NullWriter(object):
+
+	def write(self, text):
+		pass
+
+	def flush(self):
+		pass
+
+
+
+def buildWorld(config, seed):
+
+	world = World(WIDTH, HEIGHT, seed=seed, rocks=config['rocks'], hunters=config['hunters'])
+	world.lionKing = config['lionKing']
+	world.addFish(config['guppies'])
+
+	# Keep hunters awake for the whole run
+	if(config['awake']):
+		for hunter in world.hunters:
+			world.clock.unschedule(hunter.toggleAwake)
+			hunter.awake = True
+
+	topUpFood(world, config['food'], Random(seed))
+
+	return world
+
+
+# Scatters food through the tank until there's at least count pieces in it
+def topUpFood(world, count, rng):
+
+	box = world.tank.box
+	missing = count - len([f for f in world.food if not f.eaten and world.tank.contains(f.pos)])
+
+	for _ in xrange(missing):
+		world.addFood(x=rng.uniform(box.left, box.right), y=rng.uniform(box.bottom, box.top))
+
+
+def agentCount(world):
+
+	return len(world.fishes) + len(world.hunters) + len(world.obstacles) + len([f for f in world.food if not f.eaten])
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(ordered, p):
+
+	index = int(round(p / 100.0 * (len(ordered) - 1)))
+	return ordered[index]
+
+
+def runScenario(name, config, ticks, warmup, delta, seed, phases=False, allocations=False, lod=False, decisions=None):
+
+	with silenced():
+		world = buildWorld(config, seed)
+		world.lod.enabled = lod
+		world.decisions.enabled = decisions is not None
+		world.decisions.budget = decisions
+		foodRng = Random(seed)
+
+		for _ in xrange(warmup):
+			world.update(delta)
+			topUpFood(world, config['food'], foodRng)
+
+		world.timings.window = ticks
+		world.timings.reset()
+		world.timings.enabled = phases
+
+		latencies = []
+		agentUpdates = 0
+		vectors = VectorAllocations()
+		tiers = dict((tier, 0) for tier in world.lod.TIERS)
+		decided = 0
+
+		for _ in xrange(ticks):
+			agentUpdates += agentCount(world)
+
+			if(allocations): vectors.start()
+			start = timer()
+			world.update(delta)
+			latencies.append(timer() - start)
+			if(allocations): vectors.stop()
+
+			for tier, count in world.lod.counts.iteritems():
+				tiers[tier] += count
+			decided += world.decisions.decided
+
+			# Keep the frenzy going, outside of the timed bit
+			topUpFood(world, config['food'], foodRng)
+
+	total = sum(latencies)
+	ordered = sorted(latencies)
+
+	result = {
+		'config': config,
+		'ticks': ticks,
+		'seconds': total,
+		'ticksPerSecond': ticks / total,
+		'agentUpdatesPerSecond': agentUpdates / total,
+		'p50Ms': percentile(ordered, 50) * 1000,
+		'p99Ms': percentile(ordered, 99) * 1000,
+		'finalFish': len(world.fishes)
+	}
+
+	if(allocations):
+		result['vectorsPerAgentUpdate'] = vectors.count / float(agentUpdates)
+		print '%s: %.1f vectors per agent update' % (name, result['vectorsPerAgentUpdate'])
+
+	if(lod):
+		result['lodTiers'] = dict((tier, count / float(ticks)) for tier, count in tiers.iteritems())
+		print '%s: %s fish per tick' % (name, ', '.join('%s %.1f' % (tier, result['lodTiers'][tier]) for tier in world.lod.TIERS))
+
+	if(decisions is not None):
+		result['decisionsPerTick'] = decided / float(ticks)
+		print '%s: %.1f fish decided per tick' % (name, result['decisionsPerTick'])
+
+	if(phases):
+		result['phases'] = world.timings.stats()
+		print '\n%s\n%s\n' % (name, world.timings)
+
+	return result
+
+
+# Returns a list of (scenario, message) for anything that got worse than
+# the baseline by more than threshold (a fraction, eg. 0.1 for 10%)
+def findRegressions(results, baseline, threshold):
+
+	regressions = []
+
+	for name, result in sorted(results.iteritems()):
+		before = baseline.get(name)
+		if(before is None): continue
+
+		if(result['ticksPerSecond'] < before['ticksPerSecond'] * (1 - threshold)):
+			regressions.append((name, 'ticks/s %.1f -> %.1f' % (before['ticksPerSecond'], result['ticksPerSecond'])))
+
+		if(result['p99Ms'] > before['p99Ms'] * (1 + threshold)):
+			regressions.append((name, 'p99 %.2fms -> %.2fms' % (before['p99Ms'], result['p99Ms'])))
+
+	return regressions
+
+
+def printTable(results):
+
+	print '%-16s %10s %16s %10s %10s' % ('scenario', 'ticks/s', 'agent updates/s', 'p50 ms', 'p99 ms')
+	for name, config in SCENARIOS:
+		if(name not in results): continue
+		r = results[name]
+		print '%-16s %10.1f %16.0f %10.2f %10.2f' % (name, r['ticksPerSecond'], r['agentUpdatesPerSecond'], r['p50Ms'], r['p99Ms'])
+
+
+
+if __name__ == '__main__':
+
+	names = [name for name, config in SCENARIOS]
+
+	parser = argparse.ArgumentParser(description='Benchmark World.update throughput')
+	parser.add_argument('--scenario', action='append', choices=names, help='run only these (repeatable)')
+	parser.add_argument('--ticks', type=int, default=60)
+	parser.add_argument('--warmup', type=int, default=5)
+	parser.add_argument('--delta', type=float, default=1/60.0)
+	parser.add_argument('--seed', type=int, default=1)
+	parser.add_argument('--guppies', type=int, help='override the guppy count for every scenario')
+	parser.add_argument('--food', type=int, help='override the food count for every scenario')
+	parser.add_argument('--rocks', type=int, help='override the rock count for every scenario')
+	parser.add_argument('--hunters', type=int, help='override the hunter count for every scenario')
+	parser.add_argument('--phases', action='store_true', help='time each phase of the update too')
+	parser.add_argument('--allocations', action='store_true', help='count Vector2Ds made per agent update')
+	parser.add_argument('--lod', action='store_true', help='turn on level of detail and count fish in each tier')
+	parser.add_argument('--decisions', type=float, metavar='MS', help='share out fish decisions with this budget per tick')
+	parser.add_argument('--output', help='write results to this JSON file')
+	parser.add_argument('--save-baseline', help='write results to this JSON file as the new baseline')
+	parser.add_argument('--baseline', help='compare against this baseline JSON file')
+	parser.add_argument('--threshold', type=float, default=0.1, help='allowed regression as a fraction (default 0.1)')
+	args = parser.parse_args()
+
+	results = {}
+
+	for name, config in SCENARIOS:
+		if(args.scenario and name not in args.scenario): continue
+
+		config = dict(config)
+		for key in ('guppies', 'food', 'rocks', 'hunters'):
+			if(getattr(args, key) is not None):
+				config[key] = getattr(args, key)
+
+		results[name] = runScenario(name, config, args.ticks, args.warmup, args.delta, args.seed, args.phases, args.allocations, args.lod, args.decisions)
+
+	printTable(results)
+
+	for path in (args.output, args.save_baseline):
+		if(path is None): continue
+		with open(path, 'w') as f:
+			json.dump(results, f, indent=2, sort_keys=True)
+
+	if(args.baseline):
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+
+		regressions = findRegressions(results, baseline, args.threshold)
+
+		for name, message in regressions:
+			print 'REGRESSION %s: %s' % (name, message)
+
+		if(len(regressions)):
+			sys.exit(1)
+
+		print 'No regressions beyond %d%%' % (args.threshold * 100)
+
@@ -0,0 +1,170 @@
+'''
+
+Blackboard
+=================================='''
+
+from vector2d import Vector2D
+from math import ceil
+from visibility import OcclusionMap
+
+
+"""
+What every agent wants to know about the world each update, worked out
+once at the top of World.update instead of by every agent in turn.
+
+Everything's as it was when the update started. Food that gets eaten
+during the update stays on here until the next one, so check eaten
+before going after it.
+
+	livingFishes	fish that aren't dead
+	food			uneaten food inside the tank
+	awakeHunters	hunters that are awake
+	anyHunterAwake	whether there are any
+	hunterCentroid	average position of every hunter, or None if there
+					aren't any
+	tank			the tank's box (left, right, top and bottom)
+	hunters			the world's hunters and obstacles, which is what
+	obstacles		hidingSpots works out spots for
+
+Hiding spots depend on how big the fish hiding is, so they're worked out
+for each size the first time a fish that size asks, and kept for the rest
+of the update (see hidingSpots). Sizes are rounded up to the next
+HIDING_SIZE px, so a tank of fish that have all eaten different amounts
+still only needs a handful of tables. So is what each hunter can't see past the
+obstacles from where it is (see occlusion).
+
+"""
+class Blackboard(object):
+
+	# Hiding spot tables are made for fish radiuses in steps of this many px
+	HIDING_SIZE = 5.0
+
+	def __init__(self):
+
+		self.livingFishes = []
+		self.food = []
+		self.awakeHunters = []
+		self.anyHunterAwake = False
+		self.hunterCentroid = None
+		self.tank = None
+		self.hunters = []
+		self.obstacles = []
+		self._hidingSpots = {}
+		self._occlusion = {}
+
+
+	def update(self, world):
+
+		tank = world.tank
+
+		self.livingFishes = [f for f in world.fishes if not f.dead]
+		self.food = [f for f in world.food if not f.eaten and tank.contains(f.pos)]
+		self.awakeHunters = [h for h in world.hunters if h.awake]
+		self.anyHunterAwake = len(self.awakeHunters) > 0
+		self.hunterCentroid = self.centroid([h.pos for h in world.hunters])
+		self.tank = tank.box
+		self.hunters = world.hunters
+		self.obstacles = world.obstacles
+		self._hidingSpots = {}
+		self._occlusion = {}
+
+
+	# The HidingSpots for a fish with the given boundingRadius. Rounding
+	# up means the spots always leave at least that much room
+	def hidingSpots(self, radius):
+
+		size = ceil(radius / self.HIDING_SIZE) * self.HIDING_SIZE
+
+		spots = self._hidingSpots.get(size)
+		if(spots is None):
+			spots = self._hidingSpots[size] = HidingSpots(self.hunters, self.obstacles, size)
+
+		return spots
+
+
+	# The OcclusionMap of the obstacles as seen from hunter. Made again if
+	# the hunter's moved since it was last asked for
+	def occlusion(self, hunter):
+
+		occlusion = self._occlusion.get(hunter)
+		if(occlusion is None or occlusion.origin != hunter.pos.tuple()):
+			occlusion = self._occlusion[hunter] = OcclusionMap(hunter.pos, self.obstacles)
+
+		return occlusion
+
+
+	def centroid(self, positions):
+
+		if(not len(positions)): return None
+
+		total = Vector2D().set_from(positions[0])
+		for pos in positions[1:]:
+			total += pos
+		total /= float(len(positions))
+
+		return total
+
+
+
+"""
+Everywhere a fish of a given boundingRadius could hide: just behind each
+obstacle, as seen from each hunter, leaving out spots inside another
+obstacle. Also knows which spots any hunter can see, and which one is
+furthest from the hunter nearest to it.
+
+Nothing in here depends on where the fish is, so every fish the same size
+can share one. Picking a spot is then just a nearest-place lookup.
+
+"""
+class HidingSpots(object):
+
+	def __init__(self, hunters, obstacles, radius):
+
+		places = []
+
+		for hunter in hunters:
+			for obstacle in obstacles:
+				dir = Vector2D().set_sub(obstacle.pos, hunter.pos)
+				length = dir.length() + obstacle.boundingRadius + radius
+				dir.normalise()
+
+				# The spot's on the far side of the obstacle from the hunter
+				place = Vector2D(hunter.pos.x + dir.x * length, hunter.pos.y + dir.y * length)
+
+				if(not True in [ob.containsPoint(place) for ob in obstacles]):
+					places.append(place)
+
+		self.places = places
+
+		# Every hunter's sight counts (there's no spots without hunters)
+		self.visible = [any([h.canSeePosition(p) for h in hunters]) for p in places]
+		self.furthest = max(places, key=lambda p: min([p.distanceSq(h.pos) for h in hunters])) if len(places) else None
+
+
+	def __len__(self):
+		return len(self.places)
+
+
+	# Closest spot to pos, or None if there aren't any
+	def closest(self, pos):
+
+		if(not len(self.places)): return None
+
+		return min(self.places, key=lambda p: p.distanceSq(pos))
+
+
+	# The spots no hunter can see
+	def safe(self):
+
+		return [p for p, seen in zip(self.places, self.visible) if not seen]
+
+
+	# Closest spot to pos no hunter can see, or if they can see them all,
+	# the one furthest from any of them
+	def closestSafe(self, pos):
+
+		safe = self.safe()
+		if(len(safe)):
+			return min(safe, key=lambda p: p.distanceSq(pos))
+
+		return self.furthest
@@ -0,0 +1,567 @@
+'''
+
+Checkpoint
+===============================
+
+Saves a whole World to a compact binary file and loads it back, so a long
+run can be stopped and picked up later (or sent to someone else):
+
+	world.save('tank.fishy')
+	world = World.load('tank.fishy')
+
+Carrying on from a loaded world gives exactly the same simulation as
+carrying on from the one that was saved, timers and random numbers
+included.
+
+The file is an 8 byte magic string and a version, then a list of tagged
+sections, each one a NumPy array in .npy format (so no pickling, and
+each one loads straight into an array):
+
+	META	world settings and scalars (including level of detail and the
+			decision scheduler's queue), as JSON
+	RNGS	Mersenne Twister state of each random stream
+	FISH	one record per guppy
+	HUNT	one record per hunter
+	FOOD	one record per piece of food in the tank, on a guppy's list or
+			that a guppy's decided to go after
+	FDLS	every guppy's food list (indexes into FOOD), guppy after guppy
+	ROCK	one record per rock
+	RKPT	every rock's outline points, rock after rock
+	TIME	pending timers, with the names of their callbacks in META
+	DECS	guppies' decisions kept between DecisionScheduler turns
+
+Readers skip sections they don't know about, and refuse files from a
+newer version than they understand.
+
+'''
+
+import gc
+import json
+import struct
+import numpy as np
+from numpy.lib.format import write_array, read_array
+
+from vector2d import Vector2D, Rect
+from guppy import Guppy
+from hunter import Hunter
+from food import Food
+from rock import Rock
+from lod import LevelOfDetail
+from itertools import count
+
+
+MAGIC = 'FISHYCKP'
+VERSION = 1
+
+# Version and number of sections, straight after the magic string
+HEADER = struct.Struct('<HH')
+
+VECTOR = ('<f8', (2,))
+
+# Fish records keep their level of detail tier as an index into these
+LOD_TIERS = LevelOfDetail.TIERS
+
+FISH = np.dtype([
+	('uid', '<i8'), ('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR),
+	('wander', VECTOR), ('mass', '<f8'), ('maxSpeed', '<f8'), ('size', '<f8'), ('sickness', '<f8'),
+	('dead', '?'), ('parent', '?'), ('color', '<f8', (4,)), ('food', '<i4'),
+	('acceleration', VECTOR), ('lodTier', '<i1')
+])
+
+HUNTER = np.dtype([
+	('uid', '<i8'), ('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR),
+	('wander', VECTOR), ('mass', '<f8'), ('maxSpeed', '<f8'), ('awake', '?'), ('sight', VECTOR)
+])
+
+# Guppies hang on to the food they saw last update, which can include
+# food that's since been eaten and taken out of the tank (inTank)
+FOOD = np.dtype([
+	('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR), ('radius', '<f8'),
+	('eaten', '?'), ('inTank', '?')
+])
+
+ROCK = np.dtype([
+	('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR), ('maxSpeed', '<f8'),
+	('radius', '<f8'), ('edges', '<i4'), ('rotation', '<f8')
+])
+
+# owner is -1 for the world, otherwise the uid of the agent whose method
+# it is. name indexes META's timerNames.
+TIMER = np.dtype([
+	('owner', '<i8'), ('name', '<i4'), ('due', '<f8'), ('interval', '<f8'), ('lastFired', '<f8')
+])
+
+# One record per layer a guppy's decided on (see Guppy.decision). layer
+# indexes DECISION_LAYERS, and only the value for that layer is set:
+# state indexes GUPPY_STATES, food the FOOD section (-1 for none) and
+# place is NaN when there was nowhere to hide.
+DECISION = np.dtype([
+	('uid', '<i8'), ('layer', '<i1'), ('state', '<i1'), ('food', '<i4'), ('place', VECTOR)
+])
+
+DECISION_LAYERS = ('state', 'food', ('hiding', True), ('hiding', False))
+GUPPY_STATES = ('idle', 'seekFood', 'hide', 'dead')
+
+# Plain settings copied straight across
+SETTINGS = (
+	'width', 'height', 'seed', '_clock', 'scale', 'initialRocks', 'initialHunters',
+	'foodDistance', 'autoFeed', 'autoFeedAboveInterval', 'autoFeedBelowInterval',
+	'sicknessEnabled', 'sicknessInterval', 'paused', 'drawDebug', 'drawComponentForces',
+	'drawHidingSpots', 'awokenHunter'
+)
+
+# World.lod's settings, plus how many updates it's counted so far, which
+# decides whose turn it is to think
+LOD_SETTINGS = (
+	'enabled', 'hunterDistance', 'foodDistance', 'farDistance', 'viewportMargin', 'intervals', 'updates'
+)
+
+DECISION_SETTINGS = ('enabled', 'budget', 'limit')
+
+
+
+'''
+
+Saving
+=================================='''
+
+
+def save(world, path):
+
+	meta = dict((name, getattr(world, name)) for name in SETTINGS)
+	meta['stats'] = world.statOverrides
+	meta['tank'] = {'margin': world.tank.margin._data, 'padding': world.tank.padding}
+	meta['lod'] = lodSettings(world.lod)
+	meta['decisions'] = decisionSettings(world.decisions)
+
+	# Peeking at the next uid uses it up, so put it back
+	nextUid = next(world.uids)
+	world.uids = count(nextUid)
+	meta['nextUid'] = nextUid
+
+	rngs, meta['streams'], meta['gauss'] = randomStates(world)
+	timers, meta['timerNames'] = timerRecords(world)
+	meta['schedulerTime'] = world.scheduler.time
+
+	rocks, points = rockRecords(world.obstacles)
+	food, foodLists, foodRows = foodRecords(world)
+
+	sections = [
+		('META', np.frombuffer(json.dumps(meta), dtype=np.uint8)),
+		('RNGS', rngs),
+		('FISH', fishRecords(world, world.fishes)),
+		('HUNT', hunterRecords(world, world.hunters)),
+		('FOOD', food),
+		('FDLS', foodLists),
+		('ROCK', rocks),
+		('RKPT', points),
+		('TIME', timers),
+		('DECS', decisionRecords(world.fishes, foodRows))
+	]
+
+	with open(path, 'wb') as f:
+		f.write(MAGIC)
+		f.write(HEADER.pack(VERSION, len(sections)))
+
+		for tag, array in sections:
+			f.write(tag)
+			write_array(f, array, allow_pickle=False)
+
+
+def lodSettings(lod):
+
+	settings = dict((name, getattr(lod, name)) for name in LOD_SETTINGS)
+	settings['viewport'] = lod.viewport.getBox() if lod.viewport is not None else None
+
+	return settings
+
+
+# Settings, and whose turn it is, by uid
+def decisionSettings(decisions):
+
+	settings = dict((name, getattr(decisions, name)) for name in DECISION_SETTINGS)
+
+	turns, hurried = decisions.pending()
+	settings['turns'] = [f.uid for f in turns]
+	settings['hurried'] = [f.uid for f in hurried]
+
+	return settings
+
+
+def decisionRecords(fishes, foodRows):
+
+	records = []
+
+	for fish in fishes:
+		for layer, value in sorted(fish._decisions.iteritems(), key=lambda d: DECISION_LAYERS.index(d[0])):
+			record = [fish.uid, DECISION_LAYERS.index(layer), -1, -1, (np.nan, np.nan)]
+
+			if(layer == 'state'):
+				record[2] = GUPPY_STATES.index(value)
+			elif(layer == 'food'):
+				record[3] = foodRows[id(value)] if value is not None else -1
+			elif(value is not None):
+				record[4] = value.tuple()
+
+			records.append(tuple(record))
+
+	return np.array(records, dtype=DECISION)
+
+
+# An (n, 2) array, even when there's nothing in it
+def vectors(items):
+
+	return np.array([v.tuple() for v in items], dtype=float).reshape(-1, 2)
+
+
+def randomStates(world):
+
+	names = sorted(world.random._data)
+	states = [world.random[name].getstate() for name in names]
+
+	rngs = np.array([state[1] for state in states], dtype=np.uint32)
+	gauss = [state[2] for state in states]
+
+	return rngs, names, gauss
+
+
+# Everything the agent store has on them, in fishes' order
+def agentRecords(world, agents, dtype):
+
+	records = np.zeros(len(agents), dtype=dtype)
+	if(not len(agents)): return records
+
+	store = world.agents
+	slots = np.array([a.slot for a in agents], dtype=int)
+
+	records['uid'] = [a.uid for a in agents]
+	for name in ('pos', 'vel', 'heading', 'side', 'mass', 'maxSpeed'):
+		records[name] = getattr(store, name)[slots]
+	records['wander'] = [a.wander_target.tuple() for a in agents]
+
+	return records
+
+
+def fishRecords(world, fishes):
+
+	records = agentRecords(world, fishes, FISH)
+
+	records['size'] = [f.size for f in fishes]
+	records['sickness'] = [f.sickness for f in fishes]
+	records['dead'] = [f.dead for f in fishes]
+	records['parent'] = [f.isParent for f in fishes]
+	records['color'] = [f.color for f in fishes]
+	records['food'] = [len(f.food) for f in fishes]
+
+	# What a fish coasting between level of detail turns carries on with
+	records['acceleration'] = vectors([getattr(f, 'acceleration', Vector2D()) for f in fishes])
+	records['lodTier'] = [LOD_TIERS.index(f.lodTier) if f.lodTier is not None else -1 for f in fishes]
+
+	return records
+
+
+def hunterRecords(world, hunters):
+
+	records = agentRecords(world, hunters, HUNTER)
+	records['awake'] = [h.awake for h in hunters]
+	records['sight'] = vectors([h.sightCircle['pos'] for h in hunters])
+
+	return records
+
+
+# The tank's food and anything else on the guppies' lists or that they've
+# decided on, the guppies' lists as indexes into that, and each food's
+# index by id
+def foodRecords(world):
+
+	food = list(world.food)
+	rows = dict((id(f), i) for i, f in enumerate(food))
+
+	listed = [f for fish in world.fishes for f in fish.food]
+	decided = [fish._decisions.get('food') for fish in world.fishes]
+
+	for f in [f for f in listed + decided if f is not None]:
+		if(id(f) not in rows):
+			rows[id(f)] = len(food)
+			food.append(f)
+
+	records = np.zeros(len(food), dtype=FOOD)
+
+	for name in ('pos', 'vel', 'heading', 'side'):
+		records[name] = vectors([getattr(f, name) for f in food])
+	records['radius'] = [f.boundingRadius for f in food]
+	records['eaten'] = [f.eaten for f in food]
+	records['inTank'][:len(world.food)] = True
+
+	lists = np.array([rows[id(f)] for f in listed], dtype=np.int32)
+
+	return records, lists, rows
+
+
+# Rocks, and their outlines (which turn as they're drawn) all in one array
+def rockRecords(rocks):
+
+	records = np.zeros(len(rocks), dtype=ROCK)
+
+	for name in ('pos', 'vel', 'heading', 'side'):
+		records[name] = vectors([getattr(r, name) for r in rocks])
+	records['maxSpeed'] = [r.maxSpeed for r in rocks]
+	records['radius'] = [r.boundingRadius for r in rocks]
+	records['edges'] = [len(r.rockShape) for r in rocks]
+	records['rotation'] = [r.rotation for r in rocks]
+
+	points = vectors([p for r in rocks for p in r.rockShape])
+
+	return records, points
+
+
+def timerRecords(world):
+
+	names = []
+	records = []
+
+	for due, interval, func, lastFired in world.scheduler.pending():
+		owner = func.im_self
+		if(func.__name__ not in names): names.append(func.__name__)
+
+		records.append((
+			-1 if owner is world else owner.uid,
+			names.index(func.__name__),
+			due,
+			np.nan if interval is None else interval,
+			lastFired
+		))
+
+	return np.array(records, dtype=TIMER), names
+
+
+
+'''
+
+Loading
+=================================='''
+
+
+def read(path):
+
+	sections = {}
+
+	with open(path, 'rb') as f:
+		if(f.read(len(MAGIC)) != MAGIC):
+			raise ValueError('%s is not a fishy checkpoint' % path)
+
+		version, total = HEADER.unpack(f.read(HEADER.size))
+		if(version > VERSION):
+			raise ValueError('%s is a version %d checkpoint, this only reads up to version %d' % (path, version, VERSION))
+
+		for _ in xrange(total):
+			tag = f.read(4)
+			sections[tag] = read_array(f, allow_pickle=False)
+
+	return sections
+
+
+# Builds a new worldClass (World, or something like it) from a checkpoint
+def load(worldClass, path):
+
+	sections = read(path)
+	meta = json.loads(sections['META'].tostring())
+
+	# Making thousands of agents sets off lots of pointless garbage
+	# collections, none of them are garbage
+	collecting = gc.isenabled()
+	gc.disable()
+	try:
+		return build(worldClass, sections, meta)
+	finally:
+		if(collecting): gc.enable()
+
+
+def build(worldClass, sections, meta):
+
+	world = worldClass(meta['width'], meta['height'], seed=meta['seed'], rocks=0, hunters=0, stats=statOverrides(meta['stats']))
+
+	for name in SETTINGS:
+		setattr(world, name, meta[name])
+
+	world.tank.padding = meta['tank']['padding']
+	world.tank.margin._data.update(meta['tank']['margin'])
+	world.tank.resize()
+
+	# Files from before level of detail or the decision scheduler have none
+	if('lod' in meta):
+		loadLevelOfDetail(world.lod, meta['lod'])
+
+	world.obstacles = loadRocks(world, sections['ROCK'], sections['RKPT'])
+	world.fishes = loadFish(world, sections['FISH'])
+	world.hunters = loadHunters(world, sections['HUNT'])
+	food = loadFood(world, sections['FOOD'], sections['FDLS'], sections['FISH'])
+	if('decisions' in meta):
+		loadDecisions(world, meta['decisions'], sections['DECS'], food)
+	world.livingFishes = [f for f in world.fishes if not f.dead]
+
+	# Making all of those rolled the dice and handed out uids, so these
+	# go back last
+	loadTimers(world, sections['TIME'], meta)
+	loadRandomStates(world, sections['RNGS'], meta)
+	world.uids = count(meta['nextUid'])
+
+	return world
+
+
+# JSON turns guppy stat pairs into lists
+def statOverrides(stats):
+
+	return dict((kind, dict((k, tuple(v) if isinstance(v, list) else v) for k, v in values.iteritems())) for kind, values in stats.iteritems())
+
+
+def loadAgents(world, agents, records):
+
+	if(not len(agents)): return
+
+	store = world.agents
+	slots = np.array([a.slot for a in agents], dtype=int)
+
+	for name in ('pos', 'vel', 'heading', 'side', 'mass', 'maxSpeed'):
+		getattr(store, name)[slots] = records[name]
+
+	for agent, uid, wander in zip(agents, records['uid'].tolist(), records['wander'].tolist()):
+		agent.uid = uid
+		agent.wander_target.set(*wander)
+
+
+def loadLevelOfDetail(lod, settings):
+
+	for name in LOD_SETTINGS:
+		setattr(lod, name, settings[name])
+
+	box = settings['viewport']
+	if(box is not None):
+		lod.viewport = Rect(dict(zip(('left', 'top', 'right', 'bottom'), box)))
+
+
+def loadDecisions(world, settings, records, food):
+
+	decisions = world.decisions
+	for name in DECISION_SETTINGS:
+		setattr(decisions, name, settings[name])
+
+	fishes = dict((f.uid, f) for f in world.fishes)
+	decisions.restore([fishes[uid] for uid in settings['turns']], [fishes[uid] for uid in settings['hurried']])
+
+	for uid, layer, state, eat, place in records.tolist():
+		layer = DECISION_LAYERS[layer]
+
+		if(layer == 'state'):
+			value = GUPPY_STATES[state]
+		elif(layer == 'food'):
+			value = food[eat] if eat != -1 else None
+		else:
+			value = Vector2D(*place) if not np.isnan(place[0]) else None
+
+		fishes[uid]._decisions[layer] = value
+
+
+# Stats come from size, but colour and being sick or dead are set
+# directly, since the setters would roll new colours
+def loadFish(world, records):
+
+	fishes = [Guppy(world=world, scale=10) for _ in xrange(len(records))]
+
+	columns = [records[name].tolist() for name in ('size', 'sickness', 'dead', 'parent', 'color')]
+	for fish, size, sickness, dead, parent, color in zip(fishes, *columns):
+		if(size != fish.size): fish.size = size
+		fish.isParent = parent
+		fish._sickness = sickness
+		fish._dead = dead
+		fish.color = tuple(color)
+
+	if('lodTier' in records.dtype.names):
+		for fish, acceleration, tier in zip(fishes, records['acceleration'].tolist(), records['lodTier'].tolist()):
+			fish.acceleration = fish._acceleration.set(*acceleration)
+			fish.lodTier = LOD_TIERS[tier] if tier != -1 else None
+
+	# After the stats, which set mass and speed from size
+	loadAgents(world, fishes, records)
+
+	return fishes
+
+
+def loadHunters(world, records):
+
+	hunters = [Hunter(world=world) for _ in xrange(len(records))]
+
+	for hunter, awake, sight in zip(hunters, records['awake'].tolist(), records['sight'].tolist()):
+		hunter.awake = awake
+		hunter.sightCircle['pos'] = Vector2D(*sight)
+
+	loadAgents(world, hunters, records)
+
+	return hunters
+
+
+def loadFood(world, records, lists, fishRecords):
+
+	food = []
+
+	for record in records:
+		f = Food(world=world)
+		f.pos, f.vel, f.heading, f.side = [Vector2D(*record[name]) for name in ('pos', 'vel', 'heading', 'side')]
+		f.boundingRadius = float(record['radius'])
+		f.eaten = bool(record['eaten'])
+		food.append(f)
+
+	world.food = [f for f, inTank in zip(food, records['inTank'].tolist()) if inTank]
+
+	start = 0
+	for fish, length in zip(world.fishes, fishRecords['food'].tolist()):
+		fish.food = [food[i] for i in lists[start:start + length].tolist()]
+		start += length
+
+	return food
+
+
+def loadRocks(world, records, points):
+
+	rocks = []
+	start = 0
+
+	for record in records:
+		rock = Rock(world=world)
+		rock.pos, rock.vel, rock.heading, rock.side = [Vector2D(*record[name]) for name in ('pos', 'vel', 'heading', 'side')]
+		rock.maxSpeed = float(record['maxSpeed'])
+		rock.boundingRadius = float(record['radius'])
+		rock.rotation = float(record['rotation'])
+
+		rock.edges = int(record['edges'])
+		rock.rockShape = [Vector2D(x, y) for x, y in points[start:start + rock.edges].tolist()]
+		start += rock.edges
+
+		rocks.append(rock)
+
+	return rocks
+
+
+# Swaps the timers everyone's just set up for the saved ones
+def loadTimers(world, records, meta):
+
+	# Worlds used to keep their timers on pyglet's clock with a window,
+	# and those couldn't be saved
+	scheduler = world.scheduler
+	if(meta['schedulerTime'] is None): return
+
+	owners = dict((a.uid, a) for a in world.fishes + world.hunters)
+	names = meta['timerNames']
+
+	scheduler.clear()
+	scheduler.time = meta['schedulerTime']
+
+	for owner, name, due, interval, lastFired in records.tolist():
+		func = getattr(world if owner == -1 else owners[owner], names[name])
+		scheduler.restore(due, None if np.isnan(interval) else interval, func, lastFired)
+
+
+def loadRandomStates(world, rngs, meta):
+
+	for name, state, gauss in zip(meta['streams'], rngs.tolist(), meta['gauss']):
+		world.random[name].setstate((3, tuple(state), gauss))
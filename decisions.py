@@ -0,0 +1,142 @@
+'''
+
+Decision Scheduler
+=================================='''
+
+from collections import deque
+from timeit import default_timer as timer
+
+
+"""
+Shares out the expensive part of fish AI, deciding what to do, over
+several updates.
+
+Normally every guppy works out its state, the food it's after and where
+it'd hide every update. With this on, each update only some of the fish
+get a turn to decide (see Guppy.decide). Fish queue up for turns in the
+order they join the world, go to the back once they've had one, and
+leave the queue when they die or leave the world, so the next update
+carries on where the last one stopped. Everyone else sticks with what
+they decided last time, but still steers towards it every update.
+
+Turns are handed out until budget milliseconds have gone, or limit fish
+have had one (either can be None), or everyone's had one. At least one
+fish gets a turn every update. A budget makes runs depend on how fast the
+machine is, so set budget to None and use limit for repeatable ones.
+
+A few fish go first:
+
+	the debug fish, so what's drawn for it is always up to date
+	fish that hurry asked for, because what they decided on has gone
+	(eg. someone else ate their food)
+
+It's off until enabled is set, and a world with it off behaves exactly as
+it did without it. decided has how many fish had a turn last update.
+
+"""
+class DecisionScheduler(object):
+
+	def __init__(self, world=None, budget=2.0, limit=None, enabled=False):
+
+		self.world = world
+		self.enabled = enabled
+		self.budget = budget
+		self.limit = limit
+
+		self.decided = 0
+
+		# Fish waiting for a turn, next first, and the same fish as a set
+		self._turns = deque()
+		self._queued = set()
+		self._hurried = []
+
+
+	# Give fish its turn as soon as possible
+	def hurry(self, fish):
+
+		if(fish not in self._hurried):
+			self._hurried.append(fish)
+
+
+	# The fish waiting for a turn, next first, that are still alive in the
+	# world, and the ones that have been hurried
+	def pending(self):
+
+		living = set([f for f in self.world.fishes if not f.dead])
+
+		return [f for f in self._turns if f in living], [f for f in self._hurried if f in living]
+
+
+	# Replaces the queue with turns and hurried, as given by pending
+	def restore(self, turns, hurried):
+
+		self._turns = deque(turns)
+		self._queued = set(turns)
+		self._hurried = list(hurried)
+
+
+	# Hands out this update's turns
+	def run(self):
+
+		if(not self.enabled): return
+
+		fishes = self.world.blackboard.livingFishes
+
+		deadline = None
+		if(self.budget is not None):
+			deadline = timer() + self.budget / 1000.0
+
+		limit = self.limit
+		if(limit is None or limit > len(fishes)):
+			limit = len(fishes)
+
+		living = set(fishes)
+
+		hurried = [f for f in self._hurried if f in living]
+		first = [f for f in fishes if f.chosenOne] + hurried
+
+		# Anyone new (born, or swum in from another shard) joins the back
+		joining = [f for f in fishes if f not in self._queued]
+		self._turns.extend(joining)
+		self._queued.update(joining)
+
+		decided = set()
+
+		for fish in first:
+			if(not self.turnsLeft(decided, limit, deadline)): break
+			if(fish in decided): continue
+
+			fish.decide()
+			decided.add(fish)
+
+		turns = self._turns
+
+		for _ in xrange(len(turns)):
+			if(not self.turnsLeft(decided, limit, deadline)): break
+
+			# Dead, or gone from the world, since they queued up
+			fish = turns.popleft()
+			if(fish not in living):
+				self._queued.discard(fish)
+				continue
+
+			turns.append(fish)
+			if(fish in decided): continue
+
+			fish.decide()
+			decided.add(fish)
+
+		# Anyone we didn't get to stays at the front of the queue
+		self._hurried = [f for f in hurried if f not in decided]
+		self.decided = len(decided)
+
+
+	# Whether there's time for another turn, after the fish in decided.
+	# There always is for the first one.
+	def turnsLeft(self, decided, limit, deadline):
+
+		if(not len(decided)): return True
+
+		if(len(decided) >= limit): return False
+
+		return deadline is None or timer() < deadline
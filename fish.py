@@ -11,9 +11,11 @@ in sub-classes to create behaviour
 from vector2d import Vector2D, Rect
 from graphics import egi, COLOR_NAMES
 from math import sin, cos, radians, sqrt, pi
-from random import uniform
 from transformations2d import *
 from geometry import *
+from flocking import DESIRED_SEPARATION, SEPARATION_GAIN
+from blackboard import HidingSpots
+from timeit import default_timer as timer
 
 # Constants
 BIG_FLOAT = float(32000)
@@ -34,12 +36,23 @@ class Fish(object):
 
 		# Keep a reference to the world object
 		self.world = world
+		self.uid = next(world.uids)
+
+		# Ghosts are copies of an agent another shard owns, see shards.py
+		self.ghost = False
+
+		# Our position, velocity etc. live in the world's agent store
+		self.slot = world.agents.allocate()
+		self._pos = world.agents.view('pos', self.slot)
+		self._vel = world.agents.view('vel', self.slot)
+		self._heading = world.agents.view('heading', self.slot)
+		self._side = world.agents.view('side', self.slot)
 
 		# Randomize our initial direction
-		dir = radians(uniform(0, 360))
+		dir = radians(world.random.spawn.uniform(0, 360))
 
 		# Basic properties
-		self.pos = world.tank.randomPosition()
+		self.pos = world.tank.randomPosition(world.random.spawn)
 		self.vel = Vector2D()
 		self.heading = Vector2D(sin(dir),cos(dir))
 		self.side = self.heading.perp()
@@ -66,6 +79,9 @@ class Fish(object):
 		self.vehicle_shape = [ Vector2D(-1.0, 0.6),	Vector2D( 1.0, 0.0), Vector2D(-1.0,-0.6) ]  # generic shape
 		self.chosenOne = False
 
+		# Which of the world's level of detail tiers we were in last update
+		self.lodTier = None
+
 		# Wander
 		self.wander_target = Vector2D(1,0)
 		self.wanderDistance = 1.0 * scale # adjust
@@ -91,21 +107,102 @@ class Fish(object):
 		# Life
 		self._dead = False
 
+		# Vectors the steering behaviours write their results into, so
+		# they don't make new ones every update. A result is only good
+		# until that behaviour runs again, so copy() anything you keep.
+		self._seek = Vector2D()
+		self._steerTo = Vector2D()
+		self._arrive = Vector2D()
+		self._projected = Vector2D()
+		self._wander = Vector2D()
+		self._flock = Vector2D()
+		self._flockForces = (Vector2D(), Vector2D(), Vector2D())
+		self._steering = Vector2D()
+		self._force = Vector2D()
+		self._acceleration = Vector2D()
+		self._velocity = Vector2D()
+		self._walls = Vector2D()
+		self._feelers = [Vector2D(), Vector2D(), Vector2D()]
+
 
 	
 
+	'''
+	Stored state
+	===============================
+	Assigning copies the values into our row of the agent store,
+	so the views themselves never get replaced
+	'''
+
+	@property
+	def pos(self):
+		return self._pos
+
+	@pos.setter
+	def pos(self, value):
+		self._pos.x = value.x
+		self._pos.y = value.y
+
+	@property
+	def vel(self):
+		return self._vel
+
+	@vel.setter
+	def vel(self, value):
+		self._vel.x = value.x
+		self._vel.y = value.y
+
+	@property
+	def heading(self):
+		return self._heading
+
+	@heading.setter
+	def heading(self, value):
+		self._heading.x = value.x
+		self._heading.y = value.y
+
+	@property
+	def side(self):
+		return self._side
+
+	@side.setter
+	def side(self, value):
+		self._side.x = value.x
+		self._side.y = value.y
+
+	@property
+	def mass(self):
+		return self.world.agents.mass.item(self.slot)
+
+	@mass.setter
+	def mass(self, value):
+		self.world.agents.mass[self.slot] = value
+
+	@property
+	def maxSpeed(self):
+		return self.world.agents.maxSpeed.item(self.slot)
+
+	@maxSpeed.setter
+	def maxSpeed(self, value):
+		self.world.agents.maxSpeed[self.slot] = value
+
+
+
 	# Separate function for calculating acceleration
 	def calculateAcceleration(self, delta):
 
 		self.force = self.wander(delta)
 
-		return self.force / self.mass
+		acceleration = self._acceleration.set_from(self.force)
+		acceleration /= self.mass
+
+		return acceleration
 
 
 	# Calculates velocity based on our acceleration
 	def calculateVelocity(self, delta):
 		# new velocity
-		vel = self.vel + self.acceleration * delta
+		vel = self._velocity.set_from(self.vel).add_scaled(self.acceleration, delta)
 		
 		# check for limits of new velocity
 		max = self.maxSpeed
@@ -120,6 +217,14 @@ class Fish(object):
 	'''
 
 	
+	# Replaces some of our _stats with the world's overrides for our kind
+	# (see World's stats argument). Call it after setting up _stats.
+	def overrideStats(self, kind):
+
+		for key, value in self.world.statOverrides.get(kind, {}).iteritems():
+			self._stats[key] = value
+
+
 	# Called after data loaded, but before position and state are calculated
 	def performActions(self):
 		pass
@@ -130,62 +235,121 @@ class Fish(object):
 
 	# Called at the beginning of update
 	def beforeUpdate(self):
-		egi.set_stroke(1) # we want our debug info to be 1px
+		pass
 
 
 	def update(self, delta):
 
 		self.beforeUpdate()
 
-		# Grab our neighbours for flocking
-		self.neighbours = self.world.getNeighbours(self, self.neighbourDistance) 
+		self.findNeighbours()
 		
 		self.performActions()
 
+		self.steer(delta)
+
+		self.integrate(delta)
+
+
+	# A cheap stand-in for update, for when the world's level of detail
+	# says we're not worth a proper look around this time (see lod.py).
+	# We carry on accelerating the way we last decided to.
+	def coast(self, delta):
+
+		self.vel = self.calculateVelocity(delta)
+
+		self.integrate(delta)
+
+
+	# Same as update, but adds the time spent in each phase to timings,
+	# named after our class (eg. guppy.steering)
+	def timedUpdate(self, delta, timings):
+
+		prefix = self.__class__.__name__.lower() + '.'
+
+		start = timer()
+		self.beforeUpdate()
+		start = timings.lap(prefix + 'state', start)
+
+		self.findNeighbours()
+		start = timings.lap(prefix + 'neighbours', start)
+
+		self.performActions()
+		start = timings.lap(prefix + 'state', start)
 
+		self.steer(delta)
+		start = timings.lap(prefix + 'steering', start)
+
+		self.integrate(delta)
+		timings.lap(prefix + 'integration', start)
+
+
+	# Grab our neighbours for flocking
+	def findNeighbours(self):
+
+		self.neighbours = self.world.getNeighbours(self, self.neighbourDistance) 
+
+
+	# Work out where we want to go
+	def steer(self, delta):
 
-		# Update vehicle position and orientation
 		self.acceleration = self.calculateAcceleration(delta)
 
 		self.vel = self.calculateVelocity(delta)
-		
+
+
+	# Update vehicle position and orientation
+	def integrate(self, delta):
 		
 		# update position
-		self.pos += self.vel * delta
+		self.pos.add_scaled(self.vel, delta)
 
 		self.collisionDetection()
 
 		# update heading is non-zero velocity (moving)
 		if self.vel.lengthSq() > 0.00000001:
-			self.heading = self.vel.get_normalised()
-			self.side = self.heading.perp()
+			self.heading.set_from(self.vel).normalise()
+			self.side.set_perp(self.heading)
 		
 		# treat world as continuous space - wrap new position if needed
 		if(not self._dead): self.world.wrap_around(self.pos)
 
+		# Let the world know where we ended up for neighbour lookups
+		self.world.agentMoved(self)
+
 
 	def pointsInWorldSpace(self, points, position):
 
 		return self.world.transform_points(points, position, self.heading, self.side, self.scale)
 
 
-	def drawBody(self, color=None):
-		egi.set_pen_color(color)
+	# The colour to draw our body in, debug highlights win over color
+	def bodyColor(self, color=None):
 
-		if(self.world.drawDebug):
-			if(self.isNeighbour): 
-				egi.blue_pen()
-			if(self.tagged):
-				egi.green_pen()
 		if(self.chosenOne): 
 			if(self.world.drawDebug or self.world.drawComponentForces):
-				egi.white_pen()
+				return COLOR_NAMES['WHITE']
+		if(self.world.drawDebug):
+			if(self.tagged):
+				return COLOR_NAMES['GREEN']
+			if(self.isNeighbour): 
+				return COLOR_NAMES['BLUE']
+
+		return color
+
+
+	# Queues our outline in the world's body batch, which gets drawn in one
+	# go once everyone's had a turn (see World.render)
+	def drawBody(self, color=None):
 
 		pts = self.pointsInWorldSpace(self.vehicle_shape, self.renderPosition)
 		# pts = self.world.transform_points(self.vehicle_shape, self.renderPosition, self.heading, self.side, self.scale)
 		# draw it!
-		egi.closed_shape(pts)
+		bodyColor = self.bodyColor(color)
+		self.world.bodies.add(pts, bodyColor)
 
+		# Eyes still draw straight away, with the body's colour as the pen
+		egi.set_pen_color(bodyColor)
 		self.drawEye(color)
 
 
@@ -276,13 +440,15 @@ class Fish(object):
 
 	def seek(self, target_pos):
 		''' move towards target position '''
-		desired_vel = (target_pos - self.pos).normalise() * self.maxSpeed
-		return (desired_vel - self.vel)
+		desired_vel = self._seek.set_sub(target_pos, self.pos).normalise()
+		desired_vel *= self.maxSpeed
+		desired_vel -= self.vel
+		return desired_vel
 
 
 
 	def steer_to(self, target):
-		desired = target - self.pos # A vector pointing from the location to the target
+		desired = self._steerTo.set_sub(target, self.pos) # A vector pointing from the location to the target
 		d = desired.length()  # Distance from the target is the magnitude of the vector
 
 		# If the distance is greater than 0, calc steering (otherwise return zero vector)
@@ -296,10 +462,11 @@ class Fish(object):
 				desired *= (self.maxSpeed)
 
 			# Steering = Desired minus Velocity
-			steer = desired - self.vel
+			steer = desired
+			steer -= self.vel
 			steer.truncate(self.maxForce)  # Limit to maximum steering force
 		else:
-			steer = Vector2D()
+			steer = desired.set(0., 0.)
 
 		return steer
 
@@ -308,7 +475,7 @@ class Fish(object):
 		''' this behaviour is similar to seek() but it attempts to arrive at
 			the target position with a zero velocity'''
 		decel_rate = self.DECELERATION_SPEEDS[speed]
-		to_target = target_pos - self.pos
+		to_target = self._arrive.set_sub(target_pos, self.pos)
 		dist = to_target.length()
 		if dist > 0:
 			# calculate the speed required to reach the target given the
@@ -319,18 +486,23 @@ class Fish(object):
 			# from here proceed just like Seek except we don't need to
 			# normalize the to_target vector because we have already gone to the
 			# trouble of calculating its length for dist.
-			desired_vel =  (to_target * speed / dist)
-			return (desired_vel - self.vel)
-		return Vector2D(0,0)
+			desired_vel = to_target
+			desired_vel *= speed
+			desired_vel /= dist
+			desired_vel -= self.vel
+			return desired_vel
+		return to_target.set(0, 0)
 
 
-	def projectedPosition(self, target):
+	# Pass out to have the result written into it instead of a new vector
+	def projectedPosition(self, target, out=None):
 		
-		toEvader = target.pos - self.pos
+		distance = self.pos.distance(target.pos)
 
-		lookAheadTime = toEvader.length() / (self.maxSpeed + target.speed())
+		lookAheadTime = distance / (self.maxSpeed + target.speed())
 
-		lookAheadPos = target.pos + target.vel * lookAheadTime 
+		if(out is None): out = Vector2D()
+		lookAheadPos = out.set_from(target.pos).add_scaled(target.vel, lookAheadTime)
 
 		return lookAheadPos
 
@@ -339,7 +511,7 @@ class Fish(object):
 
 		
 
-		projected = self.projectedPosition(target)
+		projected = self.projectedPosition(target, out=self._projected)
 
 		if(self.world.drawDebug and self.chosenOne):
 			egi.red_pen()
@@ -381,7 +553,9 @@ class Fish(object):
 		jitter_tts = self.wander_jitter * delta # this time slice
 		
 		# first, add a small random vector to the target's position
-		wt += Vector2D(uniform(-1,1) * jitter_tts, uniform(-1,1) * jitter_tts)
+		rng = self.world.random.wander
+		wt.x += rng.uniform(-1,1) * jitter_tts
+		wt.y += rng.uniform(-1,1) * jitter_tts
 
 		# re-project this new vector back on to a unit circle
 		wt.normalise()
@@ -391,21 +565,23 @@ class Fish(object):
 		wt *= self.wanderRadius
 
 		# move the target into a position WanderDist in front of the agent
-		target = wt + Vector2D(self.wanderDistance, 0)
+		target = self._wander.set(wt.x + self.wanderDistance, wt.y)
 		
 		# project the target into world space
-		wld_target = self.world.transform_point(target, self.pos, self.heading, self.side) # and steer towards it
+		wld_target = self.world.transform_point(target, self.pos, self.heading, self.side, out=target) # and steer towards it
 
 		# wld_target = wld_target.normalise() * self.maxWanderSpeed
 
-		force = wld_target - self.pos
+		force = wld_target
+		force -= self.pos
 
 		# force.truncate(self.maxWanderSpeed)
 
 		force.truncate(self.maxForce) # <-- new force limiting code... return force
 
 		self.wandering = True
-		return force * self.wanderInfluence # <-- You might want to weight this...
+		force *= self.wanderInfluence # <-- You might want to weight this...
+		return force
 
 
 	'''
@@ -415,10 +591,16 @@ class Fish(object):
 
 	def flock(self, delta):
 
-		
-		alignment = self.alignmentForce()
-		separation = self.separationForce()
-		cohesion = self.cohesionForce()
+		# Use the world's batched flocking pass if it has us,
+		# otherwise (eg. we were born this update) work it out ourselves
+		forces = self.world.flockingForcesFor(self, out=self._flockForces)
+
+		if(forces is not None):
+			alignment, separation, cohesion = forces
+		else:
+			alignment = self.alignmentForce()
+			separation = self.separationForce()
+			cohesion = self.cohesionForce()
 
 		if(self.chosenOne and self.world.drawComponentForces):
 			s = 0.1
@@ -432,7 +614,10 @@ class Fish(object):
 			egi.line_with_arrow(self.pos, self.pos + self.force * s, 10)
 			egi.circle(self.pos, self.neighbourDistance)
 
-		return alignment + separation + cohesion
+		total = self._flock.set_from(alignment)
+		total += separation
+		total += cohesion
+		return total
 
 
 	def alignmentForce(self):
@@ -456,8 +641,7 @@ class Fish(object):
 		avg = Vector2D()
 		count = 0
 
-		# Radius within which to steer away
-		DESIRED_SEPARATION = 60
+		# Radius within which to steer away is DESIRED_SEPARATION
 		if(self.world.drawDebug and self.chosenOne):
 			egi.circle(self.pos, DESIRED_SEPARATION)
 
@@ -479,7 +663,7 @@ class Fish(object):
 
 		
 
-		avg *= 20000
+		avg *= SEPARATION_GAIN
 
 		avg.truncate(self.maxForce)
 		
@@ -677,13 +861,16 @@ class Fish(object):
 		feelerAngle = pi/4
 		feelerShorter = 0.6
 
+		feelers = center, left, right = self._feelers
+
 		# Main center feeler
-		center = self.pos + self.heading.copy() * feelerLength
+		center.set_from(self.pos).add_scaled(self.heading, feelerLength)
 		# Slightly shorter angled feelers
-		left = self.pos + self.heading.copy().rotate(feelerAngle) * feelerLength * feelerShorter
-		right = self.pos + self.heading.copy().rotate(-feelerAngle) * feelerLength * feelerShorter
-
-		feelers = [center, left, right]
+		for feeler, angle in ((left, feelerAngle), (right, -feelerAngle)):
+			feeler.set_from(self.heading).rotate(angle)
+			feeler *= feelerLength
+			feeler *= feelerShorter
+			feeler += self.pos
 
 		if(self.chosenOne and self.world.drawDebug):
 			egi.aqua_pen()
@@ -703,8 +890,8 @@ class Fish(object):
 
 		distanceToClosest = BIG_FLOAT 
 		
-		steeringForce = Vector2D() 
-		closestPoint = Vector2D()
+		steeringForce = self._walls.set(0., 0.) 
+		closestPoint = None
 
 		# for each feeler, test against all walls
 		for feeler in feelers: 
@@ -725,12 +912,12 @@ class Fish(object):
 			# new closest intersection point?
 			if closestWall:
 				# calculate the penetration depth for this feeler 
-				overshoot = (feeler - closestPoint).length()
+				overshoot = feeler.distance(closestPoint)
 
 				# create force in direction of the wall normal 
 				norm = closestWall.normal
 				
-				steeringForce += norm * overshoot 
+				steeringForce.add_scaled(norm, overshoot)
 
 
 		return steeringForce
@@ -739,29 +926,39 @@ class Fish(object):
 
 	def hide(self, hunters, obstacles, closest=True):
 
-		hidingPlaces = []
+		return self.hideAt(self.chooseHidingPlace(hunters, obstacles, closest=closest))
 
-		for hunter in hunters:
-			for obstacle in obstacles:
-				dir = hunter.pos.distanceTo(obstacle.pos).get_normalised()
-				length = hunter.pos.distance(obstacle.pos) + obstacle.boundingRadius + self.boundingRadius
-				
-				# Calculate the position of the hiding spot
-				place = hunter.pos + dir * length
 
-				# If this spot isn't inside any other obstacles, then add it to the list
-				if(not True in [ob.containsPoint(place) for ob in obstacles]):
-					hidingPlaces.append(place)
+	# Steers to place, or nowhere if there isn't one
+	def hideAt(self, place):
 
-		self.hidingPlaces = hidingPlaces # store for debugging purposes
+		if(place is None):
+			return self._arrive.set(0, 0)
+
+		return self.arrive(place, 'fast')
 
-		# Find the 'best' hiding place from our list
-		self.bestPlace = self.bestHidingPlaceFromHunter(hidingPlaces=hidingPlaces, hunter=hunters[0], closest=closest)
 
-		# print 'bestPlace', self.bestPlace
+	# Where hide would go, or None if there's nowhere to hide (or no-one
+	# to hide from)
+	def chooseHidingPlace(self, hunters, obstacles, closest=True):
 
-		# seek = self.seek(self.bestPlace)
-		arrive = self.arrive(self.bestPlace, 'fast')
+		# Hiding from the world's hunters behind its rocks, which everyone
+		# our size shares a table of spots for this update
+		board = self.world.blackboard
+		if(hunters is board.hunters and obstacles is board.obstacles):
+			spots = board.hidingSpots(self.boundingRadius)
+		else:
+			spots = HidingSpots(hunters, obstacles, self.boundingRadius)
+
+		self.hidingPlaces = spots.places # store for debugging purposes
+
+		# Nowhere to hide (or no-one to hide from)
+		if(not len(spots)):
+			self.bestPlace = None
+			return None
+
+		# Find the 'best' hiding place from our list
+		self.bestPlace = self.bestHidingPlaceFromHunter(spots, closest=closest)
 
 		if(self.chosenOne and self.world.drawHidingSpots):
 			for place in self.hidingPlaces or []:
@@ -769,32 +966,22 @@ class Fish(object):
 				if(place == self.bestPlace): egi.green_pen()
 				egi.cross(place, 10)
 
-		return arrive
+		return self.bestPlace
 
 
 
-	def bestHidingPlaceFromHunter(self, hidingPlaces, hunter, closest=True):
-
-		
-
-		closestPlaces = sorted(hidingPlaces, key=lambda p: p.distanceSq(self.pos))
+	def bestHidingPlaceFromHunter(self, spots, closest=True):
 
 		if(closest):
-			return closestPlaces[0]
-		
-		# Get the closest places that are out of range of the hunter
-		safePlaces = [place for place in closestPlaces if not hunter.canSeePosition(place)]
+			return spots.closest(self.pos)
 
 		if(self.chosenOne and self.world.drawHidingSpots):
 			egi.blue_pen()
-			[egi.circle(p, 10) for p in safePlaces]
-
-		# If there actually are some safe places then choose the closest (they'll still be in order)
-		if(len(safePlaces)):
-			return safePlaces[0]
+			[egi.circle(p, 10) for p in spots.safe()]
 
-		# If all hiding places are close to the hunter, then just pick the furthest
-		return max(hidingPlaces, key=lambda p: p.distanceSq(hunter.pos))
+		# The closest place out of sight of every hunter, or if there's
+		# none, the furthest from them
+		return spots.closestSafe(self.pos)
 
 
 
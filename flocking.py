@@ -0,0 +1,122 @@
+'''
+
+Flocking
+=================================='''
+
+import numpy as np
+
+
+# Radius within which fish steer away from each other
+DESIRED_SEPARATION = 60
+
+# How strongly the (averaged) separation vector gets scaled up
+SEPARATION_GAIN = 20000
+
+
+"""
+Batched version of Fish.alignmentForce, separationForce and cohesionForce.
+
+Works on per-fish arrays (one row per fish) plus a list of candidate
+neighbour pairs (first < second). Each pair's offset and distance is
+worked out once and then applied to both fish, depending on whether the
+other fish is inside each one's own neighbourDistance.
+
+Returns (alignment, separation, cohesion) as (n, 2) arrays.
+
+"""
+def flockingForces(pos, vel, maxSpeed, neighbourDistance, maxForce,
+                   alignmentInfluence, cohesionInfluence, first, second):
+
+	n = len(pos)
+
+	# Offset from first to second, shared by both directions of the pair
+	offset = pos[second] - pos[first]
+	distanceSq = (offset * offset).sum(axis=1)
+
+	# Which way round the pair counts as 'neighbours'
+	firstSees = distanceSq < neighbourDistance[first]**2
+	secondSees = distanceSq < neighbourDistance[second]**2
+
+	owner = np.concatenate((first[firstSees], second[secondSees]))
+	other = np.concatenate((second[firstSees], first[secondSees]))
+	away = np.concatenate((-offset[firstSees], offset[secondSees])) # points from other to owner
+	distanceSq = np.concatenate((distanceSq[firstSees], distanceSq[secondSees]))
+
+	# Sum neighbours in the same order a fish's neighbour list would
+	order = np.lexsort((other, owner))
+	owner = owner[order]
+	other = other[order]
+	away = away[order]
+	distanceSq = distanceSq[order]
+	distance = np.sqrt(distanceSq)
+
+	# Alignment: average neighbour velocity
+	valid = distanceSq > 0.01
+	count, total = sumByOwner(owner[valid], vel[other[valid]], n)
+	alignment = average(total, count) * alignmentInfluence[:, None]
+	alignment = truncate(alignment, maxForce)
+
+	# Separation: push away from close neighbours, weighted by inverse distance
+	valid = (distance > 0) & (distance < DESIRED_SEPARATION)
+	d = distance[valid][:, None]
+	count, total = sumByOwner(owner[valid], away[valid] / d / d, n)
+	separation = average(total, count) * SEPARATION_GAIN
+	separation = truncate(separation, maxForce)
+
+	# Cohesion: seek the average neighbour position
+	valid = distance > 0.1
+	count, total = sumByOwner(owner[valid], pos[other[valid]], n)
+	centre = average(total, count)
+
+	desired = normalise(centre - pos) * maxSpeed[:, None]
+	cohesion = (desired - vel) * cohesionInfluence[:, None]
+	cohesion[count == 0] = 0.
+
+	return alignment, separation, cohesion
+
+
+
+# Returns (count, total) per owner of the given (m, 2) values
+def sumByOwner(owner, values, n):
+
+	count = np.bincount(owner, minlength=n)
+	total = np.column_stack((
+		np.bincount(owner, weights=values[:, 0], minlength=n),
+		np.bincount(owner, weights=values[:, 1], minlength=n)
+	))
+
+	return count, total
+
+
+def average(total, count):
+
+	result = np.zeros_like(total)
+	has = count > 0
+	result[has] = total[has] / count[has][:, None].astype(float)
+
+	return result
+
+
+# Same as Vector2D.normalise, zero-length vectors stay zero
+def normalise(vectors):
+
+	length = np.sqrt((vectors * vectors).sum(axis=1))
+	result = np.zeros_like(vectors)
+	nonZero = length > 0
+	result[nonZero] = vectors[nonZero] / length[nonZero][:, None]
+
+	return result
+
+
+# Same as Vector2D.truncate, applied row by row
+def truncate(vectors, maxLength):
+
+	length = np.sqrt((vectors * vectors).sum(axis=1))
+	over = length > maxLength
+	limit = maxLength[over] if np.ndim(maxLength) else maxLength
+
+	vectors = vectors.copy()
+	vectors[over] = vectors[over] / length[over][:, None] * np.reshape(limit, (-1, 1))
+
+	return vectors
+
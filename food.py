@@ -6,7 +6,6 @@ Food
 # Vendor imports
 from vector2d import Vector2D
 from graphics import egi, rgba
-from random import uniform
 from math import sqrt, sin
 
 
@@ -20,12 +19,16 @@ class Food(object):
 		
 		self.world = world
 
+		# Only set when something needs to tell food apart across worlds
+		# (see shards.py)
+		self.uid = None
+
 		self.pos = Vector2D()
 		self.vel = Vector2D()
 
 		self.maxAirSpeed = 500
 		self.maxWaterSpeed = 40
-		self.boundingRadius = uniform(3, 7)
+		self.boundingRadius = world.random.food.uniform(3, 7)
 
 		self.color = rgba('ffe400')
 		self.eaten = False
@@ -71,7 +74,6 @@ class Food(object):
 
 
 	def render(self):
-		egi.set_pen_color(self.color)
 
 		frequency = 5
 		pulse = sin(self.world._clock * frequency)
@@ -80,7 +82,7 @@ class Food(object):
 		pulse = 1 + (pulse * range) 
 		r = self.boundingRadius * pulse
 		
-		egi.circle(self.pos, r, filled=True)
+		self.world.circles.add(self.pos, r, self.color)
 
 
 	def speed(self):
@@ -0,0 +1,37 @@
+'''
+
+Food times
+=================================='''
+
+import numpy as np
+
+
+"""
+Batched version of Guppy.timeAwayFromFood, for every fish and food at once.
+
+Each fish pursues each food the same way Fish.projectedPosition does:
+look ahead by the time it'd take to close the current gap at both
+speeds combined, and aim for where the food will be by then.
+
+Takes (n, 2) fish positions with their (n,) max speeds, and (m, 2) food
+positions and velocities. Returns (time, position, distance) where time
+and distance are (n, m) and position is the (n, m, 2) projected food
+position each fish is aiming for.
+
+"""
+def arrivalTimes(fishPos, maxSpeed, foodPos, foodVel):
+
+	foodSpeed = np.sqrt((foodVel * foodVel).sum(axis=1))
+
+	toFood = foodPos[None, :, :] - fishPos[:, None, :]
+	lookAheadTime = np.sqrt((toFood * toFood).sum(axis=2)) / (maxSpeed[:, None] + foodSpeed[None, :])
+
+	position = foodPos[None, :, :] + foodVel[None, :, :] * lookAheadTime[:, :, None]
+
+	offset = position - fishPos[:, None, :]
+	distance = np.sqrt((offset * offset).sum(axis=2))
+
+	time = distance / maxSpeed[:, None]
+
+	return time, position, distance
+
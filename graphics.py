@@ -10,12 +10,32 @@ Note: This has not been designed for performance! In particular, excessive
 text drawing will be very expensive. If you need better performance, you
 should implement opengl code for yourself.
 
+Set FISHY_HEADLESS=1 in the environment (or import headless first) to run
+without a display. pyglet is never imported in that case, KEY is None and
+egi becomes a NullGraphics that silently ignores every drawing call.
+
 '''
-from pyglet.gl import *
-from pyglet import font, media, window, clock
+import os
 from math import cos, sin, pi
+import numpy as np
+
+HEADLESS = os.environ.get('FISHY_HEADLESS', '') not in ('', '0')
+
+if not HEADLESS:
+    from pyglet.gl import *
+    from pyglet import font, media, window, clock
+    import pyglet
 
-KEY = window.key # the key codes
+    KEY = window.key # the key codes
+else:
+    KEY = None
+
+# Unit circle outline shared by every circle drawn, as a loop of points
+# and as GL_LINES pairs (each point followed by the next one round)
+CIRCLE_SLICES = 32
+_angles = np.linspace(0, 2*pi, CIRCLE_SLICES, endpoint=False)
+UNIT_CIRCLE = np.column_stack((np.cos(_angles), np.sin(_angles))).astype(np.float32)
+UNIT_CIRCLE_LINES = np.column_stack((UNIT_CIRCLE, np.roll(UNIT_CIRCLE, -1, axis=0))).reshape(-1, 2)
 
 # Some preset colors
 COLOR_NAMES = { 'BLACK':  (0.0, 0.0, 0.0, 1),
@@ -85,10 +105,6 @@ class EasyGraphics(object):
         # prep the text object
         self.text = font.Text(font.load('Proxima Nova',12), '', color=(1,1,1,1),
                               valign='bottom', halign='left')
-        # prep the quadric object used by glu* functions (circle)
-        # styles GLU_LINE, GLU_FILL, GLU_SILHOUETTE, GLU_POINT
-        self.qobj = gluNewQuadric()
-        gluQuadricDrawStyle(self.qobj, GLU_SILHOUETTE)
 
     def dot(self, x=0, y=0, pos=None, color=None):
         ''' Draw a single pixel at a given location. will use pos (with x and y
@@ -199,11 +215,37 @@ class EasyGraphics(object):
         glPopClientAttrib()
 
     def circle(self, pos, radius, filled=False, slices=0):
+        ''' Circle outline (same as the old gluDisk silhouette), drawn from
+            the cached unit circle so there's nothing to tessellate. '''
         glPushMatrix()
         glTranslatef(pos.x, pos.y, 0.0)
-        gluDisk(self.qobj, 0, radius, 32, 1) # default style (filled? line?)
+        glScalef(radius, radius, 1.0)
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, UNIT_CIRCLE.ctypes.data)
+        glDrawArrays(GL_LINE_LOOP, 0, CIRCLE_SLICES)
+        glPopClientAttrib()
         glPopMatrix()
 
+    def circles(self, positions, radii, colors):
+        ''' Draw lots of circle outlines with a single call. Takes a list of
+            positions (with x and y values), and a radius and (R,G,B,A)
+            colour for each. '''
+        if len(positions) == 0: return
+        centres = np.array([(p.x, p.y) for p in positions], dtype=np.float32)
+        radii = np.asarray(radii, dtype=np.float32)
+        pts = centres[:, None, :] + UNIT_CIRCLE_LINES[None, :, :] * radii[:, None, None]
+        cols = np.repeat(np.asarray(colors, dtype=np.float32), len(UNIT_CIRCLE_LINES), axis=0)
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, pts.ctypes.data)
+        glColorPointer(4, GL_FLOAT, 0, cols.ctypes.data)
+        glDrawArrays(GL_LINES, 0, len(cols))
+        glPopClientAttrib()
+        # the colour array leaves the current colour undefined, put it back
+        glColor4f(*self.curr_color)
+
     # ----- COLOUR/STROKE STUFF -----
     def set_pen_color(self, color=None, name=None):
         if name is not None:
@@ -239,6 +281,148 @@ class EasyGraphics(object):
         self.text.draw()
 
 
+'''
+Batched outlines
+'''
+class ShapeBatch(object):
+    ''' Collects closed outlines (eg. every fish body) and draws them all
+        with a single glDrawArrays call, instead of one call per shape.
+        Each loop is stored as GL_LINES pairs so different shapes don't
+        join up, with a colour per vertex. The vertex and colour buffers
+        are kept between frames and only grow when they run out of room. '''
+
+    def __init__(self, capacity=1024):
+        self.vertices = np.zeros((capacity, 2), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.count = 0
+
+    def add(self, points, color):
+        ''' Queue a closed outline (a list of points with x and y values)
+            in the given (R,G,B,A) colour. '''
+        n = len(points)
+        if n < 2: return
+        start, end = self.count, self.count + 2*n
+        if end > len(self.vertices):
+            self._grow(end)
+        # each point starts one line and ends the one before it
+        pts = [(p.x, p.y) for p in points]
+        self.vertices[start:end:2] = pts
+        self.vertices[start+1:end:2] = pts[1:] + pts[:1]
+        self.colors[start:end] = color
+        self.count = end
+
+    def flush(self):
+        ''' Draw everything queued so far and empty the batch. '''
+        if self.count == 0: return
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, self.vertices.ctypes.data)
+        glColorPointer(4, GL_FLOAT, 0, self.colors.ctypes.data)
+        glDrawArrays(GL_LINES, 0, self.count)
+        glPopClientAttrib()
+        # the colour array leaves the current colour undefined, put it back
+        glColor4f(*egi.curr_color)
+        self.count = 0
+
+    def _grow(self, needed):
+        size = len(self.vertices)
+        while size < needed:
+            size *= 2
+        vertices = np.zeros((size, 2), dtype=np.float32)
+        colors = np.zeros((size, 4), dtype=np.float32)
+        vertices[:self.count] = self.vertices[:self.count]
+        colors[:self.count] = self.colors[:self.count]
+        self.vertices, self.colors = vertices, colors
+
+
+class CircleBatch(object):
+    ''' Collects circles (eg. every food pellet and fish eye) through a
+        frame so they can all be drawn by one egi.circles call. '''
+
+    def __init__(self):
+        self.positions = []
+        self.radii = []
+        self.colors = []
+
+    def add(self, pos, radius, color):
+        self.positions.append(pos)
+        self.radii.append(radius)
+        self.colors.append(color)
+
+    def flush(self):
+        ''' Draw everything queued so far and empty the batch. '''
+        if len(self.positions) == 0: return
+        egi.circles(self.positions, self.radii, self.colors)
+        self.positions, self.radii, self.colors = [], [], []
+
+
+'''
+Cached text
+'''
+class TextLayer(object):
+    ''' Text that gets drawn every frame but rarely changes. Each label is
+        a pyglet Label in a shared Batch, looked up by key, and is only
+        touched when its text, position or colour actually changes, so
+        drawing the layer is a single batch draw. '''
+
+    def __init__(self, font_name='Proxima Nova', font_size=12):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.labels = {}
+        self.batch = None
+
+    def set(self, key, x, y, text, color=None, name=None):
+        ''' Show text at x, y (negative y is from the top, same as
+            text_at_pos). Colour is (R,G,B,A) with values 0.0 to 1.0. '''
+        if name is not None:
+            color = COLOR_NAMES[name]
+        color = tuple(int(round(c * 255)) for c in color)
+        if self.batch is None:
+            self.batch = pyglet.graphics.Batch()
+        if y < 0:
+            y = egi.window.height + y
+        label = self.labels.get(key)
+        if label is None:
+            self.labels[key] = pyglet.text.Label(text, font_name=self.font_name,
+                font_size=self.font_size, x=x, y=y, color=color,
+                anchor_x='left', anchor_y='bottom', batch=self.batch)
+            return
+        if label.text != text: label.text = text
+        if tuple(label.color) != color: label.color = color
+        if label.x != x or label.y != y:
+            label.begin_update()
+            label.x, label.y = x, y
+            label.end_update()
+
+    def remove(self, key):
+        label = self.labels.pop(key, None)
+        if label is not None:
+            label.delete()
+
+    def clear(self):
+        [label.delete() for label in self.labels.values()]
+        self.labels = {}
+
+    def draw(self):
+        if self.batch is not None and len(self.labels):
+            self.batch.draw()
+
+
+'''
+Headless stand-in
+'''
+class NullGraphics(object):
+    ''' Accepts any EasyGraphics call and does nothing, so update code that
+        draws debug info doesn't need to care whether there's a window. '''
+
+    def __getattr__(self, name):
+        return self._noop
+
+    def _noop(self, *args, **kwargs):
+        pass
+
+
 # create an instance for anyone to use
-egi = EasyGraphics()
+egi = NullGraphics() if HEADLESS else EasyGraphics()
 
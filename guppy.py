@@ -5,7 +5,7 @@ Guppy
 # Vendor imports
 
 from math import sin, cos, sqrt, pi
-from random import uniform, choice
+from random import choice
 from matrix33 import Matrix33
 from graphics import egi, rgba
 from copy import deepcopy
@@ -15,10 +15,26 @@ from vector2d import Vector2D
 # Our imports
 
 from fish import Fish
+from shapecache import swayFrames, shapeAssets
 
 
 
 class Guppy(Fish):
+
+	# Colors, parsed once for every guppy
+	sickColor = rgba('2fc900')
+	deadColor = rgba('973500')
+	eyeColor = rgba('fff', 0.5)
+	parentColor = rgba('f43ca0')
+	parentSickColor = rgba('27c8f0')
+	regularColors = [
+		rgba('ffae00'),
+		rgba('ff8400')
+	]
+
+	# What's in _stats, each one a child/parent pair
+	STAT_NAMES = ('body', 'mass', 'speed', 'flockingInfluence', 'wanderDistance', 'wanderRadius', 'neighbourDistance')
+
 	def __init__(self, world=None, scale=30.0, mass=1.0):
 
 		self.super = super(Guppy, self)
@@ -27,15 +43,6 @@ class Guppy(Fish):
 		print 'Guppy, ' + choice(['I choose you!', 'get out there!', 'do your thang!', 'swim allll up in this!', 'not splash again!', 'evolve already! God.'])
 
 		# Set up some rendering properties
-
-		# Colors
-		self.sickColor = rgba('2fc900')
-		self.deadColor = rgba('973500')
-		self.regularColors = [
-			rgba('ffae00'),
-			rgba('ff8400')
-		]
-		
 		self.initShape()
 		
 		self._sicknessDomain = (0.0, 100.0)
@@ -64,6 +71,7 @@ class Guppy(Fish):
 			'wanderRadius': (2.2 * self.scaleValue, 2.4 * self.scaleValue),
 			'neighbourDistance': (100, 300)
 		})
+		self.overrideStats('guppy')
 
 		# Set up the states
 		# Acceleratino forces will be 
@@ -102,6 +110,16 @@ class Guppy(Fish):
 
 		self._size = self._sizes[0]
 		self.maxCenterForce = 250
+
+		# More steering results, see Fish
+		self._centre = Vector2D()
+		self._foodForce = Vector2D()
+		self._survival = Vector2D()
+		self._avoidHunters = Vector2D()
+
+		# What we decided last time the world's DecisionScheduler gave us
+		# a turn, by layer (see decision)
+		self._decisions = {}
 		
 
 		
@@ -160,13 +178,13 @@ class Guppy(Fish):
 		self.recalculateColor()
 		
 	
-	def colorForSickness(self, sickness, colorScale):
+	def colorForSickness(self, sickness, healthyColor, sickColor):
 		# Make sure it's within range
-		sick = Util.clamp(self._sicknessDomain[0], sickness, self._sicknessDomain[1])
+		d = self._sicknessDomain
+		sick = Util.clamp(d[0], sickness, d[1])
 		
 		# Interpolate colors
-		c = colorScale
-		return (c['r'](sick), c['g'](sick), c['b'](sick), c['a'](sick))
+		return tuple([Util.linearValue(d, (healthy, sickly), sick) for healthy, sickly in zip(healthyColor, sickColor)])
 
 
 
@@ -181,40 +199,28 @@ class Guppy(Fish):
 		healthyColor = self.getHealthyColor()
 		sickColor = self.getSickColor()
 
-
-		d = self._sicknessDomain
-
-		colorScale = {
-			'r': Util.linearScale(d, (healthyColor[0], sickColor[0])),
-			'g': Util.linearScale(d, (healthyColor[1], sickColor[1])),
-			'b': Util.linearScale(d, (healthyColor[2], sickColor[2])),
-			'a': Util.linearScale(d, (healthyColor[3], sickColor[3]))
-		}
-
-		self.color = self.colorForSickness(self.sickness, colorScale)
+		self.color = self.colorForSickness(self.sickness, healthyColor, sickColor)
 
 	def getSickColor(self):
-		parentSickColor = rgba('27c8f0')
 
 		if(self.isParent):
-			return parentSickColor
+			return self.parentSickColor
 
 		return self.sickColor
 
 
 	def getHealthyColor(self):
 
-		parentColor = rgba('f43ca0')
-
 		if(self.isParent):
-			return parentColor
+			return self.parentColor
 
 		colors = self.regularColors
+		rng = self.world.random.colors
 
-		return (uniform(colors[0][0], colors[1][0]),
-				uniform(colors[0][1], colors[1][1]),
-				uniform(colors[0][2], colors[1][2]),
-				uniform(0.8, 1.0))
+		return (rng.uniform(colors[0][0], colors[1][0]),
+				rng.uniform(colors[0][1], colors[1][1]),
+				rng.uniform(colors[0][2], colors[1][2]),
+				rng.uniform(0.8, 1.0))
 
 
 	def performActions(self):
@@ -236,7 +242,7 @@ class Guppy(Fish):
 			state = 'seekFood'
 
 		# If any hunters are awake
-		if(True in [h.awake for h in self.world.hunters]):
+		if(self.world.blackboard.anyHunterAwake):
 			state = 'hide'
 
 			# But if we're super sick, then 
@@ -247,10 +253,46 @@ class Guppy(Fish):
 
 	def currentState(self):
 
-		self._state = self.calculateCurrentState()
+		# Dying can't wait for our next turn to decide
+		if(self.dead):
+			self._state = 'dead'
+		else:
+			self._state = self.decision('state', self.calculateCurrentState)
 
 		return self._states[self._state]
 
+
+	# Runs decide (which works out one layer of what we're up to) and
+	# returns what it came up with. If the world's DecisionScheduler is on,
+	# it's only run when it's our turn, and until then we stick with the
+	# last answer (see decisions.py).
+	def decision(self, layer, decide):
+
+		if(not self.world.decisions.enabled):
+			return decide()
+
+		if(layer not in self._decisions):
+			self._decisions[layer] = decide()
+
+		return self._decisions[layer]
+
+
+	# Our turn from the DecisionScheduler: make fresh decisions for
+	# everything our current state steers by
+	def decide(self):
+
+		self._decisions = {}
+		self.food = self.world.getFood(self)
+
+		state = self.decision('state', self.calculateCurrentState)
+		if(state == 'dead'): return
+
+		self.decision('food', lambda: self.findBestFood(self.food))
+
+		# Only scaredSteer hides anywhere but the closest spot
+		closest = state != 'hide'
+		self.decision(('hiding', closest), lambda: self.chooseHidingPlace(self.world.hunters, self.world.obstacles, closest=closest))
+
 	
 
 	# Calculates the value of a stat for a particular size
@@ -260,11 +302,9 @@ class Guppy(Fish):
 		sizeRange = self._sizes 	# domain
 		statRange = self._stats[key]	# range
 
-		scale = Util.linearScale(sizeRange, statRange)
-
 		clampedSize = Util.clamp(sizeRange[0], size, sizeRange[1])
 
-		return scale(clampedSize)
+		return Util.linearValue(sizeRange, statRange, clampedSize)
 
 
 	# Shorthand for statForSize, using the current size
@@ -347,7 +387,8 @@ class Guppy(Fish):
 		wallForce = self.wallSteer(delta)
 
 		# Calculate the net force
-		netForce = stateForce + wallForce 
+		netForce = self._force.set_from(stateForce)
+		netForce += wallForce 
 
 		# Save for debugging purposes
 		self.force = netForce
@@ -355,18 +396,20 @@ class Guppy(Fish):
 		# Calculate our mass based on our current state
 		mass = self.mass * self.state['massMultiplier']
 
-		
+		acceleration = self._acceleration.set_from(netForce)
+		acceleration /= mass
 
-		return netForce / mass
+		return acceleration
 
 
 	# Calculates velocity based on our acceleration
 	def calculateVelocity(self, delta):
 
 		# new velocity
-		vel = self.vel + self.acceleration * delta
+		vel = self._velocity.set_from(self.vel).add_scaled(self.acceleration, delta)
 		
-		# check for limits of new velocity based on current state
+		# check for limits of new velocity based on current state, which
+		# sees this update's food and how sick we are after eating
 		max = self.maxSpeed * self.currentState().speedMultiplier
 		vel.truncate(max)
 
@@ -376,7 +419,7 @@ class Guppy(Fish):
 
 			offsetAngle = (cos((self.world._clock) * frequency / 2)) * 0.1 + 0.1
 			
-			vel *= (1 + offsetAngle + uniform(0, 0.1))
+			vel *= (1 + offsetAngle + self.world.random.movement.uniform(0, 0.1))
 
 
 		return vel
@@ -399,15 +442,20 @@ class Guppy(Fish):
 		hideForce =  self.hidingSteer(delta, closest=False)
 		avoidHuntersForce, hunterDist = self.avoidHuntersSteer(delta)
 
-		return hideForce + avoidHuntersForce
+		steer = self._steering.set_from(hideForce)
+		steer += avoidHuntersForce
+		return steer
 
 
 	def survivalSteer(self, delta):
 		avoidHunters, hunterDist = self.avoidHuntersSteer(delta)
 		# avoidHunters *
-		hideForce =  self.hidingSteer(delta) / (hunterDist / 20000) / (avoidHunters.length() / 100)
+		hideForce =  self.hidingSteer(delta)
+		hideForce /= (hunterDist / 20000)
+		hideForce /= (avoidHunters.length() / 100)
 
-		steer = avoidHunters + hideForce 
+		steer = self._survival.set_from(avoidHunters)
+		steer += hideForce 
 
 		if(self.chosenOne and self.world.drawHidingSpots):
 			egi.green_pen()
@@ -435,19 +483,19 @@ class Guppy(Fish):
 	# Steers away from hunters, getting stronger as you get closer
 	def avoidHuntersSteer(self, delta):
 
-		hunterPositions = [h.pos for h in self.world.hunters]
-		count = len(hunterPositions)
+		centroid = self.world.blackboard.hunterCentroid
 
-		if(count == 0):
+		if(centroid is None):
 			return Vector2D()
 		
-		total = reduce(lambda x, y: x + y, hunterPositions)
-		avg = total / float(count)
+		avg = self._avoidHunters.set_from(centroid)
 
-		distance = self.pos.distanceTo(avg)
+		distance = avg.set_sub(avg, self.pos)
 		lengthSq = distance.lengthSq()**1.1
 
-		steer = -5000000 * distance.normalise() / lengthSq
+		steer = distance.normalise()
+		steer *= -5000000
+		steer /= lengthSq
 
 		
 
@@ -458,7 +506,8 @@ class Guppy(Fish):
 	# Avoids the tank walls. The force gets stronger the closer you are to them
 	def wallSteer(self, delta):
 
-		wallForce = self.wallAvoidance(self.world.tank.getWalls('vertical')) * 2
+		wallForce = self.wallAvoidance(self.world.tank.getWalls('vertical'))
+		wallForce *= 2
 
 		if(self.chosenOne and self.world.drawDebug):
 			egi.red_pen()
@@ -477,7 +526,7 @@ class Guppy(Fish):
 	def keepInsideTank(self):
 		p = self.pos
 
-		tank = self.world.tank.box
+		tank = self.world.blackboard.tank
 		
 		if(p.y > tank.top):
 			p.y = tank.top
@@ -498,7 +547,9 @@ class Guppy(Fish):
 
 	def hidingSteer(self, delta, closest=True):
 
-		hiding = self.hide(hunters=self.world.hunters, obstacles=self.world.obstacles, closest=closest)
+		hunters, obstacles = self.world.hunters, self.world.obstacles
+		place = self.decision(('hiding', closest), lambda: self.chooseHidingPlace(hunters, obstacles, closest=closest))
+		hiding = self.hideAt(place)
 
 		if(self.chosenOne and self.world.drawDebug):
 			egi.red_pen()
@@ -509,9 +560,11 @@ class Guppy(Fish):
 
 	def idleSteer(self, delta):
 
-		wanderForce = self.wander(delta) * self.state['wanderInfluence']
+		wanderForce = self.wander(delta)
+		wanderForce *= self.state['wanderInfluence']
 		
-		flockForce = self.flock(delta) * self.flockingInfluence
+		flockForce = self.flock(delta)
+		flockForce *= self.flockingInfluence
 
 		# obstaclesForce = self.obstacleAvoidance(self.world.solids)
 		
@@ -526,12 +579,13 @@ class Guppy(Fish):
 		valueX = -Util.sign(percentFromCenterX)*(self.maxCenterForce * percentFromCenterX**2)
 		valueY = -Util.sign(percentFromCenterY)*(self.maxCenterForce * percentFromCenterY**2)
 		
-		centerForce = Vector2D(valueX, valueY)
+		centerForce = self._centre.set(valueX, valueY)
 		
 		
 		survivalSteer = self.survivalSteer(delta)
 
-		foodForce = self.foodSteer(delta) * (1 + self.sickness / 10)
+		foodForce = self.foodSteer(delta)
+		foodForce *= (1 + self.sickness / 10)
 
 		self.maxSpeed = self.stat('speed') - (self.sickness / 2)
 		
@@ -539,7 +593,11 @@ class Guppy(Fish):
 
 
 
-		netForce = wanderForce + flockForce + centerForce + survivalSteer + foodForce
+		netForce = self._steering.set_from(wanderForce)
+		netForce += flockForce
+		netForce += centerForce
+		netForce += survivalSteer
+		netForce += foodForce
 
 		# print 'self.flockingInfluence', self.flockingInfluence
 
@@ -575,6 +633,11 @@ class Guppy(Fish):
 
 	# Returns the first fish to arrive at a partiular food, based on their speed and distance away
 	def firstFishToFood(self, food, fishes):
+
+		times = self.world.foodTimesTo(food, fishes)
+		if(times is not None):
+			return fishes[times.argmin()]
+
 		# Use the projection values for distance
 		return min(fishes, key=lambda fish: self.timeAwayFromFood(food=food, fish=fish)['time'])
 
@@ -587,6 +650,11 @@ class Guppy(Fish):
 
 	# Returns all fish that will get to a particular food before us
 	def fasterFishToFood(self, food, fishes):
+
+		times = self.world.foodTimesTo(food, fishes)
+		if(times is not None and self in self.world.foodTimes['rows']):
+			ownTime = times[self.world.foodTimes['rows'][self]]
+			return [{'fish': fishes[i], 'time': times.item(i)} for i in (times < ownTime).nonzero()[0]]
 		
 		return [{'fish': fish, 'time': self.timeAwayFromFood(food=food, fish=fish)['time']} 
 			for fish 
@@ -604,6 +672,16 @@ class Guppy(Fish):
 
 	def timeAwayFromFood(self, fish, food):
 
+		# Already worked out at the start of this update?
+		index = self.world.foodTimeIndex(fish, food)
+		if(index is not None):
+			t = self.world.foodTimes
+			return {
+				'time': t['time'].item(index),
+				'foodPosition': Vector2D(*t['position'][index].tolist()),
+				'distance': t['distance'].item(index)
+			}
+
 		pos = fish.projectedPosition(food)
 		projectedDistance = fish.pos.distance(pos)
 		return {
@@ -621,6 +699,13 @@ class Guppy(Fish):
 	# Based on the difference between the average time taken for each fish 
 	# closer than us to get there and our own time to get there
 	def foodHeuristic(self, food, allFish):
+
+		# Straight from this update's food times if we can
+		times = self.world.foodTimesTo(food, allFish)
+		row = self.world.foodTimes['rows'].get(self) if times is not None else None
+		if(row is not None):
+			faster = times[times < times.item(row)].tolist()
+			return times.item(row) - sum(faster) / max(len(faster), 1)
 		
 		ownTime = self.timeAwayFromFood(food=food, fish=self)
 		fasterFish = self.fasterFishToFood(food=food, fishes=allFish)
@@ -646,32 +731,26 @@ class Guppy(Fish):
 
 		allFish = self.world.livingFishes
 
-		foodsWithData = [{'food': food, 'data': self.timeAwayFromFood(fish=self, food=food)} for food in foods]
-
-		foodsInRange = [f for f in foodsWithData if f['data']['foodPosition'].y > self.world.tank.box.bottom]
+		# Already know how far everything is?
+		known = self.world.foodTimesFrom(self, foods)
+		if(known is not None):
+			closestFoods = self.closestFoodsFrom(foods, *known)
+		else:
+			closestFoods = [f['food'] for f in self.closestFoodsWithData(foods)]
 
 		# If all food will be out of bounds, then don't aim for any
-		if(len(foodsInRange) == 0):
-			return None 
-
-		# Sort the food from closest to furthest, based on the time it'll take us to get there
-		# Ideally we'd to it based on timeAwayFromFood(), but our maxSpeed is the same, 
-		# so it's faster to not to the divide calulation at all and just use distance
-		closestFoods = sorted(foodsInRange, key=lambda food: food['data']['time'])
-
+		if(len(closestFoods) == 0):
+			return None
 
 		# Go through from closest foods to furthest
 		# If someone else will get there first, see if I'm closer to the next one
 		for food in closestFoods:
 			# What's the closest fish to the food right now?
-			firstFish = self.firstFishToFood(food=food['food'], fishes=allFish)
+			firstFish = self.firstFishToFood(food=food, fishes=allFish)
 
 			# If we're already first, then just aim for this one
 			if(firstFish == self):
-				return food['food']
-
-			# Otherwise look at the next piece of food
-			pass
+				return food
 
 
 		# If we get to this point, then we won't be first to any of the foods!
@@ -679,26 +758,44 @@ class Guppy(Fish):
 		# Now we should just aim for the least crowded food
 		# That way there'll be less competition around us for the next food
 		# Uses a heuristic defined above, based on time averages
+		# Smaller is better here, and we'll just have to make peace with
+		# not being first :(
+		return min(closestFoods, key=lambda food: self.foodHeuristic(food, allFish))
 
 
-		# Get the heuristics values for each food
-		heuristics = [{'foodAndData': food, 'heuristicValue': self.foodHeuristic(food['food'], allFish)} for food in closestFoods]
+	# The foods we'll catch inside the tank, soonest first, from arrays of
+	# our times and projected positions to each of them
+	def closestFoodsFrom(self, foods, time, position):
 
-		# Smaller is better here
-		best = min(heuristics, key=lambda f: f['heuristicValue'])
-		bestFood = best['foodAndData']['food']
+		inRange = (position[:, 1] > self.world.blackboard.tank.bottom).nonzero()[0]
+		order = inRange[time[inRange].argsort(kind='mergesort')]
 
+		return [foods[i] for i in order.tolist()]
 
-		# Now just make peace with not being first :(
-		return bestFood
+
+	# Same as closestFoodsFrom, working each time out as we go
+	def closestFoodsWithData(self, foods):
+
+		foodsWithData = [{'food': food, 'data': self.timeAwayFromFood(fish=self, food=food)} for food in foods]
+
+		foodsInRange = [f for f in foodsWithData if f['data']['foodPosition'].y > self.world.blackboard.tank.bottom]
+
+		# Sort the food from closest to furthest, based on the time it'll take us to get there
+		return sorted(foodsInRange, key=lambda food: food['data']['time'])
 
 
 	def foodSteer(self, delta):
 
-		steeringForce = Vector2D()
+		steeringForce = self._foodForce.set(0., 0.)
 
-		bestFood = self.findBestFood(self.food)
+		bestFood = self.decision('food', lambda: self.findBestFood(self.food))
 
+		# Someone beat us to what we decided on earlier. Go without until
+		# we've had a rethink
+		decisions = self.world.decisions
+		if(decisions.enabled and bestFood is not None and bestFood.eaten):
+			bestFood = None
+			decisions.hurry(self)
 
 		if(bestFood is not None):
 			steeringForce = self.pursuit(bestFood)
@@ -721,7 +818,8 @@ class Guppy(Fish):
 		
 
 
-		wanderForce = self.wander(delta) * self.state['wanderInfluence']
+		wanderForce = self.wander(delta)
+		wanderForce *= self.state['wanderInfluence']
 		
 
 		
@@ -736,7 +834,9 @@ class Guppy(Fish):
 		foodForce = self.foodSteer(delta)
 
 
-		netForce = foodForce + wanderForce + avoidHuntersForce
+		netForce = self._steering.set_from(foodForce)
+		netForce += wanderForce
+		netForce += avoidHuntersForce
 		
 
 		return netForce
@@ -752,15 +852,18 @@ class Guppy(Fish):
 
 	def spurtBaby(self, babyFish):
 		babyFish.pos = self.pos.copy()
+		rng = self.world.random.spawn
 
-		angle = uniform(0, 2*pi)
+		angle = rng.uniform(0, 2*pi)
 		direction = Vector2D(cos(angle), sin(angle))
 
 		max = babyFish.maxSpeed
-		speed = uniform(max * 0.5, max)
+		speed = rng.uniform(max * 0.5, max)
 
 		babyFish.vel = direction * speed
 
+		# We've moved the baby, so make sure the neighbour grid knows
+		self.world.agentMoved(babyFish)
 
 		return babyFish
 
@@ -787,8 +890,6 @@ class Guppy(Fish):
 
 	def swayShape(self):
 
-		# TODO: Optimise this somehow. 
-		# At the very least cache it so that both sway functions can use it without recalculating
 		sqrtSpeed = self.speedSqrt
 
 		# Speed up fins as we slow down, illusion of swimming harder
@@ -809,14 +910,10 @@ class Guppy(Fish):
 		swayRange = sqrtSpeed / 80
 		# print 'swayRange', swayRange
 
-		matrix = Matrix33()
-		matrix.scale_update(1 + (swayAngle * 0.2 * sqrt(swayRange)), 1)
-		# self.matrix.rotate_update(swayAngle * swayRange)
+		stretch = 1 + (swayAngle * 0.2 * sqrt(swayRange))
 
-		shape = deepcopy(self.fishShape)
-		matrix.transform_vector2d_list(shape)
-		
-		return shape
+		# Shared prebuilt frame, see shapecache
+		return swayFrames.frame(id(self.fishShape), self.fishShape, stretch)
 
 
 
@@ -845,8 +942,7 @@ class Guppy(Fish):
 			egi.set_pen_color(self.color)
 			egi.cross(self.renderPosition + self.side * self.body, self.body * 5)
 		else:	
-			egi.set_pen_color(rgba('fff', 0.5))
-			egi.circle(self.renderPosition + self.side * self.body, self.body)
+			self.world.circles.add(self.renderPosition + self.side * self.body, self.body, self.eyeColor)
 
 
 	def calculateRenderPosition(self):
@@ -860,8 +956,15 @@ class Guppy(Fish):
 		self.vehicle_shape = self.swayShape()
 
 
+	# Our outline is parsed once and shared with every other guppy
 	def initShape(self):
 
+		self.baseFishShape = shapeAssets.base('guppy', self.buildBaseShape)
+
+
+	# Build our shape from the poly string
+	def buildBaseShape(self):
+
 		# Made the string using BeTravis's excellent path-to-polygon tool
 		# http://betravis.github.io/shape-tools/path-to-polygon/
 
@@ -890,17 +993,14 @@ class Guppy(Fish):
 		# Set center point to mid-head
 		Util.translatePoints(baseShape, x=desiredWidth * -0.8, y=-desiredHeight/2)
 
-		self.baseFishShape = baseShape
+		return baseShape
 
 
 
-	# Get the fish shape based on a scale
+	# Get the fish shape based on a scale, shared and read-only
 	def fishShapeForScale(self, scale = 1):
 
-		baseShape = deepcopy(self.baseFishShape)
-		points = Util.scalePoints(baseShape, scale, scale)
-
-		return points
+		return shapeAssets.scaledShape('guppy', scale)
 
 
 	# Draw ourselves to the screen
@@ -910,10 +1010,15 @@ class Guppy(Fish):
 
 		self.super.render()
 
-		if(self.chosenOne and self.world.drawDebug):
-			egi.grey_pen()
-			egi.text_at_pos(self.pos.x, self.pos.y, str(self.sickness))
-			egi.text_at_pos(self.world.width - 100, self.world.height - 30, str(self._state))
+		if(not self.chosenOne): return
+
+		labels = self.world.labels
+		if(self.world.drawDebug):
+			labels.set('guppy.sickness', self.pos.x, self.pos.y, str(self.sickness), name='GREY')
+			labels.set('guppy.state', self.world.width - 100, self.world.height - 30, str(self._state), name='GREY')
+		else:
+			labels.remove('guppy.sickness')
+			labels.remove('guppy.state')
 			
 
 		
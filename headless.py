@@ -0,0 +1,74 @@
+'''
+
+Headless
+===============================
+
+Runs the fish tank without a window, OpenGL or pyglet, so big batch
+simulations can run on display-less boxes.
+
+Import this module before anything else from the game (it switches
+graphics into headless mode), then build and step worlds as usual:
+
+	import headless
+	world = headless.makeWorld(fish=200)
+	headless.run(world, ticks=600, delta=1/60.0)
+
+Or from the command line:
+
+	python headless.py --fish 200 --ticks 600
+
+'''
+
+import os
+import sys
+
+os.environ['FISHY_HEADLESS'] = '1'
+
+if('graphics' in sys.modules and not sys.modules['graphics'].HEADLESS):
+	raise ImportError('headless must be imported before graphics (or anything that imports it)')
+
+from world import World
+
+
+
+# Builds a world with some fish in it, ready to step.
+# Circle of life is off by default, same as in the game.
+# Give a seed to get the same simulation every time.
+def makeWorld(width=900, height=700, fish=10, lionKing=False, seed=None):
+
+	world = World(width, height, seed=seed)
+	world.lionKing = lionKing
+	world.addFish(fish)
+
+	return world
+
+
+# Steps the world a fixed number of times with the given delta
+def run(world, ticks, delta=1/60.0):
+
+	for _ in xrange(ticks):
+		world.update(delta)
+
+	return world
+
+
+
+if __name__ == '__main__':
+
+	import argparse
+
+	parser = argparse.ArgumentParser(description='Run the fish tank without a window')
+	parser.add_argument('--width', type=int, default=900)
+	parser.add_argument('--height', type=int, default=700)
+	parser.add_argument('--fish', type=int, default=10)
+	parser.add_argument('--ticks', type=int, default=600)
+	parser.add_argument('--delta', type=float, default=1/60.0)
+	parser.add_argument('--circle-of-life', action='store_true', help='auto feeding and sickness')
+	parser.add_argument('--seed', type=int, default=None)
+	args = parser.parse_args()
+
+	world = run(makeWorld(args.width, args.height, args.fish, args.circle_of_life, args.seed), args.ticks, args.delta)
+
+	living = len([f for f in world.fishes if not f.dead])
+	print 'clock: %.2fs, fish: %d (%d living), food: %d' % (world._clock, len(world.fishes), living, len(world.food))
+
@@ -6,19 +6,22 @@ Hunter
 
 from graphics import egi, rgba
 from math import sin, cos, sqrt
-from random import uniform
 from matrix33 import Matrix33
-from pyglet import clock
 from util import Util, DictWrap
 from copy import deepcopy
 
 # Our imports
 
 from fish import Fish
+from shapecache import swayFrames, shapeAssets
 
 
 
 class Hunter(Fish):
+
+	# What's in _stats, each one a single value
+	STAT_NAMES = ('body', 'mass', 'maxSpeed', 'wanderDistance', 'wanderRadius')
+
 	def __init__(self, world=None, scale=30.0, mass=1.0):
 
 		self.super = super(Hunter, self)
@@ -33,6 +36,7 @@ class Hunter(Fish):
 			'wanderDistance': 520,
 			'wanderRadius': 30
 		}
+		self.overrideStats('hunter')
 
 		# Set up some rendering properties
 
@@ -89,12 +93,13 @@ class Hunter(Fish):
 			self.awake = False
 
 		
+		rng = self.world.random.hunters
 		if(self.awake):
 			# If we just woke up
-			clock.schedule_once(self.toggleAwake, uniform(*self.awakeTime))
+			self.world.clock.schedule_once(self.toggleAwake, rng.uniform(*self.awakeTime))
 		else:
 			# We just fell asleep, sleep for 5 to 8 seconds
-			clock.schedule_once(self.toggleAwake, uniform(*self.sleepTime))
+			self.world.clock.schedule_once(self.toggleAwake, rng.uniform(*self.sleepTime))
 
 	
 	@property
@@ -166,7 +171,6 @@ class Hunter(Fish):
 
 	def swayShape(self):
 
-		# TODO: Optimise this more 
 		sqrtSpeed = self.speedSqrt
 
 		# Speed up fins as we slow down, gives the illusion of swimming harder
@@ -176,13 +180,10 @@ class Hunter(Fish):
 		swayAngle = sin(self.world._clock * frequency)
 		swayRange = sqrtSpeed / 80
 
-		matrix = Matrix33()
-		matrix.scale_update(1 + (swayAngle * 0.2 * sqrt(swayRange)), 1)
+		stretch = 1 + (swayAngle * 0.2 * sqrt(swayRange))
 
-		shape = deepcopy(self.fishShape)
-		matrix.transform_vector2d_list(shape)
-		
-		return shape
+		# Shared prebuilt frame, see shapecache
+		return swayFrames.frame(id(self.fishShape), self.fishShape, stretch)
 
 
 	# Vary our position slightly from side to side, like fish do
@@ -208,7 +209,7 @@ class Hunter(Fish):
 
 		eyeRadius = self.body * 0.8
 		if(self.awake):
-			egi.circle(eyePosition, eyeRadius)
+			self.world.circles.add(eyePosition, eyeRadius, self.bodyColor(color))
 		else:
 			egi.line_by_pos(eyePosition, eyePosition + self.heading * eyeRadius * 2)
 
@@ -224,11 +225,13 @@ class Hunter(Fish):
 		if(self.awake): self.vehicle_shape = self.swayShape()
 
 
-	# Can we see a particular position?
-	# TODO: Use circle/line intersection on each obstacle to determine line of sight
+	# Can we see a particular position? It has to be inside our sight circle,
+	# and not behind an obstacle
 	def canSeePosition(self, pos):
 
-		return self.sightCircle['pos'].distanceSq(pos) < self.sightCircle['radiusSq']
+		if(self.sightCircle['pos'].distanceSq(pos) >= self.sightCircle['radiusSq']): return False
+
+		return self.world.blackboard.occlusion(self).visible(pos)
 		
 
 
@@ -244,7 +247,8 @@ class Hunter(Fish):
 
 		wallForce = self.wallSteer(delta)
 
-		netForce = stateForce + wallForce
+		netForce = self._force.set_from(stateForce)
+		netForce += wallForce
 		
 
 		# Save for debugging purposes
@@ -252,8 +256,10 @@ class Hunter(Fish):
 
 		mass = self.mass * self.state.massMultiplier
 
+		acceleration = self._acceleration.set_from(netForce)
+		acceleration /= mass
 
-		return netForce / mass
+		return acceleration
 
 
 
@@ -262,7 +268,7 @@ class Hunter(Fish):
 	def calculateVelocity(self, delta):
 
 		# new velocity
-		vel = self.vel + self.acceleration * delta
+		vel = self._velocity.set_from(self.vel).add_scaled(self.acceleration, delta)
 		
 		# check for limits of new velocity based on current state
 		max = self.maxSpeed * self.state.speedMultiplier
@@ -274,7 +280,7 @@ class Hunter(Fish):
 
 			offsetAngle = (cos((self.world._clock) * frequency / 2)) * 0.1 + 0.1
 			
-			vel *= (1 + offsetAngle + uniform(0, 0.1))
+			vel *= (1 + offsetAngle + self.world.random.movement.uniform(0, 0.1))
 
 
 		return vel
@@ -283,7 +289,8 @@ class Hunter(Fish):
 	# Avoids the tank walls
 	def wallSteer(self, delta):
 
-		wallForce = self.wallAvoidance(self.world.tank.getWalls('vertical')) * 2
+		wallForce = self.wallAvoidance(self.world.tank.getWalls('vertical'))
+		wallForce *= 2
 
 		if(self.chosenOne and self.world.drawDebug):
 			egi.red_pen()
@@ -310,7 +317,8 @@ class Hunter(Fish):
 
 	def patrolSteer(self, delta):
 
-		wanderForce = self.wander(delta) * self.state.wanderInfluence
+		wanderForce = self.wander(delta)
+		wanderForce *= self.state.wanderInfluence
 
 		netForce = wanderForce
 
@@ -336,8 +344,14 @@ class Hunter(Fish):
 		fish.dead = True
 
 
-	# Build our shape from the poly string
+	# Our outline is parsed once and shared with every other hunter
 	def initShape(self):
+
+		self.baseFishShape = shapeAssets.base('hunter', self.buildBaseShape)
+
+
+	# Build our shape from the poly string
+	def buildBaseShape(self):
 		
 		# Made using BeTravis's excellent path-to-polygon tool
 		# http://betravis.github.io/shape-tools/path-to-polygon/
@@ -370,18 +384,15 @@ class Hunter(Fish):
 		# Set center point to mid-head
 		Util.translatePoints(baseShape, x=desiredWidth * -0.9, y=-desiredHeight/2)
 
-		self.baseFishShape = baseShape
+		return baseShape
 
 
 
 
-	# Get the fish shape based on a scale
+	# Get the fish shape based on a scale, shared and read-only
 	def fishShapeForScale(self, scale = 1):
 
-		baseShape = deepcopy(self.baseFishShape)
-		points = Util.scalePoints(baseShape, scale, scale)
-
-		return points
+		return shapeAssets.scaledShape('hunter', scale)
 
 
 
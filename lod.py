@@ -0,0 +1,161 @@
+'''
+
+Level Of Detail
+=================================='''
+
+import numpy as np
+
+
+"""
+Decides how much thought each fish gets this update.
+
+Fish are put in a tier each update, and a fish only gets its full update
+(state, food, neighbours, steering) every so many updates for its tier.
+The rest of the time it coasts, carrying on with the acceleration it last
+decided on (see Fish.coast).
+
+	full		near a hunter or some food (or the debug fish). Thinks
+				every update
+	reduced		within farDistance of a hunter
+	minimal		dead fish, anything off screen, and anything further
+				than that from every hunter
+
+Fish in the same tier take turns (by uid) rather than all thinking on the
+same update, and a fish that's just changed tier thinks straight away, so
+one that gets near a hunter reacts on the next update.
+
+On screen means inside viewport, a Rect in world coordinates of what's
+being looked at, or the whole world if it's None. Set it from whatever's
+showing the world when that's only part of it.
+
+It's off until enabled is set, and a world with it off behaves exactly as
+it did without it. counts has how many fish were in each tier last update.
+
+"""
+class LevelOfDetail(object):
+
+	TIERS = ('full', 'reduced', 'minimal')
+
+	def __init__(self, world=None, enabled=False):
+
+		self.world = world
+		self.enabled = enabled
+
+		# How close (in px) to a hunter or some food puts a fish in full
+		self.hunterDistance = 300
+		self.foodDistance = 200
+
+		# Further than this from every hunter puts a fish in minimal
+		self.farDistance = 600
+
+		# What's on screen (see above), and how far off it a fish can be
+		# before it's counted as off it
+		self.viewport = None
+		self.viewportMargin = 50
+
+		# Think every this many updates, for each tier
+		self.intervals = {
+			'full': 1,
+			'reduced': 3,
+			'minimal': 8
+		}
+
+		self.updates = 0
+		self.counts = dict((tier, 0) for tier in self.TIERS)
+
+		# Which of world.fishes do a full update this time
+		self.thinking = []
+
+
+	# Works out every fish's tier, and which of them think this update
+	def assign(self):
+
+		if(not self.enabled): return
+
+		world = self.world
+		fishes = world.fishes
+		tiers = self.tiersFor(fishes)
+
+		self.updates += 1
+		self.counts = dict((tier, tiers.count(tier)) for tier in self.TIERS)
+		self.thinking = [self.thinks(f, tier) for f, tier in zip(fishes, tiers)]
+
+
+	def thinks(self, fish, tier):
+
+		changed = fish.lodTier != tier
+		fish.lodTier = tier
+
+		return changed or (self.updates + fish.uid) % self.intervals[tier] == 0
+
+
+	def tiersFor(self, fishes):
+
+		if(not len(fishes)): return []
+
+		world = self.world
+		board = world.blackboard
+
+		slots = np.array([f.slot for f in fishes])
+		pos = world.agents.pos[slots]
+
+		hunters = [h.pos.tuple() for h in board.hunters]
+
+		near = self.within(pos, hunters, self.hunterDistance)
+		near |= self.within(pos, [f.pos.tuple() for f in board.food], self.foodDistance)
+		far = ~self.within(pos, hunters, self.farDistance)
+
+		left, top, right, bottom = self.viewportBox()
+		margin = self.viewportMargin
+		onScreen = (
+			(pos[:, 0] > left - margin) & (pos[:, 0] < right + margin) &
+			(pos[:, 1] > bottom - margin) & (pos[:, 1] < top + margin)
+		)
+
+		tiers = []
+
+		for i, fish in enumerate(fishes):
+			if(fish.chosenOne):
+				tiers.append('full')
+			elif(fish.dead or not onScreen[i]):
+				tiers.append('minimal')
+			elif(near[i]):
+				tiers.append('full')
+			elif(far[i]):
+				tiers.append('minimal')
+			else:
+				tiers.append('reduced')
+
+		return tiers
+
+
+	# (left, top, right, bottom) of what's on screen
+	def viewportBox(self):
+
+		if(self.viewport is None):
+			return (0, self.world.height, self.world.width, 0)
+
+		return self.viewport.getBox()
+
+
+	# Which of positions are within distance of any of points
+	def within(self, positions, points, distance):
+
+		if(not len(points)): return np.zeros(len(positions), dtype=bool)
+
+		offsets = positions[:, np.newaxis, :] - np.array(points)[np.newaxis, :, :]
+		distancesSq = (offsets**2).sum(axis=2)
+
+		return (distancesSq < distance**2).any(axis=1)
+
+
+	def __str__(self):
+
+		total = max(sum(self.counts.values()), 1)
+		lines = ['%-10s %6s %6s %9s' % ('tier', 'fish', '%', 'interval')]
+
+		for tier in self.TIERS:
+			count = self.counts[tier]
+			lines.append('%-10s %6d %6.1f %9d' % (tier, count, count * 100.0 / total, self.intervals[tier]))
+
+		return '\n'.join(lines)
@@ -36,7 +36,7 @@ are distributed nicely again.
 '''
 
 # Vendor imports
-from graphics import egi, KEY, rgba
+from graphics import egi, KEY, rgba, TextLayer
 from pyglet import window, clock
 from pyglet.gl import *
 
@@ -97,6 +97,9 @@ class Game(object):
 	# Creates a new world and sets up its initial state
 	def resetWorld(self):
 
+		# Stop the old world's timers before it goes
+		if(hasattr(self, 'world')): self.world.dispose()
+
 		# create a world for fishes!
 		self.world = World(self.width, self.height)
 
@@ -210,7 +213,7 @@ class Game(object):
 
 			# Toggles
 			'I': {
-				'label': 'Draw instructions (laggy)',
+				'label': 'Draw instructions',
 				'enabled': True,
 				'toggle': (self, 'showInfo')
 			},
@@ -252,6 +255,9 @@ class Game(object):
 				context, attr = props['toggle']
 				setattr(context, attr, props['enabled'])
 
+		self.infoText = TextLayer()
+		self.updateInfoText()
+
 
 	# Perform the action for a specific key
 	def actionForKeyString(self, keyString):
@@ -270,33 +276,40 @@ class Game(object):
 		context.__setattr__(attr, not keyData['enabled'])
 		keyData['enabled'] = not keyData['enabled']
 
+		self.updateInfoText()
 
-	# Draw our key info to the screen if enabled
-	def drawInfo(self):
-		
-		if not self.showInfo: return
+
+	# Lay out our key info labels. They're cached, so this only needs
+	# calling when something changes (eg. a toggle's enabled state)
+	def updateInfoText(self):
 		
 		# Formatting
 		lineHeight = 24
 		offset = (33, 30)
 		
-		# Loop through and draw each prop
+		# Loop through and set each prop
 		i = 0
 		for key, props in self.info.iteritems():
-			# draw the key
-			egi.text_color(name='GREY')
-			egi.text_at_pos(offset[0] + 0, (offset[1] + i * lineHeight), key)
-
-			# draw the label
-			egi.text_color(name='WHITE')
-			if('enabled' in props and props['enabled']):
-				egi.text_color(name='GREEN')
-			
-			egi.text_at_pos(offset[0] + 50, (offset[1] + i * lineHeight), props['label'])
+			y = offset[1] + i * lineHeight
+
+			# the key
+			self.infoText.set(key, offset[0] + 0, y, key, name='GREY')
+
+			# the label
+			color = 'GREEN' if ('enabled' in props and props['enabled']) else 'WHITE'
+			self.infoText.set(key + '.label', offset[0] + 50, y, props['label'], name=color)
 
 			i += 1
 
 
+	# Draw our key info to the screen if enabled
+	def drawInfo(self):
+		
+		if not self.showInfo: return
+
+		self.infoText.draw()
+
+
 
 
 # Run the game if we're the entry point
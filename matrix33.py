@@ -25,7 +25,7 @@ class Matrix33(object):
 
     def translate_update(self, x, y):
         '''Update self (matrix) with a translation amount of x,y'''
-        self._fast_imul(Matrix33([1., 0., 0., 0., 1., 0., x, y, 1.]))
+        self._fast_imul_values(1., 0., 0., 1., x, y)
 
     def scale(self, xscale, yscale):
         '''Returns this matrix scaled by xscale and yscale'''
@@ -33,7 +33,7 @@ class Matrix33(object):
 
     def scale_update(self, xscale, yscale):
         '''Update self with scale amounts of xscale and yscale'''
-        self._fast_imul(Matrix33([xscale, 0., 0., 0., yscale, 0., 0., 0., 1.]))
+        self._fast_imul_values(xscale, 0., 0., yscale, 0., 0.)
 
     def rotate(self, rads):
         '''Returns this matrix rotated by rad (radians)'''
@@ -45,7 +45,7 @@ class Matrix33(object):
         '''Update self with rotation amount of rad (radians)'''
         sin_r = sin(rads)
         cos_r = cos(rads)
-        self._fast_imul(Matrix33([cos_r, sin_r, 0., -sin_r, cos_r, 0., 0., 0., 1.]))
+        self._fast_imul_values(cos_r, sin_r, -sin_r, cos_r, 0., 0.)
 
     def rotate_by_vectors(self, fwd, side):
         ''' Update self with rotation based on forward and side vectors.'''
@@ -53,7 +53,7 @@ class Matrix33(object):
 
     def rotate_by_vectors_update(self, fwd, side):
         ''' Update self with rotation based on forward and side vectors.'''
-        self._fast_imul(Matrix33([fwd.x, fwd.y, 0., side.x, side.y, 0., 0., 0., 1.]))
+        self._fast_imul_values(fwd.x, fwd.y, side.x, side.y, 0., 0.)
 
     def transform_vector2d_list(self, points):
         ''' Apply self as a transformation matrix to the provided collection
@@ -119,9 +119,24 @@ class Matrix33(object):
         #         0.0             0.0             1.0
         b11, b12, b13,  b21, b22, b23,  b31, b32, b33 = rhs._m
 
-        self._m = [ a11*b11 + a12*b21, a11*b12 + a12*b22, 0,
-                    a21*b11 + a22*b21, a21*b12 + a22*b22, 0,
-                    a31*b11 + a32*b21 + b31, a31*b12 + a32*b22 + b32, 1  ]
+        self._fast_imul_values(b11, b12, b21, b22, b31, b32)
+
+    def _fast_imul_values(self, b11, b12, b21, b22, b31, b32):
+        ''' Same as _fast_imul, but takes the rhs matrix's values directly
+            (leaving out column 3) and updates self's list in place, so the
+            *_update methods don't need to build any matrices or lists. '''
+        m = self._m
+        a11, a12, a13,  a21, a22, a23,  a31, a32, a33 = m
+
+        m[0] = a11*b11 + a12*b21
+        m[1] = a11*b12 + a12*b22
+        m[2] = 0
+        m[3] = a21*b11 + a22*b21
+        m[4] = a21*b12 + a22*b22
+        m[5] = 0
+        m[6] = a31*b11 + a32*b21 + b31
+        m[7] = a31*b12 + a32*b22 + b32
+        m[8] = 1
 
 
     def __str__(self):
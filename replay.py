@@ -0,0 +1,753 @@
+'''
+
+Replay
+===============================
+
+Records a simulation tick by tick into a memory-mapped file, and plays it
+back later, jumping straight to any tick, without simulating anything.
+
+	python replay.py run.replay --record --fish 2000 --ticks 36000
+	python replay.py run.replay
+	python replay.py run.replay --tick 18000
+
+Or from code:
+
+	with Recorder(world, 'run.replay') as recorder:
+		for _ in xrange(ticks):
+			world.update(delta)
+			recorder.capture()
+
+	player = Player(Replay('run.replay'))
+	player.seek(1200)
+	player.render()
+
+Anything with fishes, hunters, food and obstacles like a World can be
+recorded, a ShardedWorld's mirror (sharded.world) included.
+
+The file is a header, then one frame per tick, appended as they're
+captured, then a seek index:
+
+	FRAME	tick, clock, debug toggles, counts, and the offset of the
+			keyframe it belongs to
+	KEYF	(keyframes only) the tank's size. Written every
+			keyframeInterval ticks, and whenever the tank's resized or its
+			rocks change
+	FISH	every guppy's uid, position, velocity, heading, side, colour,
+			size, sickness, state and whether it's dead or a parent
+	HUNT	the same for hunters, with whether they're awake
+	FOOD	uneaten food's position and radius
+	ROCK	every rock's position, radius, edges and spin (they drift)
+	RKPT	(keyframes only) every rock's outline, rock after rock
+
+Frames store everything that can change between ticks, so any tick can be
+shown from its own frame and its keyframe. The index is one offset per
+tick, so finding a frame is a single lookup. It's written when the
+recorder's closed, and rebuilt by walking the frames if it never was.
+
+Everything's stored as float32, which is plenty for drawing but not for
+carrying on a simulation (use checkpoint for that). Player reads frames
+straight out of the mapping as NumPy views, and copies them into a mirror
+World that's drawn with the usual render methods.
+
+'''
+
+import sys
+
+# Record headless from the command line, watch in a window
+if(__name__ == '__main__' and '--record' in sys.argv): import headless
+
+import mmap
+import struct
+import numpy as np
+
+from world import World
+from vector2d import Vector2D
+from guppy import Guppy
+from hunter import Hunter
+from food import Food
+from rock import Rock
+
+
+MAGIC = 'FISHYRPL'
+VERSION = 1
+
+# Magic, version and keyframe interval
+HEADER = struct.Struct('<8sHHI')
+
+# Tag, tick, size in bytes, keyframe offset, clock, fish, hunters, food,
+# rocks and rock points, and the debug toggles
+FRAME = struct.Struct('<4sIQQdIIIIII')
+
+# Tank width and height, straight after a keyframe's FRAME
+KEYFRAME = struct.Struct('<dd')
+
+# Tacked on the end when the recorder's closed: magic, where the index
+# starts and how many ticks it has
+FOOTER = struct.Struct('<8sQQ')
+INDEX_MAGIC = 'FISHYIDX'
+
+VECTOR = ('<f4', (2,))
+
+FISH = np.dtype([
+	('uid', '<i4'), ('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR),
+	('color', '<f4', (4,)), ('size', '<f4'), ('sickness', '<f4'), ('dead', '?'), ('parent', '?'),
+	('state', 'i1')
+], align=True)
+
+HUNTER = np.dtype([
+	('uid', '<i4'), ('pos', VECTOR), ('vel', VECTOR), ('heading', VECTOR), ('side', VECTOR),
+	('awake', '?'), ('state', 'i1')
+], align=True)
+
+FOOD = np.dtype([('pos', VECTOR), ('radius', '<f4')], align=True)
+
+ROCK = np.dtype([('pos', VECTOR), ('radius', '<f4'), ('edges', '<i4'), ('rotation', '<f4')], align=True)
+
+POINT = np.dtype(VECTOR)
+
+# Every state a guppy or hunter can be in, stored as its index
+STATES = ('idle', 'seekFood', 'hide', 'dead', 'patrol')
+STATE_CODES = dict((name, i) for i, name in enumerate(STATES))
+
+# World toggles that change what's drawn, stored as bits
+TOGGLES = ('drawDebug', 'drawComponentForces', 'drawHidingSpots')
+
+# Recordings grow by at least this much at a time
+CHUNK = 1 << 24
+
+
+# Sections are padded so every one starts on an 8 byte boundary
+def padded(size):
+
+	return (size + 7) & ~7
+
+
+
+'''
+
+Recording
+=================================='''
+
+
+"""
+Captures a world's state into a replay file once per call to capture(),
+which is usually straight after each World.update.
+
+The file's mapped into memory and grown a chunk at a time, and every
+frame's written straight into the mapping.
+
+"""
+class Recorder(object):
+
+	def __init__(self, world, path, keyframeInterval=60):
+
+		self.world = world
+		self.path = path
+		self.keyframeInterval = keyframeInterval
+
+		self.ticks = 0
+		self.offsets = []
+		self.keyframe = None
+		self.keyframeShape = None
+
+		self.file = open(path, 'w+b')
+		self.capacity = CHUNK
+		self.file.truncate(self.capacity)
+		self.mapping = mmap.mmap(self.file.fileno(), self.capacity)
+
+		HEADER.pack_into(self.mapping, 0, MAGIC, VERSION, keyframeInterval, 0)
+		self.end = HEADER.size
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+	def capture(self):
+
+		world = self.world
+		key = self.needsKeyframe()
+
+		fishes = world.fishes
+		hunters = world.hunters
+		food = [f for f in world.food if not f.eaten]
+		rocks = world.obstacles
+		points = [p for r in rocks for p in r.rockShape] if key else []
+
+		sections = [(FISH, fishes), (HUNTER, hunters), (FOOD, food), (ROCK, rocks), (POINT, points)]
+		size = FRAME.size + (KEYFRAME.size if key else 0) + sum(padded(dtype.itemsize * len(items)) for dtype, items in sections)
+
+		offset = self.reserve(size)
+		if(key):
+			self.keyframe = offset
+			self.keyframeShape = self.shapeOf(world)
+
+		toggles = sum(1 << i for i, name in enumerate(TOGGLES) if getattr(world, name))
+		FRAME.pack_into(self.mapping, offset, 'KEYF' if key else 'TICK', self.ticks, size, self.keyframe,
+			world._clock, len(fishes), len(hunters), len(food), len(rocks), len(points), toggles)
+
+		at = offset + FRAME.size
+		if(key):
+			KEYFRAME.pack_into(self.mapping, at, world.width, world.height)
+			at += KEYFRAME.size
+
+		fill = (fishRecords, hunterRecords, foodRecords, rockRecords, pointRecords)
+		for (dtype, items), fillRecords in zip(sections, fill):
+			if(len(items)):
+				fillRecords(world, items, np.ndarray(len(items), dtype=dtype, buffer=self.mapping, offset=at))
+			at += padded(dtype.itemsize * len(items))
+
+		self.offsets.append(offset)
+		self.end = offset + size
+		self.ticks += 1
+
+
+	# Keyframes come round every keyframeInterval ticks, and straight
+	# away if the tank's been resized or its rocks have changed
+	def needsKeyframe(self):
+
+		return self.ticks % self.keyframeInterval == 0 or self.shapeOf(self.world) != self.keyframeShape
+
+
+	def shapeOf(self, world):
+
+		return (world.width, world.height, [id(r) for r in world.obstacles])
+
+
+	# Makes sure there's room for size more bytes, and returns where
+	# they start
+	def reserve(self, size):
+
+		if(self.end + size > self.capacity):
+			self.capacity = max(self.capacity * 2, self.end + size + CHUNK)
+			self.mapping.resize(self.capacity)
+
+		return self.end
+
+
+	# Writes the seek index and trims the file down to what's been used
+	def close(self):
+
+		if(self.mapping is None): return
+
+		start = padded(self.end)
+		index = np.array(self.offsets, dtype='<u8')
+		end = start + index.nbytes + FOOTER.size
+
+		self.reserve(end - self.end)
+		self.mapping[start:start + index.nbytes] = index.tostring()
+		FOOTER.pack_into(self.mapping, start + index.nbytes, INDEX_MAGIC, start, self.ticks)
+
+		self.mapping.flush()
+		self.mapping.close()
+		self.mapping = None
+
+		self.file.truncate(end)
+		self.file.close()
+
+
+
+def fishRecords(world, fishes, records):
+
+	store = world.agents
+	slots = [f.slot for f in fishes]
+
+	records['uid'] = [f.uid for f in fishes]
+	for name in ('pos', 'vel', 'heading', 'side'):
+		records[name] = getattr(store, name)[slots]
+
+	records['color'] = [f.color for f in fishes]
+	records['size'] = [f.size for f in fishes]
+	records['sickness'] = [f.sickness for f in fishes]
+	records['dead'] = [f.dead for f in fishes]
+	records['parent'] = [f.isParent for f in fishes]
+	records['state'] = [STATE_CODES.get(f._state, -1) for f in fishes]
+
+
+def hunterRecords(world, hunters, records):
+
+	store = world.agents
+	slots = [h.slot for h in hunters]
+
+	records['uid'] = [h.uid for h in hunters]
+	for name in ('pos', 'vel', 'heading', 'side'):
+		records[name] = getattr(store, name)[slots]
+
+	records['awake'] = [h.awake for h in hunters]
+	records['state'] = [STATE_CODES.get(h._state, -1) for h in hunters]
+
+
+def foodRecords(world, food, records):
+
+	records['pos'] = [f.pos.tuple() for f in food]
+	records['radius'] = [f.boundingRadius for f in food]
+
+
+def rockRecords(world, rocks, records):
+
+	records['pos'] = [r.pos.tuple() for r in rocks]
+	records['radius'] = [r.boundingRadius for r in rocks]
+	records['edges'] = [len(r.rockShape) for r in rocks]
+	records['rotation'] = [r.rotation for r in rocks]
+
+
+def pointRecords(world, points, records):
+
+	records[:] = [p.tuple() for p in points]
+
+
+
+'''
+
+Reading
+=================================='''
+
+
+"""
+One tick of a replay. fish, hunters, food and rocks are read-only views
+straight into the file's mapping.
+
+"""
+class Frame(object):
+
+	def __init__(self, tick, clock, keyframe, toggles, fish, hunters, food, rocks):
+
+		self.tick = tick
+		self.clock = clock
+		self.keyframe = keyframe
+		self.toggles = toggles
+		self.fish = fish
+		self.hunters = hunters
+		self.food = food
+		self.rocks = rocks
+
+
+"""
+The slow changing bits of a replay: the tank's size and its rocks.
+
+"""
+class Keyframe(object):
+
+	def __init__(self, offset, width, height, rocks, points):
+
+		self.offset = offset
+		self.width = width
+		self.height = height
+		self.rocks = rocks
+		self.points = points
+
+
+"""
+A replay file, mapped read-only. Any tick's frame can be had in constant
+time with frame(tick).
+
+"""
+class Replay(object):
+
+	def __init__(self, path):
+
+		self.path = path
+		self.file = open(path, 'rb')
+		self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		magic, version, self.keyframeInterval, _ = HEADER.unpack_from(self.mapping, 0)
+		if(magic != MAGIC):
+			raise ValueError('%s is not a fishy replay' % path)
+		if(version > VERSION):
+			raise ValueError('%s is a version %d replay, this only reads up to version %d' % (path, version, VERSION))
+
+		self.index = self.readIndex()
+
+
+	def __len__(self):
+		return len(self.index)
+
+
+	# The index the recorder left at the end of the file, or one made by
+	# walking the frames if it never got that far
+	def readIndex(self):
+
+		mapping = self.mapping
+
+		if(len(mapping) >= HEADER.size + FOOTER.size):
+			magic, start, ticks = FOOTER.unpack_from(mapping, len(mapping) - FOOTER.size)
+			if(magic == INDEX_MAGIC):
+				return np.frombuffer(mapping, dtype='<u8', count=ticks, offset=start)
+
+		offsets = []
+		offset = HEADER.size
+
+		while offset + FRAME.size <= len(mapping):
+			tag, tick, size = FRAME.unpack_from(mapping, offset)[:3]
+			if(tag not in ('TICK', 'KEYF') or offset + size > len(mapping)): break
+
+			offsets.append(offset)
+			offset += size
+
+		return np.array(offsets, dtype='<u8')
+
+
+	def frame(self, tick):
+
+		offset = int(self.index[tick])
+		tag, tick, size, keyframe, clock, fish, hunters, food, rocks, points, toggles = FRAME.unpack_from(self.mapping, offset)
+
+		at = offset + FRAME.size + (KEYFRAME.size if tag == 'KEYF' else 0)
+		sections = []
+		for dtype, count in ((FISH, fish), (HUNTER, hunters), (FOOD, food), (ROCK, rocks)):
+			sections.append(self.view(dtype, count, at))
+			at += padded(dtype.itemsize * count)
+
+		return Frame(tick, clock, keyframe, toggles, *sections)
+
+
+	# Just a tick's clock, without reading the rest of it
+	def clock(self, tick):
+
+		return FRAME.unpack_from(self.mapping, int(self.index[tick]))[4]
+
+
+	def keyframe(self, offset):
+
+		tag, tick, size, keyframe, clock, fish, hunters, food, rocks, points, toggles = FRAME.unpack_from(self.mapping, offset)
+		width, height = KEYFRAME.unpack_from(self.mapping, offset + FRAME.size)
+
+		at = offset + FRAME.size + KEYFRAME.size
+		at += sum(padded(dtype.itemsize * count) for dtype, count in ((FISH, fish), (HUNTER, hunters), (FOOD, food)))
+
+		rockRecords = self.view(ROCK, rocks, at)
+		at += padded(ROCK.itemsize * rocks)
+
+		return Keyframe(offset, width, height, rockRecords, self.view(POINT, points, at))
+
+
+	def view(self, dtype, count, offset):
+
+		if(not count): return np.zeros(0, dtype=dtype)
+		return np.frombuffer(self.mapping, dtype=dtype, count=count, offset=offset)
+
+
+	def close(self):
+
+		self.index = None
+		self.mapping.close()
+		self.file.close()
+
+
+
+'''
+
+Playing
+=================================='''
+
+
+"""
+Shows any tick of a replay in a mirror World, which is drawn with the
+usual render methods. The mirror's guppies and hunters are only ever
+looked at, never updated.
+
+"""
+class Player(object):
+
+	def __init__(self, replay):
+
+		self.replay = replay
+		self.tick = None
+		self.keyframe = None
+
+		first = replay.keyframe(replay.frame(0).keyframe)
+
+		self.world = World(int(first.width), int(first.height), seed=0, rocks=0, hunters=0)
+		self.world.lionKing = False
+		self.world.livingFishes = []
+
+		self.fishes = {}
+		self.hunters = {}
+		self.rockShapes = None
+
+		self.seek(0)
+
+
+	def __len__(self):
+		return len(self.replay)
+
+
+	# Shows the given tick, which only needs its own frame and keyframe
+	def seek(self, tick):
+
+		tick = min(max(tick, 0), len(self.replay) - 1)
+		frame = self.replay.frame(tick)
+
+		if(frame.keyframe != self.keyframe):
+			self.applyKeyframe(self.replay.keyframe(frame.keyframe))
+
+		self.applyFrame(frame)
+		self.tick = tick
+
+
+	def step(self, ticks=1):
+
+		self.seek(self.tick + ticks)
+
+
+	def applyKeyframe(self, keyframe):
+
+		world = self.world
+		self.keyframe = keyframe.offset
+
+		if((world.width, world.height) != (keyframe.width, keyframe.height)):
+			world.resize(int(keyframe.width), int(keyframe.height))
+
+		# Rocks turn a little every time they're drawn, so leave them be
+		# unless they're different rocks
+		shapes = [(radius, edges, rotation) for pos, radius, edges, rotation in keyframe.rocks.tolist()]
+		if(shapes == self.rockShapes): return
+
+		self.rockShapes = shapes
+		world.obstacles = []
+
+		start = 0
+		for record in keyframe.rocks.tolist():
+			pos, radius, edges, rotation = record
+			rock = Rock(world=world)
+			rock.pos = Vector2D(*pos)
+			rock.boundingRadius = radius
+			rock.rotation = rotation
+			rock.edges = edges
+			rock.rockShape = [Vector2D(x, y) for x, y in keyframe.points[start:start + edges].tolist()]
+			start += edges
+			world.obstacles.append(rock)
+
+
+	def applyFrame(self, frame):
+
+		world = self.world
+		world._clock = frame.clock
+
+		for i, name in enumerate(TOGGLES):
+			setattr(world, name, bool(frame.toggles & (1 << i)))
+
+		world.fishes = self.mirror(self.fishes, frame.fish, self.makeFish)
+		world.hunters = self.mirror(self.hunters, frame.hunters, self.makeHunter)
+
+		self.applyFish(world.fishes, frame.fish)
+		self.applyHunters(world.hunters, frame.hunters)
+		self.applyFood(frame.food)
+
+		for rock, pos in zip(world.obstacles, frame.rocks['pos'].tolist()):
+			rock.pos = Vector2D(*pos)
+
+		world.livingFishes = [f for f in world.fishes if not f.dead]
+		if(len(world.fishes)): world.fishes[0].chosenOne = True
+		if(len(world.hunters)): world.hunters[0].chosenOne = True
+
+
+	# Brings agents (uid -> agent) in line with records, making agents
+	# for new uids and releasing the ones that aren't there any more.
+	# Returns the agents in the same order as records.
+	def mirror(self, agents, records, make):
+
+		uids = records['uid'].tolist()
+		current = dict((uid, agents.pop(uid, None) or make()) for uid in uids)
+
+		[self.world.agents.release(agent.slot) for agent in agents.itervalues()]
+		agents.clear()
+		agents.update(current)
+
+		return [current[uid] for uid in uids]
+
+
+	def makeFish(self):
+
+		return Guppy(world=self.world, scale=10)
+
+
+	# Mirrored hunters don't keep their own time, they're told when
+	# they're awake
+	def makeHunter(self):
+
+		hunter = Hunter(world=self.world)
+		hunter.ghost = True
+		self.world.clock.unschedule(hunter.toggleAwake)
+		return hunter
+
+
+	# Everyone's motion goes straight into the agent store in one go
+	def applyMotion(self, agents, records):
+
+		store = self.world.agents
+		slots = [a.slot for a in agents]
+
+		for name in ('pos', 'vel', 'heading', 'side'):
+			getattr(store, name)[slots] = records[name]
+
+		speeds = np.sqrt(np.hypot(records['vel'][:, 0], records['vel'][:, 1]))
+		for agent, uid, speedSqrt in zip(agents, records['uid'].tolist(), speeds.tolist()):
+			agent.uid = uid
+			agent.speedSqrt = speedSqrt
+
+
+	# Colour, sickness and dying are set directly, their setters would
+	# work out colours of their own
+	def applyFish(self, fishes, records):
+
+		if(not len(fishes)): return
+		self.applyMotion(fishes, records)
+
+		columns = [records[name].tolist() for name in ('color', 'size', 'sickness', 'dead', 'parent', 'state')]
+		for fish, color, size, sickness, dead, parent, state in zip(fishes, *columns):
+			if(size != fish.size): fish.size = size
+			fish.color = tuple(color)
+			fish._sickness = sickness
+			fish._dead = dead
+			fish.isParent = parent
+			fish._state = STATES[state]
+
+
+	def applyHunters(self, hunters, records):
+
+		if(not len(hunters)): return
+		self.applyMotion(hunters, records)
+
+		for hunter, awake, state in zip(hunters, records['awake'].tolist(), records['state'].tolist()):
+			if(hunter.awake != awake): hunter.awake = awake
+			hunter._state = STATES[state]
+			hunter.sightCircle['pos'] = hunter.pos + hunter.heading * hunter.sightCircle['distance']
+
+
+	# Food's only drawn, so the same pieces are moved about every frame
+	def applyFood(self, records):
+
+		food = self.world.food
+		while(len(food) < len(records)):
+			food.append(Food(world=self.world))
+		del food[len(records):]
+
+		for f, pos, radius in zip(food, records['pos'].tolist(), records['radius'].tolist()):
+			f.pos = Vector2D(*pos)
+			f.boundingRadius = radius
+
+
+	def render(self):
+
+		self.world.render()
+
+
+
+# Plays a replay in a window. Space pauses, left and right jump a
+# keyframe back or forward, comma and period step a tick at a time,
+# and clicking or dragging along the window scrubs through the replay.
+def watch(player, speed=1.0):
+
+	from pyglet import window, clock
+	from pyglet.gl import glClear, glEnable, glBlendFunc, GL_COLOR_BUFFER_BIT, GL_BLEND, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA
+	from graphics import egi, KEY, rgba, TextLayer
+
+	world = player.world
+	win = window.Window(width=world.width, height=world.height, vsync=True, resizable=True)
+	egi.InitWithPyglet(win)
+
+	glEnable(GL_BLEND)
+	glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+	background = rgba('1d1f21')
+	info = TextLayer()
+	state = {'playing': True, 'time': player.replay.clock(player.tick)}
+
+	def jumpTo(tick):
+		player.seek(tick)
+		state['time'] = player.replay.clock(player.tick)
+
+	def scrub(x):
+		jumpTo(int(x / float(win.width) * len(player)))
+
+	@win.event
+	def on_key_press(symbol, modifiers):
+		jump = player.replay.keyframeInterval
+		if(symbol == KEY.SPACE): state['playing'] = not state['playing']
+		elif(symbol == KEY.LEFT): jumpTo(player.tick - jump)
+		elif(symbol == KEY.RIGHT): jumpTo(player.tick + jump)
+		elif(symbol == KEY.COMMA): jumpTo(player.tick - 1)
+		elif(symbol == KEY.PERIOD): jumpTo(player.tick + 1)
+		elif(symbol == KEY.HOME): jumpTo(0)
+		elif(symbol == KEY.END): jumpTo(len(player) - 1)
+
+	@win.event
+	def on_mouse_press(x, y, button, modifiers):
+		scrub(x)
+
+	@win.event
+	def on_mouse_drag(x, y, dx, dy, buttons, modifiers):
+		scrub(x)
+
+	while not win.has_exit:
+		win.dispatch_events()
+		glClear(GL_COLOR_BUFFER_BIT)
+
+		delta = clock.tick()
+
+		# Play at the speed it was recorded, skipping ticks if we're
+		# drawing slower than it ran
+		if(state['playing']):
+			state['time'] += delta * speed
+			tick = player.tick
+			while(tick + 1 < len(player) and player.replay.clock(tick + 1) <= state['time']):
+				tick += 1
+			if(tick != player.tick): player.seek(tick)
+
+		egi.set_pen_color(background)
+		egi.rect(0, win.height, win.width, 0, filled=True)
+
+		player.render()
+
+		info.set('tick', 10, 10, 'tick %d/%d  %.1fs' % (player.tick, len(player) - 1, world._clock), name='GREY')
+		info.draw()
+
+		win.flip()
+
+
+
+if __name__ == '__main__':
+
+	import argparse
+	from timeit import default_timer as timer
+	from benchmark import silenced
+
+	parser = argparse.ArgumentParser(description='Record a headless run, or play one back')
+	parser.add_argument('path')
+	parser.add_argument('--record', action='store_true', help='record a new run instead of playing one')
+	parser.add_argument('--tick', type=int, default=0, help='tick to start playing from')
+	parser.add_argument('--speed', type=float, default=1.0, help='playback speed')
+	parser.add_argument('--width', type=int, default=1400)
+	parser.add_argument('--height', type=int, default=800)
+	parser.add_argument('--fish', type=int, default=200)
+	parser.add_argument('--ticks', type=int, default=3600)
+	parser.add_argument('--delta', type=float, default=1/60.0)
+	parser.add_argument('--keyframe', type=int, default=60, help='ticks between keyframes')
+	parser.add_argument('--circle-of-life', action='store_true', help='auto feeding and sickness')
+	parser.add_argument('--seed', type=int, default=None)
+	args = parser.parse_args()
+
+	if(args.record):
+		with silenced():
+			world = World(args.width, args.height, seed=args.seed)
+			world.lionKing = args.circle_of_life
+			world.addFish(args.fish)
+
+			start = timer()
+			with Recorder(world, args.path, args.keyframe) as recorder:
+				for _ in xrange(args.ticks):
+					world.update(args.delta)
+					recorder.capture()
+			seconds = timer() - start
+
+		print 'recorded %d ticks in %.1fs to %s' % (args.ticks, seconds, args.path)
+	else:
+		with silenced():
+			player = Player(Replay(args.path))
+			player.seek(args.tick)
+		watch(player, args.speed)
@@ -5,7 +5,6 @@ Rock
 
 from vector2d import Vector2D
 from graphics import egi, rgba
-from random import uniform, randrange
 from math import sqrt, sin, cos, pi
 from matrix33 import Matrix33
 import copy
@@ -20,11 +19,13 @@ class Rock(object):
 		self.pos = Vector2D()
 		self.vel = Vector2D()
 
+		rng = world.random.rocks
+
 		self.scale = Vector2D() * 30
-		self.maxSpeed = uniform(5, 8)
-		self.boundingRadius = uniform(25, 80)
-		self.edges = randrange(7, 12)
-		self.rotation = uniform(-0.05/3, 0.05/3)
+		self.maxSpeed = rng.uniform(5, 8)
+		self.boundingRadius = rng.uniform(25, 80)
+		self.edges = rng.randrange(7, 12)
+		self.rotation = rng.uniform(-0.05/3, 0.05/3)
 
 		self.color = rgba('25a000')
 
@@ -123,6 +124,7 @@ class Rock(object):
 
 		variance = 0.18
 		variation = (1 - variance, 1 + variance)
+		uniform = self.world.random.rocks.uniform
 
 		for i in range(edges):
 			v = Vector2D(cos(i * angle), sin(i * angle)) * radius
@@ -0,0 +1,161 @@
+'''
+
+Scheduler
+=================================='''
+
+import heapq
+from itertools import count
+
+
+"""
+Runs callbacks on simulation time rather than wall-clock time. Every
+World owns one and moves it along with its clock in update(), so timers
+stop while the world's paused, speed up with it, and stop for good when
+it's disposed.
+
+Has the bits of the pyglet.clock interface the world used
+(schedule_once, schedule_interval and unschedule). Callbacks get the time
+since they were scheduled (or last fired) as their only argument, same
+as pyglet.
+
+Timers sit in a heap ordered by when they're due (then by when they were
+first scheduled), so ticking with thousands pending only looks at the ones
+that are due. Cancelled timers are just marked and dropped when they
+reach the top, or all at once when they outnumber the live ones.
+
+"""
+class Scheduler(object):
+
+	def __init__(self):
+
+		self.time = 0.0
+		self.clear()
+
+
+	def schedule_once(self, func, delay):
+
+		return self._push(self.time + delay, None, func, self.time)
+
+
+	def schedule_interval(self, func, interval):
+
+		return self._push(self.time + interval, interval, func, self.time)
+
+
+	# Cancels every timer for func
+	def unschedule(self, func):
+
+		[self.cancel(timer) for timer in list(self._byFunc.get(func, ()))]
+
+
+	# Cancels one timer, as returned by schedule_once or schedule_interval
+	def cancel(self, timer):
+
+		if(not timer.active): return
+
+		timer.active = False
+		self._live -= 1
+
+		timers = self._byFunc[timer.func]
+		timers.remove(timer)
+		if(not len(timers)): del self._byFunc[timer.func]
+
+		# Don't let cancelled timers pile up in the heap
+		if(len(self._heap) > 64 and self._live < len(self._heap) / 2):
+			self._heap = [entry for entry in self._heap if entry[2].active]
+			heapq.heapify(self._heap)
+
+
+	# Every pending timer as (due, interval or None, func, lastFired),
+	# in the order they'd fire in if they were all due at once
+	def pending(self):
+
+		timers = sorted((order, t) for due, order, t in self._heap if t.active)
+		return [(t.due, t.interval, t.func, t.lastFired) for order, t in timers]
+
+
+	# Puts back a timer from pending(), eg. when loading a checkpoint
+	def restore(self, due, interval, func, lastFired):
+
+		return self._push(due, interval, func, lastFired)
+
+
+	# Drops every timer
+	def clear(self):
+
+		self._heap = []
+		self._byFunc = {}
+		self._live = 0
+		self._order = count()
+
+
+	# When func next fires, or None if it isn't scheduled
+	def due(self, func):
+
+		timers = self._byFunc.get(func)
+		return min(t.due for t in timers) if timers else None
+
+
+	# Advance the clock by delta, see advanceTo
+	def tick(self, delta):
+
+		self.advanceTo(self.time + delta)
+
+
+	# Moves the clock on to time, firing anything that's due in time
+	# order. Interval timers catch up if they're due more than once.
+	def advanceTo(self, time):
+
+		self.time = time
+		heap = self._heap
+
+		while(len(heap) and heap[0][0] <= time):
+			when, order, timer = heap[0]
+
+			if(not timer.active):
+				heapq.heappop(heap)
+				continue
+
+			lastFired = timer.lastFired
+
+			if(timer.interval is None):
+				heapq.heappop(heap)
+				self.cancel(timer)
+			else:
+				timer.due = when + timer.interval
+				timer.lastFired = when
+				heapq.heapreplace(heap, (timer.due, order, timer))
+
+			timer.func(when - lastFired)
+
+			# The callback might have cleared us
+			heap = self._heap
+
+
+	def _push(self, due, interval, func, lastFired):
+
+		timer = Timer(due, interval, func, lastFired)
+
+		heapq.heappush(self._heap, (due, next(self._order), timer))
+		self._byFunc.setdefault(func, []).append(timer)
+		self._live += 1
+
+		return timer
+
+
+
+"""
+One pending callback, handed back by the Scheduler so it can be
+cancelled on its own.
+
+"""
+class Timer(object):
+	__slots__ = ('due', 'interval', 'func', 'lastFired', 'active')
+
+	def __init__(self, due, interval, func, lastFired):
+
+		self.due = due
+		self.interval = interval
+		self.func = func
+		self.lastFired = lastFired
+		self.active = True
@@ -0,0 +1,105 @@
+'''
+
+Shape cache
+=================================='''
+
+from vector2d import Vector2D
+
+
+"""
+Prebuilt sway animation frames for fish outlines.
+
+Swaying only ever stretches a fish's shape along its length, so rather
+than copying and transforming the shape every frame, the stretch is
+rounded to the nearest step and the stretched shape for that step is
+built once and handed to every fish with the same shape.
+
+Frames are shared, so treat them as read-only.
+
+"""
+class SwayFrames(object):
+
+	# step is how finely the stretch is quantized. With fish stretching
+	# about +/-15% that's ~60 frames per body size.
+	def __init__(self, step=0.005, maxFrames=4096):
+
+		self.step = step
+		self.maxFrames = maxFrames
+		self.frames = {}
+
+
+	# Returns shape stretched along x by (roughly) stretch. key should
+	# identify the shape, eg. the id of a shape from ShapeAssets.
+	def frame(self, key, shape, stretch):
+
+		index = int(round(stretch / self.step))
+		frame = self.frames.get((key, index))
+
+		if(frame is None):
+			# Fish that keep growing would keep adding sizes, so just
+			# start again once we've got too many
+			if(len(self.frames) >= self.maxFrames):
+				self.frames = {}
+
+			x = index * self.step
+			frame = [Vector2D(p.x * x, p.y) for p in shape]
+			self.frames[(key, index)] = frame
+
+		return frame
+
+
+
+# Shared by every fish
+swayFrames = SwayFrames()
+
+
+
+"""
+Fish outlines, shared by every fish of the same kind.
+
+Each kind's base shape is parsed and normalised once, the first time
+one's made, and each body size's scaled copy is built once too (sizes
+are rounded to the nearest step first, so growing fish reuse them).
+
+Shapes are shared, so treat them as read-only. They're also kept for
+the life of the process, which is what lets SwayFrames key on them.
+
+"""
+class ShapeAssets(object):
+
+	def __init__(self, step=0.01):
+
+		self.step = step
+		self.bases = {}
+		self.scaled = {}
+
+
+	# The base shape for kind, calling build() to make it the first time
+	def base(self, kind, build):
+
+		shape = self.bases.get(kind)
+
+		if(shape is None):
+			shape = self.bases[kind] = build()
+
+		return shape
+
+
+	# kind's base shape scaled by (roughly) scale in both directions
+	def scaledShape(self, kind, scale):
+
+		index = int(round(scale / self.step))
+		shape = self.scaled.get((kind, index))
+
+		if(shape is None):
+			s = index * self.step
+			shape = [Vector2D(p.x * s, p.y * s) for p in self.bases[kind]]
+			self.scaled[(kind, index)] = shape
+
+		return shape
+
+
+
+# Shared by every fish
+shapeAssets = ShapeAssets()
+
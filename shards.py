@@ -0,0 +1,662 @@
+'''
+
+Shards
+===============================
+
+Splits the tank into vertical strips and runs each one in its own
+process, so World.update for thousands of fish is spread over every core.
+
+	python shards.py --fish 4000 --ticks 600
+	python shards.py --fish 4000 --shards 4 --circle-of-life
+	python shards.py --fish 2000 --window
+
+Or from code (import headless first if there's no window):
+
+	world = ShardedWorld(1400, 800, fish=4000, shards=4, seed=1)
+	world.update(1/60.0)
+	world.render()
+	world.close()
+
+Each worker runs an ordinary World, with the usual Guppy, Hunter and Food
+logic, but only keeps the agents in its own strip. After every tick the
+workers report back and ShardedWorld:
+
+	- hands fish and hunters that swam out of a strip to the strip
+	  they're in now, keeping their uid, size, sickness and so on
+	- gives every strip ghost copies of the other strips' fish within
+	  halo of its edges, and of every other hunter (see World.ghosts).
+	  Ghosts are found as neighbours, flocked with and hidden from, but
+	  never updated
+	- copies everything into a mirror World, which is what's rendered,
+	  so the tank still looks like one tank
+
+Every worker starts from the same seed, so they all build the same tank,
+rocks and starting fish and keep the ones in their strip. After that
+each strip rolls its own dice and hands out its own uids.
+
+Strips only see each other through ghosts, and a tick late, so:
+
+	- ghosts are where their owner left them at the end of the last tick
+	- neighbours further than halo across an edge are missed, so keep
+	  halo at least as big as the biggest neighbourDistance (300)
+	- food belongs to the strip it's dropped in (it falls straight
+	  down), so guppies only chase food in their own strip, and only race
+	  fish in their own strip for it
+	- hunters only eat fish in their own strip
+	- the same seed only gives the same run with the same number of
+	  shards, and it won't match an unsharded World
+	- the mirror is only for looking at. Adding food or fish to it, or
+	  toggling its settings, doesn't reach the workers, and resizing it
+	  doesn't resize their tanks
+
+'''
+
+import sys
+
+# Run headless from the command line, unless asked for a window
+if(__name__ == '__main__' and '--window' not in sys.argv): import headless
+
+from multiprocessing import Process, Pipe, cpu_count
+from random import Random
+from itertools import count
+import numpy as np
+
+from world import World
+from guppy import Guppy
+from hunter import Hunter
+from food import Food
+from benchmark import silenced
+
+
+# Columns of the arrays agents travel between processes in
+FISH_COLUMNS = ('uid', 'x', 'y', 'vx', 'vy', 'hx', 'hy', 'sx', 'sy', 'wanderX', 'wanderY', 'size', 'sickness', 'dead', 'parent')
+HUNTER_COLUMNS = ('uid', 'x', 'y', 'vx', 'vy', 'hx', 'hy', 'sx', 'sy', 'wanderX', 'wanderY', 'awake', 'toggleIn')
+FOOD_COLUMNS = ('uid', 'x', 'y', 'vx', 'vy', 'radius')
+
+
+
+'''
+
+Agent rows
+=================================='''
+
+
+# Where the agents are and which way they're going, straight out of the
+# agent store, in the first 9 columns of rows
+def fillMotion(world, agents, rows):
+
+	slots = np.array([a.slot for a in agents], dtype=int)
+	store = world.agents
+
+	rows[:, 0] = [a.uid for a in agents]
+	rows[:, 1:3] = store.pos[slots]
+	rows[:, 3:5] = store.vel[slots]
+	rows[:, 5:7] = store.heading[slots]
+	rows[:, 7:9] = store.side[slots]
+	rows[:, 9:11] = [a.wander_target.tuple() for a in agents]
+
+
+def applyMotion(agent, row):
+
+	agent.uid = int(row[0])
+	agent.pos.set(row.item(1), row.item(2))
+	agent.vel.set(row.item(3), row.item(4))
+	agent.heading.set(row.item(5), row.item(6))
+	agent.side.set(row.item(7), row.item(8))
+	agent.wander_target.set(row.item(9), row.item(10))
+
+
+def fishRows(world, fishes):
+
+	rows = np.zeros((len(fishes), len(FISH_COLUMNS)))
+	if(not len(fishes)): return rows
+
+	fillMotion(world, fishes, rows)
+	rows[:, 11] = [f.size for f in fishes]
+	rows[:, 12] = [f.sickness for f in fishes]
+	rows[:, 13] = [f.dead for f in fishes]
+	rows[:, 14] = [f.isParent for f in fishes]
+
+	return rows
+
+
+def applyFishRow(fish, row):
+
+	applyMotion(fish, row)
+
+	# Only touch what's changed, the setters recalculate stats and colours
+	fish.isParent = bool(row[14])
+	if(fish.size != row[11]): fish.size = row.item(11)
+	if(fish.sickness != row[12]): fish.sickness = row.item(12)
+	if(fish.dead != bool(row[13])): fish.dead = bool(row[13])
+
+	fish.beforeUpdate()
+
+
+# toggleIn is how long until the hunter next wakes up or falls asleep,
+# so it can carry on where it left off in another world
+def hunterRows(world, hunters):
+
+	rows = np.zeros((len(hunters), len(HUNTER_COLUMNS)))
+	if(not len(hunters)): return rows
+
+	fillMotion(world, hunters, rows)
+	rows[:, 11] = [h.awake for h in hunters]
+	rows[:, 12] = [toggleIn(world, h) for h in hunters]
+
+	return rows
+
+
+def toggleIn(world, hunter):
+
+	due = world.clock.due(hunter.toggleAwake)
+	return -1 if due is None else due - world.clock.time
+
+
+def applyHunterRow(hunter, row):
+
+	applyMotion(hunter, row)
+
+	if(hunter.awake != bool(row[11])): hunter.awake = bool(row[11])
+
+	# Only a hunter that's really ours gets to wake up and go to sleep
+	if(not hunter.ghost and row[12] >= 0):
+		hunter.world.clock.unschedule(hunter.toggleAwake)
+		hunter.world.clock.schedule_once(hunter.toggleAwake, row.item(12))
+
+	hunter.beforeUpdate()
+
+
+# Food doesn't get a uid from the world, so it's given one (from uids) the
+# first time it's sent
+def foodRows(world, uids):
+
+	food = [f for f in world.food if not f.eaten]
+	for f in food:
+		if(f.uid is None): f.uid = next(uids)
+
+	return np.array([(f.uid, f.pos.x, f.pos.y, f.vel.x, f.vel.y, f.boundingRadius) for f in food], dtype=float).reshape(-1, len(FOOD_COLUMNS))
+
+
+def applyFoodRow(food, row):
+
+	food.uid = int(row[0])
+	food.pos.set(row.item(1), row.item(2))
+	food.vel.set(row.item(3), row.item(4))
+	food.boundingRadius = row.item(5)
+
+
+# Brings agents (uid -> agent) in line with rows, making agents for new
+# uids and releasing the ones that aren't there any more. Returns the
+# new uid -> agent map.
+def syncAgents(agents, rows, make, apply, release):
+
+	current = {}
+
+	for row in rows:
+		uid = int(row[0])
+		agent = agents.pop(uid, None) or make()
+		apply(agent, row)
+		current[uid] = agent
+
+	[release(agent) for agent in agents.itervalues()]
+
+	return current
+
+
+
+'''
+
+Strips
+=================================='''
+
+
+"""
+Vertical strips of equal width across the world, numbered left to right.
+Anything outside the world belongs to the nearest strip.
+
+"""
+class Strips(object):
+
+	def __init__(self, width, count):
+
+		self.count = count
+		self.width = width / float(count)
+
+
+	def index(self, x):
+
+		return min(max(int(x / self.width), 0), self.count - 1)
+
+
+	def indices(self, xs):
+
+		return np.clip(np.floor(xs / self.width), 0, self.count - 1).astype(int)
+
+
+	def bounds(self, index):
+
+		return (index * self.width, (index + 1) * self.width)
+
+
+
+'''
+
+Workers
+=================================='''
+
+
+"""
+One strip of the tank, run by a worker process. Owns the fish, hunters
+and food in its strip, and keeps ghosts of its neighbours' agents.
+
+"""
+class Shard(object):
+
+	def __init__(self, index, config):
+
+		self.index = index
+		self.strips = Strips(config['width'], config['shards'])
+
+		# Everyone builds the same world from the same seed...
+		world = World(config['width'], config['height'], seed=config['seed'], rocks=config['rocks'],
+			hunters=config['hunters'], stats=config['stats'])
+		world.lionKing = config['lionKing']
+		world.addFish(config['fish'])
+		self.world = world
+
+		# ...and keeps its own bit of it
+		self.dropFish([f for f in world.fishes if not self.owns(f)])
+		self.dropHunters([h for h in world.hunters if not self.owns(h)])
+
+		# From here on every strip rolls its own dice, and hands out
+		# uids no other strip will
+		world.makeRandom(config['seed'] * config['shards'] + index)
+		world.uids = count(next(world.uids) + index, config['shards'])
+		self.foodUids = count(index, config['shards'])
+
+		self.ghostFish = {}
+		self.ghostHunters = {}
+
+
+	def owns(self, agent):
+
+		return self.strips.index(agent.pos.x) == self.index
+
+
+	def dropFish(self, fishes):
+
+		gone = set(fishes)
+		self.world.fishes = [f for f in self.world.fishes if f not in gone]
+		[self.releaseFish(f) for f in fishes]
+
+
+	def dropHunters(self, hunters):
+
+		gone = set(hunters)
+		self.world.hunters = [h for h in self.world.hunters if h not in gone]
+		[self.releaseHunter(h) for h in hunters]
+
+
+	def releaseFish(self, fish):
+
+		self.world.agents.release(fish.slot)
+
+
+	def releaseHunter(self, hunter):
+
+		self.world.clock.unschedule(hunter.toggleAwake)
+		self.world.agents.release(hunter.slot)
+
+
+	def makeGhostFish(self):
+
+		fish = Guppy(world=self.world, scale=10)
+		fish.ghost = True
+		return fish
+
+
+	def makeGhostHunter(self):
+
+		hunter = Hunter(world=self.world)
+		hunter.ghost = True
+		self.world.clock.unschedule(hunter.toggleAwake)
+		return hunter
+
+
+	# Takes in fish and hunters that have just swum into our strip
+	def adopt(self, fishes, hunters):
+
+		world = self.world
+
+		for row in fishes:
+			fish = Guppy(world=world, scale=10)
+			applyFishRow(fish, row)
+			world.fishes.append(fish)
+
+		for row in hunters:
+			hunter = Hunter(world=world)
+			applyHunterRow(hunter, row)
+			world.hunters.append(hunter)
+
+
+	# Swaps last tick's ghosts for this tick's
+	def haunt(self, fishes, hunters):
+
+		world = self.world
+
+		self.ghostFish = syncAgents(self.ghostFish, fishes, self.makeGhostFish, applyFishRow, self.releaseFish)
+		self.ghostHunters = syncAgents(self.ghostHunters, hunters, self.makeGhostHunter, applyHunterRow, self.releaseHunter)
+
+		world.ghosts = self.ghostFish.values()
+		world.hunters = [h for h in world.hunters if not h.ghost] + self.ghostHunters.values()
+
+
+	def step(self, delta, fishes, hunters, ghostFish, ghostHunters):
+
+		self.adopt(fishes, hunters)
+		self.haunt(ghostFish, ghostHunters)
+
+		self.world.update(delta)
+
+		# Food's dropped all over the tank, we only keep what lands here
+		self.world.food = [f for f in self.world.food if self.owns(f)]
+
+		return self.report()
+
+
+	# Everything we own, and everything that's just left our strip (which
+	# we let go of)
+	def report(self):
+
+		world = self.world
+
+		fishes = [f for f in world.fishes if not f.ghost]
+		hunters = [h for h in world.hunters if not h.ghost]
+		leavingFish = [f for f in fishes if not self.owns(f)]
+		leavingHunters = [h for h in hunters if not self.owns(h)]
+
+		report = {
+			'leavingFish': fishRows(world, leavingFish),
+			'leavingHunters': hunterRows(world, leavingHunters),
+		}
+
+		self.dropFish(leavingFish)
+		self.dropHunters(leavingHunters)
+
+		report['fish'] = fishRows(world, world.fishes)
+		report['hunters'] = hunterRows(world, [h for h in world.hunters if not h.ghost])
+		report['food'] = foodRows(world, self.foodUids)
+
+		return report
+
+
+# Runs a shard in its own process, stepping it whenever it's sent
+# something and stopping when it's sent None
+def work(connection, index, config):
+
+	with silenced():
+		shard = Shard(index, config)
+		connection.send(shard.report())
+
+		while True:
+			message = connection.recv()
+			if(message is None): break
+
+			connection.send(shard.step(*message))
+
+	connection.close()
+
+
+
+'''
+
+Coordinator
+=================================='''
+
+
+"""
+A World split across worker processes, one per vertical strip (one per
+core by default). Has World's update, render and resize, and the mirror
+World it renders is there to look at as world.
+
+"""
+class ShardedWorld(object):
+
+	def __init__(self, width, height, fish=10, shards=None, seed=None, rocks=10, hunters=1, lionKing=False, stats=None, halo=300):
+
+		# Workers need to agree on a seed, even if we weren't given one
+		if(seed is None): seed = Random().getrandbits(32)
+
+		self.shards = shards or cpu_count()
+		self.halo = halo
+		self.strips = Strips(width, self.shards)
+		self.time = 0.0
+
+		self.config = {
+			'width': width,
+			'height': height,
+			'shards': self.shards,
+			'seed': seed,
+			'fish': fish,
+			'rocks': rocks,
+			'hunters': hunters,
+			'lionKing': lionKing,
+			'stats': stats
+		}
+
+		self.makeMirror()
+		self.startWorkers()
+
+
+	# Same tank and rocks as the workers (it's the same seed), nothing
+	# else until the first reports come in
+	def makeMirror(self):
+
+		c = self.config
+
+		self.world = World(c['width'], c['height'], seed=c['seed'], rocks=c['rocks'], hunters=0, stats=c['stats'])
+		self.world.lionKing = False
+		self.world.livingFishes = []
+
+		self.mirrorFish = {}
+		self.mirrorHunters = {}
+		self.mirrorFood = {}
+
+
+	def startWorkers(self):
+
+		self.connections = []
+		self.workers = []
+
+		for index in xrange(self.shards):
+			ours, theirs = Pipe()
+			worker = Process(target=work, args=(theirs, index, self.config))
+			worker.daemon = True
+			worker.start()
+
+			self.connections.append(ours)
+			self.workers.append(worker)
+
+		self.gather()
+
+
+	def update(self, delta):
+
+		self.time += delta
+
+		# Everyone steps at once, then we wait for them all
+		[c.send((delta,) + self.inbound[i]) for i, c in enumerate(self.connections)]
+		self.gather()
+
+		self.world._clock = self.time
+		self.world.updateObstacles(delta)
+
+
+	def gather(self):
+
+		reports = [c.recv() for c in self.connections]
+
+		self.route(reports)
+		self.reflect(reports)
+
+
+	# Works out what each strip gets sent next tick: the agents that
+	# have just moved into it, and ghosts of everything near it
+	def route(self, reports):
+
+		leavingFish = np.concatenate([r['leavingFish'] for r in reports])
+		leavingHunters = np.concatenate([r['leavingHunters'] for r in reports])
+		fish = np.concatenate([r['fish'] for r in reports] + [leavingFish])
+		hunters = np.concatenate([r['hunters'] for r in reports] + [leavingHunters])
+
+		fishStrip = self.strips.indices(fish[:, 1])
+		hunterStrip = self.strips.indices(hunters[:, 1])
+		leavingFishStrip = self.strips.indices(leavingFish[:, 1])
+		leavingHunterStrip = self.strips.indices(leavingHunters[:, 1])
+
+		self.inbound = []
+
+		for index in xrange(self.shards):
+			left, right = self.strips.bounds(index)
+			near = (fishStrip != index) & (fish[:, 1] >= left - self.halo) & (fish[:, 1] < right + self.halo)
+
+			self.inbound.append((
+				leavingFish[leavingFishStrip == index],
+				leavingHunters[leavingHunterStrip == index],
+				fish[near],
+				hunters[hunterStrip != index]
+			))
+
+
+	# Copies every strip's agents into the mirror
+	def reflect(self, reports):
+
+		world = self.world
+		fish = np.concatenate([r['fish'] for r in reports] + [r['leavingFish'] for r in reports])
+		hunters = np.concatenate([r['hunters'] for r in reports] + [r['leavingHunters'] for r in reports])
+
+		food = np.concatenate([r['food'] for r in reports])
+
+		# New agents say hello when they're made, which we don't want to
+		# hear every time one swims into view
+		with silenced():
+			self.mirrorFish = syncAgents(self.mirrorFish, fish, self.makeMirrorFish, applyFishRow, self.releaseMirrorAgent)
+			self.mirrorHunters = syncAgents(self.mirrorHunters, hunters, self.makeMirrorHunter, applyHunterRow, self.releaseMirrorAgent)
+			self.mirrorFood = syncAgents(self.mirrorFood, food, self.makeMirrorFood, applyFoodRow, self.releaseMirrorFood)
+
+		world.fishes = [self.mirrorFish[uid] for uid in sorted(self.mirrorFish)]
+		world.hunters = [self.mirrorHunters[uid] for uid in sorted(self.mirrorHunters)]
+		world.livingFishes = [f for f in world.fishes if not f.dead]
+		world.food = [self.mirrorFood[uid] for uid in sorted(self.mirrorFood)]
+
+
+	def makeMirrorFish(self):
+
+		return Guppy(world=self.world, scale=10)
+
+
+	# Mirrored hunters don't keep their own time, they're told when
+	# they're awake
+	def makeMirrorHunter(self):
+
+		hunter = Hunter(world=self.world)
+		hunter.ghost = True
+		self.world.clock.unschedule(hunter.toggleAwake)
+		return hunter
+
+
+	def releaseMirrorAgent(self, agent):
+
+		self.world.agents.release(agent.slot)
+
+
+	def makeMirrorFood(self):
+
+		return Food(world=self.world)
+
+
+	# Food isn't kept in the agent store, so there's nothing to give back
+	def releaseMirrorFood(self, food):
+
+		pass
+
+
+	def render(self):
+
+		self.world.render()
+
+
+	def resize(self, width, height):
+
+		self.world.resize(width, height)
+
+
+	def close(self):
+
+		for connection in self.connections:
+			connection.send(None)
+			connection.close()
+
+		[worker.join() for worker in self.workers]
+		self.connections = []
+		self.workers = []
+
+
+
+# Steps a sharded world in a window, drawing the mirror
+def watch(world, width, height):
+
+	from pyglet import window, clock
+	from pyglet.gl import glClear, GL_COLOR_BUFFER_BIT
+	from graphics import egi
+
+	win = window.Window(width=width, height=height, vsync=True)
+	egi.InitWithPyglet(win)
+
+	while not win.has_exit:
+		win.dispatch_events()
+		glClear(GL_COLOR_BUFFER_BIT)
+
+		world.update(clock.tick())
+		world.render()
+
+		win.flip()
+
+
+
+if __name__ == '__main__':
+
+	import argparse
+	from timeit import default_timer as timer
+
+	parser = argparse.ArgumentParser(description='Run the fish tank split across processes')
+	parser.add_argument('--width', type=int, default=1400)
+	parser.add_argument('--height', type=int, default=800)
+	parser.add_argument('--fish', type=int, default=2000)
+	parser.add_argument('--shards', type=int, help='worker processes (default one per core)')
+	parser.add_argument('--halo', type=float, default=300, help='how far across an edge strips see each other')
+	parser.add_argument('--ticks', type=int, default=600)
+	parser.add_argument('--delta', type=float, default=1/60.0)
+	parser.add_argument('--circle-of-life', action='store_true', help='auto feeding and sickness')
+	parser.add_argument('--seed', type=int, default=None)
+	parser.add_argument('--window', action='store_true', help='draw the tank instead of running a fixed number of ticks')
+	args = parser.parse_args()
+
+	world = ShardedWorld(args.width, args.height, fish=args.fish, shards=args.shards, seed=args.seed,
+		lionKing=args.circle_of_life, halo=args.halo)
+
+	try:
+		if(args.window):
+			watch(world, args.width, args.height)
+		else:
+			# Keep thousands of guppy greetings out of the way
+			with silenced():
+				start = timer()
+				[world.update(args.delta) for _ in xrange(args.ticks)]
+				seconds = timer() - start
+
+			living = len(world.world.livingFishes)
+			print 'shards: %d, ticks/s: %.1f, fish: %d (%d living), food: %d' % (world.shards, args.ticks / seconds, len(world.world.fishes), living, len(world.world.food))
+	finally:
+		world.close()
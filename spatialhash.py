@@ -0,0 +1,151 @@
+'''
+
+Spatial Hash
+=================================='''
+
+from math import floor, ceil
+import numpy as np
+
+
+"""
+Uniform grid that buckets agents by position so radius queries only
+have to look at the cells around the query point.
+
+Items are remembered in the order they were inserted, and queries return
+them in that order, so results match a plain scan over the source list.
+
+"""
+class SpatialHash(object):
+
+	def __init__(self, cellSize=100.0):
+
+		self.cellSize = float(cellSize)
+		self.clear()
+
+
+	def clear(self):
+
+		self.cells = {}
+
+		# id(item) -> (order, cell key) so we can move items between cells
+		self._entries = {}
+		self._nextOrder = 0
+
+
+	def key(self, pos):
+
+		size = self.cellSize
+		return (int(floor(pos.x / size)), int(floor(pos.y / size)))
+
+
+	def insert(self, item):
+
+		key = self.key(item.pos)
+		order = self._nextOrder
+		self._nextOrder += 1
+
+		self._entries[id(item)] = (order, key)
+		self.cells.setdefault(key, []).append((order, item))
+
+
+	# Rebucket an item after its position has changed
+	# Items that were never inserted are ignored
+	def move(self, item):
+
+		entry = self._entries.get(id(item))
+		if(entry is None): return
+
+		order, oldKey = entry
+		newKey = self.key(item.pos)
+		if(newKey == oldKey): return
+
+		cell = self.cells[oldKey]
+		cell.remove((order, item))
+		if(not len(cell)): del self.cells[oldKey]
+
+		self._entries[id(item)] = (order, newKey)
+		self.cells.setdefault(newKey, []).append((order, item))
+
+
+	# Returns every item (other than exclude) strictly within distance of pos
+	def query(self, pos, distance, exclude=None):
+
+		distanceSq = distance**2
+		reach = self.reach(distance)
+		cx, cy = self.key(pos)
+		cells = self.cells
+
+		found = []
+		for x in xrange(cx - reach, cx + reach + 1):
+			for y in xrange(cy - reach, cy + reach + 1):
+				cell = cells.get((x, y))
+				if(cell is None): continue
+
+				for order, item in cell:
+					if(item is not exclude and item.pos.distanceSq(pos) < distanceSq):
+						found.append((order, item))
+
+		found.sort(key=lambda entry: entry[0])
+
+		return [item for order, item in found]
+
+
+	# Returns (first, second) arrays of insertion orders for every pair of
+	# items strictly closer than distance. Each pair appears once, with
+	# first < second. positions[order] must hold each item's (x, y).
+	def pairs(self, positions, distance):
+
+		reach = self.reach(distance)
+
+		# Only look 'forwards' so neighbouring cells are paired up once
+		offsets = [(dx, dy) for dx in xrange(0, reach + 1) for dy in xrange(-reach, reach + 1) if dx > 0 or dy > 0]
+
+		orders = dict((key, np.array([order for order, item in cell], dtype=int)) for key, cell in self.cells.iteritems())
+
+		firsts = []
+		seconds = []
+		for (cx, cy), a in orders.iteritems():
+
+			# Pairs inside the cell
+			i, j = np.triu_indices(len(a), 1)
+			firsts.append(a[i])
+			seconds.append(a[j])
+
+			# Pairs with the cells around it
+			for dx, dy in offsets:
+				b = orders.get((cx + dx, cy + dy))
+				if(b is None): continue
+
+				firsts.append(np.repeat(a, len(b)))
+				seconds.append(np.tile(b, len(a)))
+
+		if(not len(firsts)):
+			return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+		first = np.concatenate(firsts)
+		second = np.concatenate(seconds)
+
+		d = positions[second] - positions[first]
+		close = (d * d).sum(axis=1) < distance**2
+
+		first = first[close]
+		second = second[close]
+
+		return np.minimum(first, second), np.maximum(first, second)
+
+
+	# How many cells out we need to look to cover distance
+	def reach(self, distance):
+
+		return int(ceil(distance / self.cellSize))
+
+
+	@staticmethod
+	def build(items, cellSize):
+
+		grid = SpatialHash(cellSize)
+		for item in items:
+			grid.insert(item)
+
+		return grid
+
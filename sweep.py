@@ -0,0 +1,323 @@
+'''
+
+Sweep
+===============================
+
+Runs the same headless simulation for lots of different Guppy and Hunter
+stats at once, spread over a process pool (one worker per core by
+default), and boils each run down to a few population and survival
+numbers, so stats can be tuned for ecosystem balance without watching a
+window.
+
+	python sweep.py --grid "guppy.speed=(200,100);(250,120)" --grid "hunter.maxSpeed=50;80"
+	python sweep.py --range "guppy.neighbourDistance=(50,150):(150,400)" --samples 20
+	python sweep.py --grid "guppy.flockingInfluence=(0.25,0);(0.5,0.1)" --seeds 4 --output results.csv
+
+--grid runs every combination of the values given (separated by ;),
+--range picks --samples random parameter sets between lo:hi instead
+(element by element for guppy stats, which are child/parent pairs).
+Values are Python literals. Every parameter set is run once per seed,
+and the results table has one row per parameter set, averaged over its
+seeds:
+
+	living      living fish at the end
+	peak/low    most and fewest living fish at any tick
+	born        fish born during the run
+	eaten       fish eaten by hunters
+	sick        fish that died of sickness
+	survival    fraction of the starting fish still alive at the end
+	extinct     how many of the seeds ended with no living fish
+
+Circle of life (auto feeding, sickness and babies) is on, since there's
+not much of an ecosystem without it.
+
+'''
+
+import headless
+
+import sys
+import csv
+import argparse
+import itertools
+from ast import literal_eval
+from multiprocessing import Pool, cpu_count
+from random import Random
+
+from world import World
+from benchmark import silenced, WIDTH, HEIGHT
+
+
+# Metrics in the order they're shown, and how they're formatted
+METRICS = [
+	('living', '%7.1f'),
+	('peak', '%7.1f'),
+	('low', '%7.1f'),
+	('born', '%7.1f'),
+	('eaten', '%7.1f'),
+	('sick', '%7.1f'),
+	('survival', '%8.2f')
+]
+
+
+
+'''
+
+Parameter sets
+=================================='''
+
+
+# Splits 'kind.stat=values' into ('kind.stat', 'values'), raising a
+# ValueError if it's not a stat World can override
+def splitParam(text):
+
+	name, values = text.split('=', 1)
+	name = name.strip()
+
+	if('.' not in name):
+		raise ValueError('%r needs to be kind.stat, eg. guppy.speed' % name)
+
+	kind, stat = name.split('.', 1)
+	World.checkStat(kind, stat)
+
+	return name, values
+
+
+# Parses a value for 'kind.stat', raising a ValueError if it's the wrong
+# shape for that stat (see World.checkStat)
+def parseValue(name, text):
+
+	value = literal_eval(text.strip())
+
+	kind, stat = name.split('.', 1)
+	World.checkStat(kind, stat, value)
+
+	return value
+
+
+# Every combination of the values in grid, which maps
+# 'kind.stat' -> list of values
+def gridParams(grid):
+
+	names = sorted(grid)
+	return [dict(zip(names, values)) for values in itertools.product(*[grid[n] for n in names])]
+
+
+# count parameter sets picked uniformly between each (lo, hi) in ranges.
+# Tuples are sampled element by element.
+def sampleParams(ranges, count, rng):
+
+	def pick(lo, hi):
+		if(isinstance(lo, tuple)):
+			return tuple(pick(l, h) for l, h in zip(lo, hi))
+		return rng.uniform(lo, hi)
+
+	names = sorted(ranges)
+	return [dict((n, pick(*ranges[n])) for n in names) for _ in xrange(count)]
+
+
+# {'guppy.speed': x, 'hunter.maxSpeed': y} -> the stats World expects
+def statOverrides(params):
+
+	stats = {}
+	for name, value in params.iteritems():
+		kind, stat = name.split('.', 1)
+		stats.setdefault(kind, {})[stat] = value
+
+	return stats
+
+
+
+'''
+
+Running
+=================================='''
+
+
+# Runs one simulation and returns its metrics. Lives at the top level
+# so the pool can pickle it.
+def runOne(job):
+
+	config = job['config']
+
+	with silenced():
+		world = World(WIDTH, HEIGHT, seed=job['seed'], rocks=config['rocks'], hunters=config['hunters'], stats=statOverrides(job['params']))
+		world.lionKing = True
+		world.addFish(config['fish'])
+
+		initial = list(world.fishes)
+		seen = set(initial)
+		dead = set()
+
+		# Guppies die once they're within 1 of being as sick as they can be
+		sickest = initial[0]._sicknessDomain[1] - 1 if len(initial) else 0
+
+		born = eaten = sick = 0
+		peak = low = len(initial)
+
+		for _ in xrange(config['ticks']):
+			world.update(config['delta'])
+
+			living = 0
+			for f in world.fishes:
+				if(f not in seen):
+					seen.add(f)
+					born += 1
+
+				if(not f.dead):
+					living += 1
+				elif(f not in dead):
+					dead.add(f)
+					if(f.sickness > sickest): sick += 1
+					else: eaten += 1
+
+			peak = max(peak, living)
+			low = min(low, living)
+
+	return {
+		'params': job['params'],
+		'seed': job['seed'],
+		'living': living if config['ticks'] else len(initial),
+		'peak': peak,
+		'low': low,
+		'born': born,
+		'eaten': eaten,
+		'sick': sick,
+		'survival': len([f for f in initial if not f.dead]) / float(max(len(initial), 1))
+	}
+
+
+# Runs every parameter set once per seed over a pool of processes,
+# and returns the per-run metrics in whatever order they finish
+def runSweep(paramSets, seeds, config, processes=None):
+
+	jobs = [{'params': params, 'seed': seed, 'config': config} for params in paramSets for seed in seeds]
+
+	pool = Pool(processes or cpu_count())
+	runs = []
+
+	try:
+		for run in pool.imap_unordered(runOne, jobs):
+			runs.append(run)
+			sys.stderr.write('\r%d/%d runs' % (len(runs), len(jobs)))
+		sys.stderr.write('\n')
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+	return runs
+
+
+
+'''
+
+Results
+=================================='''
+
+
+# One row per parameter set, with each metric averaged over its seeds
+def aggregate(runs):
+
+	groups = {}
+	for run in runs:
+		key = tuple(sorted(run['params'].iteritems()))
+		groups.setdefault(key, []).append(run)
+
+	rows = []
+	for key, group in groups.iteritems():
+		row = {'params': dict(key), 'runs': len(group)}
+		for name, fmt in METRICS:
+			row[name] = sum(r[name] for r in group) / float(len(group))
+		row['extinct'] = len([r for r in group if r['living'] == 0])
+		rows.append(row)
+
+	return rows
+
+
+def formatValue(value):
+
+	if(isinstance(value, tuple)):
+		return '(%s)' % ', '.join(formatValue(v) for v in value)
+	if(isinstance(value, float)):
+		return '%.4g' % value
+	return str(value)
+
+
+def printTable(rows, names):
+
+	columns = [max([len(n)] + [len(formatValue(r['params'][n])) for r in rows]) for n in names]
+
+	header = ['%-*s' % (w, n) for n, w in zip(names, columns)]
+	header += ['%*s' % (len(fmt % 0), name) for name, fmt in METRICS]
+	print ' '.join(header + ['%5s %7s' % ('runs', 'extinct')])
+
+	for r in rows:
+		line = ['%-*s' % (w, formatValue(r['params'][n])) for n, w in zip(names, columns)]
+		line += [fmt % r[name] for name, fmt in METRICS]
+		print ' '.join(line + ['%5d %7d' % (r['runs'], r['extinct'])])
+
+
+def writeCsv(path, rows, names):
+
+	with open(path, 'wb') as f:
+		writer = csv.writer(f)
+		writer.writerow(names + [name for name, fmt in METRICS] + ['runs', 'extinct'])
+		for r in rows:
+			writer.writerow([formatValue(r['params'][n]) for n in names] + [r[name] for name, fmt in METRICS] + [r['runs'], r['extinct']])
+
+
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description='Run headless worlds over a grid or random sample of stats')
+	parser.add_argument('--grid', action='append', default=[], metavar='KIND.STAT=V1;V2', help='values to try (repeatable)')
+	parser.add_argument('--range', action='append', default=[], metavar='KIND.STAT=LO:HI', help='range to sample from (repeatable)')
+	parser.add_argument('--samples', type=int, default=10, help='parameter sets to sample when using --range')
+	parser.add_argument('--seeds', type=int, default=3, help='runs per parameter set, each with its own seed')
+	parser.add_argument('--seed', type=int, default=1, help='first seed (also seeds the sampling)')
+	parser.add_argument('--ticks', type=int, default=3600)
+	parser.add_argument('--delta', type=float, default=1/60.0)
+	parser.add_argument('--fish', type=int, default=30)
+	parser.add_argument('--rocks', type=int, default=10)
+	parser.add_argument('--hunters', type=int, default=1)
+	parser.add_argument('--processes', type=int, help='worker processes (default one per core)')
+	parser.add_argument('--sort', default='living', choices=[name for name, fmt in METRICS], help='sort the table by this, highest first')
+	parser.add_argument('--output', help='write the results table to this CSV file')
+	args = parser.parse_args()
+
+	if(args.grid and args.range):
+		parser.error('use either --grid or --range, not both')
+
+	if(args.range):
+		ranges = {}
+		for text in args.range:
+			name, values = splitParam(text)
+			lo, hi = values.split(':')
+			ranges[name] = (parseValue(name, lo), parseValue(name, hi))
+		paramSets = sampleParams(ranges, args.samples, Random(args.seed))
+	else:
+		grid = {}
+		for text in args.grid:
+			name, values = splitParam(text)
+			grid[name] = [parseValue(name, v) for v in values.split(';')]
+		paramSets = gridParams(grid)
+
+	config = {
+		'ticks': args.ticks,
+		'delta': args.delta,
+		'fish': args.fish,
+		'rocks': args.rocks,
+		'hunters': args.hunters
+	}
+	seeds = range(args.seed, args.seed + args.seeds)
+
+	rows = aggregate(runSweep(paramSets, seeds, config, args.processes))
+	rows.sort(key=lambda r: -r[args.sort])
+
+	names = sorted(paramSets[0])
+	printTable(rows, names)
+
+	if(args.output):
+		writeCsv(args.output, rows, names)
@@ -2,7 +2,6 @@ from vector2d import Rect
 from util import DictWrap
 from graphics import egi
 from matrix33 import Matrix33
-from random import uniform
 from vector2d import Vector2D, Points
 from math import sin, pi, cos
 import inspect
@@ -33,9 +32,11 @@ class Tank(object):
 
 		
 
-	def randomPosition(self):
+	# Uses the world's tank random stream unless given another one
+	def randomPosition(self, rng=None):
+		rng = rng or self.world.random.tank
 		pb = self.paddedBox
-		return Vector2D(uniform(pb.left, pb.right), uniform(pb.bottom, pb.top))
+		return Vector2D(rng.uniform(pb.left, pb.right), rng.uniform(pb.bottom, pb.top))
 		
 
 	def resize(self):
@@ -0,0 +1,93 @@
+'''
+
+Checkpoint tests
+=================================='''
+
+import headless
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from vector2d import Rect
+from world import World
+
+
+class CheckpointTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, 'tank.fishy')
+
+
+	def tearDown(self):
+
+		shutil.rmtree(self.directory)
+
+
+	def makeWorld(self):
+
+		world = World(1400, 800, seed=5)
+		world.lionKing = True
+		world.addFish(40)
+
+		return world
+
+
+	# Saves world, loads it back, then steps both and checks they stay
+	# the same the whole way
+	def assertCarriesOn(self, world, ticks=120):
+
+		world.save(self.path)
+		loaded = World.load(self.path)
+
+		for tick in xrange(ticks):
+			world.update(1/60.0)
+			loaded.update(1/60.0)
+			self.assertEqual(world.stateSnapshot(), loaded.stateSnapshot(), 'diverged at tick %d' % tick)
+
+		return loaded
+
+
+	def test_round_trip(self):
+
+		world = self.makeWorld()
+		headless.run(world, 30)
+
+		self.assertCarriesOn(world)
+
+
+	def test_round_trip_with_lod(self):
+
+		world = self.makeWorld()
+		world.lod.enabled = True
+		world.lod.viewport = Rect({'left': 0, 'top': 800, 'right': 700, 'bottom': 0})
+		headless.run(world, 30)
+
+		loaded = self.assertCarriesOn(world)
+
+		self.assertTrue(loaded.lod.enabled)
+		self.assertEqual(loaded.lod.viewport.getBox(), world.lod.viewport.getBox())
+		self.assertEqual(loaded.lod.counts, world.lod.counts)
+
+
+	def test_round_trip_with_decisions(self):
+
+		world = self.makeWorld()
+		world.decisions.enabled = True
+		world.decisions.budget = None
+		world.decisions.limit = 10
+		headless.run(world, 30)
+
+		loaded = self.assertCarriesOn(world)
+
+		self.assertTrue(loaded.decisions.enabled)
+		self.assertEqual(loaded.decisions.limit, 10)
+		self.assertEqual([f.uid for f in loaded.decisions.pending()[0]], [f.uid for f in world.decisions.pending()[0]])
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,80 @@
+'''
+
+Decision Scheduler tests
+=================================='''
+
+import headless
+
+import unittest
+
+from guppy import Guppy
+from world import World
+
+
+class DecisionSchedulerTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.world = World(900, 700, seed=8)
+		self.world.addFish(12)
+
+		decisions = self.world.decisions
+		decisions.enabled = True
+		decisions.budget = None
+		decisions.limit = 3
+
+		self.turns = {}
+
+
+	# Counts every turn fish gets from now on
+	def count(self, fish):
+
+		self.turns[fish] = 0
+		decide = fish.decide
+
+		def counted():
+			self.turns[fish] += 1
+			decide()
+
+		fish.decide = counted
+
+
+	def test_everyone_gets_a_turn(self):
+
+		world = self.world
+
+		# Like a fish adopted from another shard, which keeps its old
+		# (smaller) uid but goes on the end
+		stray = Guppy(world=world, scale=10)
+		stray.uid = -1
+		world.fishes.append(stray)
+
+		world.update(1/60.0)
+		[self.count(f) for f in world.fishes]
+
+		# At most 12 fish besides the debug one, 2 of them a turn each update
+		for _ in xrange(6):
+			world.update(1/60.0)
+
+		living = world.blackboard.livingFishes
+		self.assertIn(stray, living)
+		self.assertEqual(self.turns[world.fishes[0]], 6)
+		self.assertTrue(all(self.turns[f] >= 1 for f in living))
+
+
+	def test_hurried_fish_go_first(self):
+
+		world = self.world
+		world.update(1/60.0)
+
+		fish = world.fishes[7]
+		self.count(fish)
+		world.decisions.hurry(fish)
+		world.update(1/60.0)
+
+		self.assertEqual(self.turns[fish], 1)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,78 @@
+'''
+
+Level Of Detail tests
+=================================='''
+
+import headless
+
+import unittest
+
+from vector2d import Rect
+from world import World
+
+
+class LevelOfDetailTest(unittest.TestCase):
+
+	def setUp(self):
+
+		self.world = World(900, 700, seed=3)
+		self.world.addFish(5)
+		self.world.lod.enabled = True
+
+		# Only the left third of the tank's on screen
+		self.world.lod.viewport = Rect({'left': 0, 'top': 700, 'right': 300, 'bottom': 0})
+
+		self.fish = self.world.fishes[1]
+		self.fish.pos.set(800, 350)
+
+
+	def thinking(self):
+
+		return self.world.lod.thinking[self.world.fishes.index(self.fish)]
+
+
+	def test_off_screen_fish_coasts(self):
+
+		world = self.world
+		world.update(1/60.0)
+
+		thoughts = 0
+		start = self.fish.pos.copy()
+
+		for _ in xrange(16):
+			world.update(1/60.0)
+			self.assertEqual(self.fish.lodTier, 'minimal')
+			thoughts += self.thinking()
+
+		# Once every 8 updates, and still moving the rest of the time
+		self.assertFalse(self.fish.dead)
+		self.assertEqual(thoughts, 2)
+		self.assertNotEqual(self.fish.pos.tuple(), start.tuple())
+
+
+	def test_fish_coming_on_screen_thinks_straight_away(self):
+
+		world = self.world
+		world.lod.farDistance = 10000
+		world.update(1/60.0)
+		world.update(1/60.0)
+
+		self.fish.pos.set(150, 350)
+		world.update(1/60.0)
+
+		self.assertNotEqual(self.fish.lodTier, 'minimal')
+		self.assertTrue(self.thinking())
+
+
+	def test_off_by_default(self):
+
+		world = World(900, 700, seed=3)
+		world.addFish(5)
+		world.update(1/60.0)
+
+		self.assertEqual([f.lodTier for f in world.fishes], [None] * 5)
+
+
+
+if __name__ == '__main__':
+	unittest.main()
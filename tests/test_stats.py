@@ -0,0 +1,40 @@
+'''
+
+Stat override tests
+=================================='''
+
+import headless
+
+import unittest
+
+from world import World
+
+
+class StatOverrideTest(unittest.TestCase):
+
+	def test_good_overrides(self):
+
+		world = World(900, 700, seed=1, stats={'guppy': {'speed': (250, 120)}, 'hunter': {'maxSpeed': 70}})
+		world.addFish(1)
+
+		self.assertEqual(world.fishes[0]._stats['speed'], (250, 120))
+
+
+	def test_unknown_stat(self):
+
+		with self.assertRaisesRegexp(ValueError, 'guppy.sped'):
+			World(900, 700, stats={'guppy': {'sped': (1, 2)}})
+
+
+	def test_wrong_shape(self):
+
+		with self.assertRaisesRegexp(ValueError, 'guppy.speed'):
+			World(900, 700, stats={'guppy': {'speed': 100}})
+
+		with self.assertRaisesRegexp(ValueError, 'hunter.maxSpeed'):
+			World(900, 700, stats={'hunter': {'maxSpeed': (1, 2)}})
+
+
+
+if __name__ == '__main__':
+	unittest.main()
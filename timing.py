@@ -0,0 +1,89 @@
+'''
+
+Timing
+=================================='''
+
+from collections import deque
+from timeit import default_timer as timer
+
+
+"""
+Rolling per-phase timing stats.
+
+Time is added to named phases during an update (lap() makes chaining
+timers cheap), then commit() closes off the update so each phase keeps
+one total per update, for the last `window` updates.
+
+Nothing is recorded unless enabled is set, and callers are expected to
+check it before timing anything, so disabled timings cost nothing.
+
+"""
+class PhaseTimings(object):
+
+	def __init__(self, window=120, enabled=False):
+
+		self.window = window
+		self.enabled = enabled
+
+		self.reset()
+
+
+	def reset(self):
+
+		self._samples = {}
+		self._current = {}
+
+
+	def add(self, name, seconds):
+
+		self._current[name] = self._current.get(name, 0.0) + seconds
+
+
+	# Adds the time since start to name, and returns now so the next phase
+	# can carry on from here
+	def lap(self, name, start):
+
+		now = timer()
+		self.add(name, now - start)
+
+		return now
+
+
+	# Close off the current update
+	def commit(self):
+
+		for name, seconds in self._current.iteritems():
+			if(name not in self._samples):
+				self._samples[name] = deque(maxlen=self.window)
+			self._samples[name].append(seconds)
+
+		self._current = {}
+
+
+	# Returns {name: {'last', 'mean', 'max', 'count'}} in milliseconds
+	def stats(self):
+
+		result = {}
+
+		for name, samples in self._samples.iteritems():
+			result[name] = {
+				'last': samples[-1] * 1000,
+				'mean': sum(samples) / len(samples) * 1000,
+				'max': max(samples) * 1000,
+				'count': len(samples)
+			}
+
+		return result
+
+
+	def __str__(self):
+
+		stats = self.stats()
+		lines = ['%-22s %9s %9s %9s' % ('phase', 'last ms', 'mean ms', 'max ms')]
+
+		for name in sorted(stats, key=lambda n: -stats[n]['mean']):
+			s = stats[name]
+			lines.append('%-22s %9.3f %9.3f %9.3f' % (name, s['last'], s['mean'], s['max']))
+
+		return '\n'.join(lines)
+
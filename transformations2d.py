@@ -5,97 +5,68 @@ Created for HIT3046 AI for Games by Clinton Woodward cwoodward@swin.edu.au
 '''
 
 from matrix33 import Matrix33
+from vector2d import Vector2D
+import numpy as np
+
+# The transforms below work the scale, rotate and translate out directly
+# rather than building a Matrix33 for each step. Composed, they come to
+#
+#   x' = sx*x*forward.x + sy*y*side.x + pos.x
+#   y' = sx*x*forward.y + sy*y*side.y + pos.y
+#
+# The point list transforms also take an (n, 2) numpy array, in which
+# case they return a new array instead of a list of Vector2Ds.
 
 #------------------------------------------------------------------------------
 def WorldTransformScale(points, pos, forward, side, scale):
     ''' Transform the given list of points, using the provided position, 
         direction and scale, to object world space. '''
-    # make a copy of original points (so we don't trash them)
-    tran_points = [ pt.copy() for pt in points ]
-    # create a transformation matrix to perform the operations
-    matTransform = Matrix33()
-    # scale (but only if needed)
-    if (scale.x != 1.0) or (scale.y != 1.0):
-        matTransform.scale_update(scale.x, scale.y)
-    # rotate
-    matTransform.rotate_by_vectors_update(forward, side)
-    # and translate
-    matTransform.translate_update(pos.x, pos.y)
-    # now transform all the points (vertices)
-    matTransform.transform_vector2d_list(tran_points)
-    # done
-    return tran_points
+    return _transform_points(points, scale.x*forward.x, scale.x*forward.y,
+                             scale.y*side.x, scale.y*side.y, pos.x, pos.y)
 
 #------------------------------------------------------------------------------
 def WorldTransform(points, pos, forward, side):
     ''' Transform the given list of points, using the provided position and 
         direction, to objects world space. '''
-    # make a copy of original points (so we don't trash them)
-    tran_points = [ pt.copy() for pt in points ]
-    # create a transformation matrix to perform the operations
-    matTransform = Matrix33()
-    # rotate
-    matTransform.rotate_by_vectors_update(forward, side)
-    # and translate
-    matTransform.translate_update(pos.x, pos.y)
-    # now transform all the points (vertices)
-    matTransform.transform_vector2d_list(tran_points)
-    # done
-    return tran_points
+    return _transform_points(points, forward.x, forward.y, side.x, side.y, pos.x, pos.y)
 
 #------------------------------------------------------------------------------
-def PointToWorldSpace(point, pos, forward, side):
-    ''' Transforms a point from the agent's local space into world space'''
-    # make a copy of the point
-    TransPoint = point.copy()
-    # create a transformation matrix
-    matTransform = Matrix33()
-    # rotate
-    matTransform.rotate_by_vectors_update(forward, side)
-    # and translate
-    matTransform.translate_update(pos.x, pos.y)  
-    # now transform the vertices
-    matTransform.transform_vector2d(TransPoint)
-    return TransPoint
+def PointToWorldSpace(point, pos, forward, side, out=None):
+    ''' Transforms a point from the agent's local space into world space.
+        Writes into out (which can be point itself) if it's given. '''
+    x, y = point.x, point.y
+    if out is None:
+        return Vector2D(forward.x*x + side.x*y + pos.x, forward.y*x + side.y*y + pos.y)
+    return out.set(forward.x*x + side.x*y + pos.x, forward.y*x + side.y*y + pos.y)
 
 #------------------------------------------------------------------------------
 def VectorToWorldSpace(vec, forward, side):
     ''' Transforms a vector from the agent's local space into world space '''
-    # make a copy of the point
-    TransVec = vec.copy()
-    # create a transformation matrix
-    matTransform = Matrix33()
-    # rotate
-    matTransform.rotate_by_vectors_update(forward, side)
-    # now transform the vertices
-    matTransform.transform_vector2d(TransVec)
-    return TransVec
+    x, y = vec.x, vec.y
+    return Vector2D(forward.x*x + side.x*y, forward.y*x + side.y*y)
 
 #------------------------------------------------------------------------------
 def PointToLocalSpace(point, pos, forward, side):
     ''' Transform point to local space. '''
-    # make a copy of the point
-    TransPoint = point.copy() 
-    # We'll plug the changes straight in a matrix... save some time (perhaps)
     Tx = -pos.dot(forward)
     Ty = -pos.dot(side)
-    m = [forward.x, side.x, 0.0, forward.y, side.y, 0.0, Tx, Ty, 1.0]
-    matTransform = Matrix33(m)
-    # now transform the vertices
-    matTransform.transform_vector2d(TransPoint)
-    return TransPoint
+    x, y = point.x, point.y
+    return Vector2D(forward.x*x + forward.y*y + Tx, side.x*x + side.y*y + Ty)
 
 #------------------------------------------------------------------------------
 def VectorToLocalSpace(vec, forward, side):
     ''' Return a new vector with the translated direction '''
-    # make a copy of the point
-    TransVec = vec.copy()
-    # create the transformation matrix and plug values straight in
-    m = [forward.x, side.x, 0.0, forward.y, side.y, 0.0, 0, 0, 1.0]
-    matTransform = Matrix33(m)    
-    # now transform the vector
-    matTransform.transform_vector2d(TransVec)
-    return TransVec
+    x, y = vec.x, vec.y
+    return Vector2D(forward.x*x + forward.y*y, side.x*x + side.y*y)
+
+#------------------------------------------------------------------------------
+def _transform_points(points, a11, a12, a21, a22, a31, a32):
+    ''' New points from applying the (column 3 = 0,0,1) matrix with the
+        given values to points, a list of Vector2Ds or an (n, 2) array. '''
+    if isinstance(points, np.ndarray):
+        x, y = points[:, 0], points[:, 1]
+        return np.column_stack((a11*x + a21*y + a31, a12*x + a22*y + a32))
+    return [ Vector2D(a11*pt.x + a21*pt.y + a31, a12*pt.x + a22*pt.y + a32) for pt in points ]
 
 #------------------------------------------------------------------------------
 def Vec2DRotateAroundOrigin(vec, rads):
@@ -130,6 +130,14 @@ class Util(object):
 
         return f
 
+    # The value linearScale's function gives for x, without making one
+    @staticmethod
+    def linearValue(domain, range, x):
+
+        m = (range[1] - range[0]) / (domain[1] - domain[0])
+
+        return m * x + (range[1] - m * domain[1])
+
     # Returns a new array of points copied
     @staticmethod
     def copyPoints(points):
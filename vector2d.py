@@ -215,6 +215,45 @@ class Vector2D(object):
         ''' Simple copy Vector2D with self values '''
         return Vector2D(self.x, self.y)
 
+    # ----- In place versions, return self so they can be chained -----
+    # These don't create any new vectors, for use in the steering loops
+    # (together with +=, -=, *= and /=)
+
+    def set(self, x, y):
+        ''' set x and y '''
+        self.x = x
+        self.y = y
+        return self
+
+    def set_from(self, v):
+        ''' copy v's x and y into self '''
+        self.x = v.x
+        self.y = v.y
+        return self
+
+    def set_sub(self, a, b):
+        ''' self = a - b '''
+        self.x = a.x - b.x
+        self.y = a.y - b.y
+        return self
+
+    def set_scaled(self, v, s):
+        ''' self = v * s '''
+        self.x = v.x * s
+        self.y = v.y * s
+        return self
+
+    def add_scaled(self, v, s):
+        ''' self += v * s (fused multiply-add) '''
+        self.x += v.x * s
+        self.y += v.y * s
+        return self
+
+    def set_perp(self, v):
+        ''' self = v.perp() '''
+        self.x, self.y = -v.y, v.x
+        return self
+
     def __iadd__(self, rhs): # +=
         self.x += rhs.x
         self.y += rhs.y
@@ -261,5 +300,8 @@ class Vector2D(object):
         return '(%7.2f, %7.2f)' % (self.x, self.y)
 
     @staticmethod
-    def random(magnitude=1):
-        return Vector2D(uniform(0, 1), uniform(0, 1)).normalise() * magnitude
+    def random(magnitude=1, rng=None):
+        ''' random direction with the given length. Pass a random.Random
+            as rng to draw from it instead of the global generator. '''
+        u = rng.uniform if rng is not None else uniform
+        return Vector2D(u(0, 1), u(0, 1)).normalise() * magnitude
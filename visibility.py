@@ -0,0 +1,95 @@
+'''
+
+Visibility
+=================================='''
+
+from math import atan2, asin, sqrt, pi
+from bisect import bisect_right
+
+
+"""
+What a viewer at origin can't see past the obstacles around it.
+
+Every obstacle (a circle, boundingRadius around its pos) casts a shadow: a
+range of angles, as seen from origin, that it covers. The whole circle of
+angles is cut up wherever a shadow starts or ends, and each piece knows
+which obstacles cover it, nearest first. Checking a point is then a binary
+search for the piece it's in, then a segment/circle test against the
+(usually one or two) obstacles covering that piece.
+
+Making one is O(O^2) for O obstacles, which is nothing next to the number
+of points checked against it, and each check is O(log O).
+
+Obstacles the origin is inside of don't block anything, and points inside
+an obstacle count as hidden.
+
+"""
+class OcclusionMap(object):
+
+	def __init__(self, origin, obstacles):
+
+		self.origin = origin.tuple()
+		ox, oy = self.origin
+
+		# (from angle, to angle, obstacle) with every range inside -pi..pi
+		shadows = []
+
+		for obstacle in obstacles:
+			dx = obstacle.pos.x - ox
+			dy = obstacle.pos.y - oy
+			r = obstacle.boundingRadius
+
+			distanceSq = dx*dx + dy*dy
+			if(distanceSq <= r*r): continue
+
+			distance = sqrt(distanceSq)
+			centre = atan2(dy, dx)
+			half = asin(r / distance)
+
+			# Offset from the origin, radius squared and how close its
+			# nearest point is
+			blocker = (dx, dy, r*r, distance - r)
+
+			start, end = centre - half, centre + half
+			if(start < -pi):
+				shadows.append((start + 2*pi, pi, blocker))
+				start = -pi
+			if(end > pi):
+				shadows.append((-pi, end - 2*pi, blocker))
+				end = pi
+			shadows.append((start, end, blocker))
+
+		# Where each piece starts, and what covers it
+		self.starts = sorted(set([-pi] + [s[0] for s in shadows] + [s[1] for s in shadows if s[1] < pi]))
+		self.covers = []
+
+		ends = self.starts[1:] + [pi]
+		for start, end in zip(self.starts, ends):
+			middle = (start + end) / 2
+			blockers = [b for s, e, b in shadows if s <= middle <= e]
+			self.covers.append(sorted(blockers, key=lambda b: b[3]))
+
+
+	def visible(self, pos):
+
+		dx = pos.x - self.origin[0]
+		dy = pos.y - self.origin[1]
+
+		blockers = self.covers[bisect_right(self.starts, atan2(dy, dx)) - 1]
+		if(not len(blockers)): return True
+
+		lengthSq = dx*dx + dy*dy
+
+		for bx, by, radiusSq, near in blockers:
+			# Nearer than this one (and so all the rest) gets in the way
+			if(lengthSq <= near*near): return True
+
+			# Closest point on the line of sight to the obstacle's centre
+			t = (bx*dx + by*dy) / lengthSq
+			t = min(max(t, 0.0), 1.0)
+			cx = bx - t*dx
+			cy = by - t*dy
+
+			if(cx*cx + cy*cy < radiusSq): return False
+
+		return True
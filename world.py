@@ -6,8 +6,9 @@ Created for HIT3046 AI for Games by Clinton Woodward cwoodward@swin.edu.au
 
 from vector2d import Vector2D, Rect
 from matrix33 import Matrix33
+from transformations2d import WorldTransformScale, PointToWorldSpace
 from graphics import *
-from pyglet import clock
+from scheduler import Scheduler
 
 from fish import Fish
 from util import DictWrap
@@ -18,7 +19,19 @@ from guppy import Guppy
 from util import Util
 from tank import Tank
 from food import Food
-from random import uniform
+from spatialhash import SpatialHash
+from agentstore import AgentStore
+from flocking import flockingForces
+from foodtimes import arrivalTimes
+from timing import PhaseTimings
+from blackboard import Blackboard
+from lod import LevelOfDetail
+from decisions import DecisionScheduler
+import checkpoint
+from timeit import default_timer as timer
+import numpy as np
+from random import Random
+from itertools import count
 
 
 class World(object):
@@ -28,14 +41,41 @@ class World(object):
 	Inits 
 	=================================='''
 
-	def __init__(self, width, height):
+	# Random streams, one per subsystem. Each gets its own seed derived
+	# from the world's seed, so changing how often one subsystem rolls
+	# the dice doesn't shift the numbers any other one sees
+	RANDOM_STREAMS = ('spawn', 'wander', 'colors', 'movement', 'tank', 'rocks', 'food', 'hunters')
+
+	# Stats each kind lets you override, and whether they're child/parent
+	# pairs (see checkStat)
+	STATS = {
+		'guppy': (Guppy.STAT_NAMES, True),
+		'hunter': (Hunter.STAT_NAMES, False)
+	}
+
+	# Pass a seed to make the whole simulation repeatable: the same seed
+	# and the same deltas will always produce the same agent state.
+	# stats overrides some of each kind's _stats, eg.
+	# {'guppy': {'speed': (250, 120)}, 'hunter': {'maxSpeed': 70}}
+	# (guppy stats are child/parent pairs, hunter stats single values).
+	# Anything else raises a ValueError.
+	# Timers run on a Scheduler of our own unless one's passed in.
+	def __init__(self, width, height, seed=None, rocks=10, hunters=1, stats=None, scheduler=None):
 		self.width = width
 		self.height = height
 		self.center = Vector2D(width/2, height/2)
+		self.initialRocks = rocks
+		self.initialHunters = hunters
+		self.statOverrides = stats or {}
+		self.checkStats(self.statOverrides)
+
+		self.makeRandom(seed)
 		
 
 		self.obstacles = []
 		self._clock = 0
+
+		self.makeClock(scheduler)
 		
 		
 		self.scale = 10
@@ -43,6 +83,8 @@ class World(object):
 		
 
 		self.makeTank()
+
+		self.makeAgents()
 		
 		self.makeFish()
 
@@ -54,6 +96,14 @@ class World(object):
 
 		self.makeHunters()
 
+		self.makeBlackboard()
+
+		self.makeLevelOfDetail()
+
+		self.makeDecisions()
+
+		self.makeTimings()
+
 
 
 	'''
@@ -63,9 +113,135 @@ class World(object):
 
 
 
+	# Shared array storage for fish and hunter state, and ids that stay
+	# with a fish for its whole life (shards.py renumbers them)
+	def makeAgents(self):
+
+		self.agents = AgentStore()
+		self.uids = count()
+
+
+	# Raises a ValueError for any override in stats that wouldn't be used,
+	# or is the wrong shape for its stat
+	@classmethod
+	def checkStats(cls, stats):
+
+		for kind, values in stats.iteritems():
+			for stat, value in values.iteritems():
+				cls.checkStat(kind, stat, value)
+
+
+	# Raises a ValueError naming kind.stat if it's not one of STATS, or
+	# value (if given) isn't a child/parent pair or single number to suit
+	@classmethod
+	def checkStat(cls, kind, stat, value=None):
+
+		name = '%s.%s' % (kind, stat)
+
+		if(kind not in cls.STATS):
+			raise ValueError('Unknown kind %r in %r, use %s' % (kind, name, ' or '.join(sorted(cls.STATS))))
+
+		names, pairs = cls.STATS[kind]
+		if(stat not in names):
+			raise ValueError('Unknown %s stat %r in %r, use one of %s' % (kind, stat, name, ', '.join(names)))
+
+		if(value is None): return
+
+		isNumber = lambda v: isinstance(v, (int, long, float)) and not isinstance(v, bool)
+
+		if(pairs and not (isinstance(value, (tuple, list)) and len(value) == 2 and all([isNumber(v) for v in value]))):
+			raise ValueError('%s needs a (child, parent) pair of numbers, not %r' % (name, value))
+
+		if(not pairs and not isNumber(value)):
+			raise ValueError('%s needs a single number, not %r' % (name, value))
+
+
+	def makeRandom(self, seed=None):
+
+		self.seed = seed
+
+		master = Random(seed)
+		streams = dict((name, Random(master.getrandbits(64))) for name in self.RANDOM_STREAMS)
+
+		self.random = DictWrap(streams, create=False)
+
+
+	# Timed callbacks run on simulation time, moved along with _clock in
+	# update(), so they pause and fast forward with the world. clock is
+	# the same scheduler, by its old name.
+	def makeClock(self, scheduler=None):
+
+		self.scheduler = scheduler if scheduler is not None else Scheduler()
+		self.clock = self.scheduler
+
+
+	# Shared per-update facts about the world, see Blackboard
+	def makeBlackboard(self):
+
+		self.blackboard = Blackboard()
+		self.blackboard.update(self)
+		self.livingFishes = self.blackboard.livingFishes
+
+
+	# Which fish get a full update each time, see LevelOfDetail. Off until
+	# lod.enabled is set.
+	def makeLevelOfDetail(self):
+
+		self.lod = LevelOfDetail(world=self)
+
+
+	# Which fish get to rethink what they're doing each update, see
+	# DecisionScheduler. Off until decisions.enabled is set.
+	def makeDecisions(self):
+
+		self.decisions = DecisionScheduler(world=self)
+
+
+	# The steps of an update, in order, and optional timings for each of
+	# them. Set timings.enabled to start recording (see update).
+	def makeTimings(self):
+
+		self.timings = PhaseTimings()
+
+		self.phases = [
+			('neighbourGrid', lambda delta: self.buildNeighbourGrid()),
+			('flocking', lambda delta: self.calculateFlocking()),
+			('foodTimes', lambda delta: self.calculateFoodTimes()),
+			('lod', lambda delta: self.lod.assign()),
+			('decisions', lambda delta: self.decisions.run()),
+			('fish', self.updateFishes),
+			('food', self.updateFood),
+			('obstacles', self.updateObstacles),
+			('hunters', self.updateHunters),
+			('removeFish', self.removeSunkFish),
+			('removeFood', self.removeEatenFood)
+		]
+
+
 	def makeFish(self):        
 		self.fishes = []
 
+		# Copies of fish that another shard owns (see shards.py). They're
+		# found as neighbours but never updated.
+		self.ghosts = []
+
+		# Rebuilt at the start of every update, see buildNeighbourGrid
+		self.neighbourGrid = None
+
+		# Flocking forces for every fish, see calculateFlocking
+		self.flocking = None
+
+		# How long each fish is from each food, see calculateFoodTimes
+		self.foodTimes = None
+
+		# Fish and hunter outlines, and food and eyes, queued up in render
+		# and drawn together
+		self.bodies = ShapeBatch()
+		self.circles = CircleBatch()
+
+		# Debug text, kept between frames and drawn last
+		self.labels = TextLayer()
+
 
 	
 	def makeFood(self):
@@ -78,9 +254,9 @@ class World(object):
 		self.sicknessInterval = 0.1
 
 		
-		clock.schedule_interval(self.autoAddFoodAbove, self.autoFeedAboveInterval)
-		clock.schedule_interval(self.autoAddFoodBelow, self.autoFeedBelowInterval)
-		clock.schedule_interval(self.makeFishSicker, self.sicknessInterval)
+		self.clock.schedule_interval(self.autoAddFoodAbove, self.autoFeedAboveInterval)
+		self.clock.schedule_interval(self.autoAddFoodBelow, self.autoFeedBelowInterval)
+		self.clock.schedule_interval(self.makeFishSicker, self.sicknessInterval)
 
 
 	def makeTank(self):
@@ -92,7 +268,7 @@ class World(object):
 
 		self.obstacles = []
 
-		self.addRocks(10)
+		self.addRocks(self.initialRocks)
 
 
 
@@ -100,7 +276,7 @@ class World(object):
 
 		self.hunters = []
 
-		self.addHunters()
+		self.addHunters(self.initialHunters)
 
 
 	'''
@@ -141,12 +317,12 @@ class World(object):
 		for i in range(num):
 			newRock = Rock(world=self)
 			
-			newRock.vel = Vector2D.random(newRock.maxSpeed)
+			newRock.vel = Vector2D.random(newRock.maxSpeed, rng=self.random.rocks)
 			newRock.vel.y = 0
 
-			newRock.pos = self.tank.randomPosition()
+			newRock.pos = self.tank.randomPosition(self.random.rocks)
 			while(self.obstacleOverlapsOtherObstacles(newRock)):
-				newRock.pos = self.tank.randomPosition()
+				newRock.pos = self.tank.randomPosition(self.random.rocks)
 
 			self.obstacles.append(newRock)
 		   
@@ -165,7 +341,7 @@ class World(object):
 		# Make sure auto food is enabled
 		if(not self.autoFeed): return
 
-		position = self.tank.randomPosition()
+		position = self.tank.randomPosition(self.random.food)
 
 		# Add the food
 		if(above):
@@ -179,7 +355,7 @@ class World(object):
 		# Add the foods
 		for _ in range(num):
 			newHunter = Hunter(world=self)
-			newHunter.pos = self.tank.randomPosition()
+			newHunter.pos = self.tank.randomPosition(self.random.hunters)
 			self.hunters.append(newHunter)
 
 
@@ -197,31 +373,99 @@ class World(object):
 		if not self.paused or forced:
 			self._clock += delta
 
+			# Timers go off on our time, not the wall clock's
+			self.scheduler.advanceTo(self._clock)
+
+			# We want our debug info to be 1px
+			egi.set_stroke(1)
+
 			# Debug fish
 			if(len(self.fishes)): self.fishes[0].chosenOne = True
 			if(len(self.hunters)): self.hunters[0].chosenOne = True
 
-			# Keep list of living fish for food calculatinons
-			self.livingFishes = [f for f in self.fishes if not f.dead]
+			# Work out what everyone wants to know once, up front
+			self.blackboard.update(self)
+			self.livingFishes = self.blackboard.livingFishes
+
+			if(not self.timings.enabled):
+				[phase(delta) for name, phase in self.phases]
+			else:
+				self.timedUpdate(delta)
+
+
+	# Runs the update phases, recording how long each one takes
+	def timedUpdate(self, delta):
+
+		timings = self.timings
+
+		start = timer()
+		for name, phase in self.phases:
+			phase(delta)
+			start = timings.lap(name, start)
 
-			# TODO: Calculate fish times/distances from foods for everything so it isn't
-			#       recalculated by every fish * food
-			# self.calculateFoodData()
+		timings.commit()
 
-			# Updates
+
+	def updateFishes(self, delta):
+
+		if(self.lod.enabled):
+			self.updateFishesWithDetail(delta)
+		elif(self.timings.enabled):
+			[f.timedUpdate(delta, self.timings) for f in self.fishes]
+		else:
 			[f.update(delta) for f in self.fishes]
-			[f.update(delta) for f in self.food if not f.eaten]
-			[o.update(delta) for o in self.obstacles]
-			[h.update(delta) for h in self.hunters]
 
 
+	# Fish the level of detail isn't giving a full update just coast.
+	# Babies born during the update haven't got a tier yet, so they think.
+	def updateFishesWithDetail(self, delta):
+
+		thinking = self.lod.thinking
+		timings = self.timings
+
+		for i, f in enumerate(self.fishes):
+			if(i < len(thinking) and not thinking[i]):
+				f.coast(delta)
+			elif(timings.enabled):
+				f.timedUpdate(delta, timings)
+			else:
+				f.update(delta)
+
+
+	def updateFood(self, delta):
+
+		[f.update(delta) for f in self.food if not f.eaten]
+
+
+	def updateObstacles(self, delta):
+
+		[o.update(delta) for o in self.obstacles]
+
+
+	def updateHunters(self, delta):
+
+		hunters = [h for h in self.hunters if not h.ghost]
+
+		if(self.timings.enabled):
+			[h.timedUpdate(delta, self.timings) for h in hunters]
+		else:
+			[h.update(delta) for h in hunters]
+
+
+	# Kill dead fishes, giving their slots back to the agent store
+	def removeSunkFish(self, delta):
 
+		bottom = self.tank.box.bottom - 50
+		sunk = [f for f in self.fishes if f.dead and f.pos.y < bottom]
+		if(len(sunk)):
+			[self.agents.release(f.slot) for f in sunk]
+			self.fishes = [f for f in self.fishes if not (f.dead and f.pos.y < bottom)]
 
-			# Kill dead fishes
-			self.fishes = [f for f in self.fishes if not (f.dead and f.pos.y < self.tank.box.bottom - 50)]
 
-			# Remove food that's off the screen
-			self.food = [f for f in self.food if not f.eaten]
+	# Remove food that's off the screen
+	def removeEatenFood(self, delta):
+
+		self.food = [f for f in self.food if not f.eaten]
 
 
 	def makeFishSicker(self, dt=0):
@@ -246,17 +490,24 @@ class World(object):
 		# Draw tank first
 		self.tank.render()
 
-		# Then fish
+		# Then fish, their bodies all go in one batch
 		[f.render() for f in self.fishes]
+		self.bodies.flush()
+		self.circles.flush()
 
 		# Food
 		[f.render() for f in self.food if not f.eaten]
+		self.circles.flush()
 
 		# Rocks
 		[o.render() for o in self.obstacles]
 
 		# Hunters
 		[h.render() for h in self.hunters]
+		self.bodies.flush()
+		self.circles.flush()
+
+		self.labels.draw()
 
 		
 
@@ -287,6 +538,21 @@ class World(object):
 		self.tank.resize()
 
 
+	# Done with this world for good: cancels every timer and lets go of
+	# everything in the tank
+	def dispose(self):
+
+		self.scheduler.clear()
+
+		self.fishes = []
+		self.livingFishes = []
+		self.ghosts = []
+		self.hunters = []
+		self.food = []
+		self.obstacles = []
+		self.neighbourGrid = None
+
+
 	def addFish(self, num=1):
 		if(num < 1): return
 
@@ -296,6 +562,10 @@ class World(object):
 			self.fishes.append(newFish)
 			newFishes.append(newFish)
 
+			# Fish born mid-update need to be visible to everyone after them
+			if(self.neighbourGrid is not None):
+				self.neighbourGrid.insert(newFish)
+
 		# if(num == 1)
 		#     return newFishes[0]
 
@@ -311,16 +581,188 @@ class World(object):
 	
 
 
+	# Cell size comes from the biggest neighbourhood so most queries
+	# only need to look at the 3x3 block of cells around the agent
+	def buildNeighbourGrid(self):
+
+		fishes = self.fishes + self.ghosts
+
+		cellSize = max([f.neighbourDistance for f in fishes] or [100])
+
+		self.neighbourGrid = SpatialHash.build(fishes, cellSize)
+
+
+	# Calculates alignment, separation and cohesion for every fish at once,
+	# using the neighbour grid to find candidate pairs
+	def calculateFlocking(self):
+
+		fishes = self.fishes + self.ghosts
+		if(not len(fishes)):
+			self.flocking = None
+			return
+
+		slots = np.array([f.slot for f in fishes], dtype=int)
+		neighbourDistance = np.array([f.neighbourDistance for f in fishes], dtype=float)
+
+		pos = self.agents.pos[slots]
+		first, second = self.neighbourGrid.pairs(pos, neighbourDistance.max())
+
+		alignment, separation, cohesion = flockingForces(
+			pos=pos,
+			vel=self.agents.vel[slots],
+			maxSpeed=self.agents.maxSpeed[slots],
+			neighbourDistance=neighbourDistance,
+			maxForce=np.array([f.maxForce for f in fishes], dtype=float),
+			alignmentInfluence=np.array([f.alignmentInfluence for f in fishes], dtype=float),
+			cohesionInfluence=np.array([f.cohesionInfluence for f in fishes], dtype=float),
+			first=first,
+			second=second
+		)
+
+		self.flocking = {
+			'rows': dict((f, i) for i, f in enumerate(fishes)),
+			'alignment': alignment,
+			'separation': separation,
+			'cohesion': cohesion
+		}
+
+
+	# Returns (alignment, separation, cohesion) for a fish from this update's
+	# flocking pass, or None if it wasn't around when that was calculated.
+	# Pass three vectors as out to have them filled in instead of new ones.
+	def flockingForcesFor(self, agent, out=None):
+
+		if(self.flocking is None): return None
+
+		f = self.flocking
+		row = f['rows'].get(agent)
+		if(row is None): return None
+
+		if(out is None): out = (Vector2D(), Vector2D(), Vector2D())
+
+		for vector, name in zip(out, ('alignment', 'separation', 'cohesion')):
+			vector.set(f[name].item(row, 0), f[name].item(row, 1))
+
+		return out
+
+
+	# Called by agents once they've finished moving for this update
+	def agentMoved(self, agent):
+
+		if(self.neighbourGrid is not None):
+			self.neighbourGrid.move(agent)
+
+
 	def getNeighbours(self, agent, distance=100):
 
-		distanceSq = distance**2
+		if(self.neighbourGrid is None):
+			distanceSq = distance**2
+			return [a for a in self.fishes + self.ghosts if a != agent and a.pos.distanceSq(agent.pos) < distanceSq]
+
+		return self.neighbourGrid.query(agent.pos, distance, exclude=agent)
+
+
+	# Works out how long every living fish is from every piece of food in
+	# one go, so guppies comparing themselves against everyone else (see
+	# Guppy.findBestFood) don't redo it per fish
+	def calculateFoodTimes(self):
+
+		fishes = self.livingFishes
+		foods = self.blackboard.food
+		if(not len(fishes) or not len(foods)):
+			self.foodTimes = None
+			return
 
-		return [a for a in self.fishes if a != agent and a.pos.distanceSq(agent.pos) < distanceSq]
+		slots = np.array([f.slot for f in fishes], dtype=int)
 
+		time, position, distance = arrivalTimes(
+			fishPos=self.agents.pos[slots],
+			maxSpeed=self.agents.maxSpeed[slots],
+			foodPos=np.array([f.pos.tuple() for f in foods], dtype=float),
+			foodVel=np.array([f.vel.tuple() for f in foods], dtype=float)
+		)
 
+		self.foodTimes = {
+			'fishes': fishes,
+			'rows': dict((f, i) for i, f in enumerate(fishes)),
+			'columns': dict((f, i) for i, f in enumerate(foods)),
+			'time': time,
+			'position': position,
+			'distance': distance
+		}
+
+
+	# Where fish and food are in this update's food times, as (row, column),
+	# or None if the fish or food wasn't around when they were calculated
+	def foodTimeIndex(self, fish, food):
+
+		if(self.foodTimes is None): return None
+
+		t = self.foodTimes
+		row = t['rows'].get(fish)
+		column = t['columns'].get(food)
+		if(row is None or column is None): return None
+
+		return row, column
+
+
+	# fish's (time, projected position) arrays to each of foods, in foods'
+	# order, from this update's food times. None if any of them weren't
+	# around when they were calculated.
+	def foodTimesFrom(self, fish, foods):
+
+		if(self.foodTimes is None): return None
+
+		t = self.foodTimes
+		row = t['rows'].get(fish)
+		columns = [t['columns'].get(f) for f in foods]
+		if(row is None or None in columns): return None
+
+		return t['time'][row, columns], t['position'][row, columns]
+
+
+	# Every fish's time to a piece of food, in the same order as fishes.
+	# Only works for this update's living fish, otherwise returns None.
+	def foodTimesTo(self, food, fishes):
+
+		if(self.foodTimes is None or fishes is not self.foodTimes['fishes']): return None
+
+		column = self.foodTimes['columns'].get(food)
+		if(column is None): return None
+
+		return self.foodTimes['time'][:, column]
+
+
+	# Food in the tank that hasn't been eaten yet
 	def getFood(self, agent, distance=10000):
 
-		return [f for f in self.food if not f.eaten and self.tank.contains(f.pos)]
+		return [f for f in self.blackboard.food if not f.eaten]
+
+
+	# Writes everything needed to carry on from here to path, see checkpoint.py
+	def save(self, path):
+
+		checkpoint.save(self, path)
+
+
+	# Builds a world from a file written by save
+	@classmethod
+	def load(cls, path):
+
+		return checkpoint.load(cls, path)
+
+
+	# Everything that describes where agents are and what they're up to,
+	# for checking that two runs with the same seed really are identical
+	def stateSnapshot(self):
+
+		return (
+			self._clock,
+			tuple((f.pos.tuple(), f.vel.tuple(), f.heading.tuple(), f.size, f.sickness, f.dead) for f in self.fishes),
+			tuple((h.pos.tuple(), h.vel.tuple(), h.heading.tuple(), h.awake) for h in self.hunters),
+			tuple((f.pos.tuple(), f.vel.tuple(), f.eaten) for f in self.food),
+			tuple((o.pos.tuple(), o.vel.tuple()) for o in self.obstacles)
+		)
 
 
 	# Enables/disables the circle of life properties
@@ -360,50 +802,16 @@ class World(object):
 
 
 	def transform_points(self, points, pos, forward, side, scale=Vector2D(1, 1)):
-		''' Transform the given list of points, using the provided position,
-			direction and scale, to object world space. '''
-		# make a copy of original points (so we don't trash them)
-		wld_pts = Util.copyPoints(points)
-
-		# create a transformation matrix to perform the operations
-		mat = Matrix33()
-
-		# scale,
-		mat.scale_update(scale.x, scale.y)
+		''' Transform the given list of points (or (n, 2) array), using the
+			provided position, direction and scale, to object world space. '''
+		return WorldTransformScale(points, pos, forward, side, scale)
 
-		# rotate
-		mat.rotate_by_vectors_update(forward, side)
 
-		# and translate
-		mat.translate_update(pos.x, pos.y)
-
-		# now transform all the points (vertices)
-		mat.transform_vector2d_list(wld_pts)
-
-		# done
-		return wld_pts
-
-
-	def transform_point(self, point, pos, forward, side):
+	def transform_point(self, point, pos, forward, side, out=None):
 		''' Transform the given single point, using the provided position,
-		and direction (forward and side unit vectors), to object world space. '''
-		# make a copy of the original point (so we don't trash it)
-		wld_pt = point.copy()
-
-		# create a transformation matrix to perform the operations
-		mat = Matrix33()
-
-		# rotate
-		mat.rotate_by_vectors_update(forward, side)
-
-		# and translate
-		mat.translate_update(pos.x, pos.y)
-
-		# now transform the point (in place)
-		mat.transform_vector2d(wld_pt)
-
-		# done
-		return wld_pt
+		and direction (forward and side unit vectors), to object world space.
+		Pass out to have the result written into it instead of a new vector. '''
+		return PointToWorldSpace(point, pos, forward, side, out)
 
 
 
@@ -421,7 +829,7 @@ class World(object):
 	def makeDebug(self):
 
 		self.paused = False
-		self.drawDebug = False,
+		self.drawDebug = False
 		self.drawComponentForces = False
 		self.drawHidingSpots = False
 		self.awokenHunter = True